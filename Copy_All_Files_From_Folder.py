@@ -1,42 +1,86 @@
-from shutil import copy2, move, Error
+from shutil import move, Error
 from send2trash import send2trash
 import os
 from progress_bar import progress_bar
+from seconds_to_time import seconds_to_time
 from file_folder_getters import *
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from filecmp import cmp as compare_files
-from time import time
-from Filelist import Filelist
+from functools import partial
+from time import time, perf_counter
+from Filelist import Filelist, get_file_hash
+from fast_trash import FastTrash, restore_trashed_files
+from fast_delete import delete_files
+from file_copy import copy_file, PARALLEL_FILE_SIZE
+from archive_output import archive_files, TarArchiveWriter
+from archive_input import copy_archive_members
+from fan_out_copy import fan_out_copy_files
+from checksum_manifest import write_manifest, verify_manifest
+from duplicate_reclaimer import reclaim_duplicates, RECLAIM_METHODS, KEEP_RULES
+from duplicate_report import DuplicateReport
+from content_catalog import ContentCatalog, CATALOG_FILENAME, CATALOG_ACTIONS
+from chunk_store import backup_files, restore_files
+from tree_diff import compare_filelists
+from device_benchmark import measure_read_speed, get_device
+from run_report import RunReport
 import argparse
 
 
-def parse_inputs() -> tuple[bool, str, str, list[str], list[str], str, bool, bool, int, int]:
+def parse_inputs() -> tuple[bool, str, list[str] | None, list[str], list[str], str, bool, bool, int, int, bool, bool, str | None, int, str, int, str | None, str, list[str], str | None, str, int, bool, int]:
     """
     takes care of parsing the command line arguments passed to the program
 
     returns tuple:
     (get_file_extensions: bool,
     input_folder: str,
-    output_folder: str,
+    output_folders: list[str] | None,
     file_extensions: list[str],
     file_beginnings: list[str],
     operation: str,
     confirm_permanent_delete: bool,
     keep_folder_structure: bool,
     min_filesize: int,
-    max_filesize: int)
+    max_filesize: int,
+    fast_trash: bool,
+    plan: bool,
+    report_filepath: str | None,
+    copy_block_size: int,
+    archive_compression: str,
+    max_archive_size: int,
+    manifest_filepath: str | None,
+    link_method: str,
+    keep_rules: list[str],
+    catalog_filepath: str | None,
+    catalog_action: str,
+    average_chunk_size: int,
+    verify_copies: bool,
+    parallel_file_size: int)
     """
     parser = argparse.ArgumentParser(description="Does various things related to file handling and moving")
     parser.add_argument("--get_file_extensions", "-gfe", help="bool, True for getting file extensions", action="store_true", default=False)
-    parser.add_argument("--input_folder", "-if", type=str, nargs="?", required=True, help="str, path to the input folder for processing")
-    parser.add_argument("--output_folder", "-of", type=str, nargs="?", help="str, path to the output folder for processing")
+    parser.add_argument("--input_folder", "-if", type=str, nargs="?", required=True, help="str, path to the input folder for processing, or to a tar or zip archive to copy files out of")
+    parser.add_argument("--output_folder", "-of", type=str, nargs="*", help="str, path to the output folder for processing, several for copying to all of them while reading each file once")
     parser.add_argument("--file_extensions", "-fe", type=str, nargs="*", help="str, list the file extensions you want to limit processing to", default=[])
     parser.add_argument("--file_beginnings", "-fb", type=str, nargs="*", help="str, list the file beginnings you want to limit processing to", default=[])
     parser.add_argument("--min_filesize", "-minfs", type=int, nargs="?", help="int, the minimum filesize to consider for the operation", default=0)
     parser.add_argument("--max_filesize", "-maxfs", type=int, nargs="?", help="int, the maximum filesize to consider for the operation", default=2**64)
     parser.add_argument("--keep_folder_structure", "-kfs", type=bool, nargs="?", help="bool, True to keep folder structure as is, False to have no subfolders in output", choices=(True, False), default=True)
-    parser.add_argument("--operation", "-op", type=str, nargs="?", choices=("C", "M", "T", "D"), help="str, file operation to perform (Copy, Move, Trash, Delete)")
+    parser.add_argument("--operation", "-op", type=str, nargs="?", choices=("C", "M", "T", "D", "A", "R", "H", "V", "L", "F", "K", "B", "X", "E"), help="str, file operation to perform (Copy, Move, Trash, Delete, Archive into tar files in output_folder, Restore files trashed with --fast_trash, input_folder being the trash folder, Hash files into a sha256sum manifest, Verify files against a sha256sum manifest, Link duplicate files in input_folder and output_folder to a single copy, Find duplicate files across input_folder and every output_folder, Keep the content catalog of input_folder up to date, Back up into a deduplicated chunk store in output_folder, eXtract a backup from a chunk store, input_folder being the recipes folder of the backup, comparE the files of input_folder and output_folder)")
     parser.add_argument("--confirm_permanent_delete", "-cpd", help="bool, required to be True to permanently delete any files", action="store_true", default=False)
+    parser.add_argument("--plan", "-p", help="bool, True to only show what the operation would do and estimate how long it would take, without changing any files", action="store_true", default=False)
+    parser.add_argument("--report", "-r", type=str, nargs="?", help="str, path of a JSON lines file to write the result of every file to, for operation F the duplicates found (JSON lines, or CSV if it ends with .csv), for operation E the files that aren't the same", default=None)
+    parser.add_argument("--fast_trash", "-ft", help="bool, True to trash files by renaming them into a trash folder on the same drive (can be restored with operation R)", action="store_true", default=False)
+    parser.add_argument("--copy_block_size", "-cbs", type=int, nargs="?", help="int, number of bytes read and written at a time when copying sparse or large files", default=16*1024*1024)
+    parser.add_argument("--parallel_file_size", "-pfs", type=int, nargs="?", help="int, files of this size in bytes or more are copied as several byte ranges at the same time", default=PARALLEL_FILE_SIZE)
+    parser.add_argument("--verify_copies", "-vc", help="bool, True to read back files copied as byte ranges and compare them with their source before they are put in place", action="store_true", default=False)
+    parser.add_argument("--archive_compression", "-ac", type=str, nargs="?", choices=TarArchiveWriter.COMPRESSIONS, help="str, compression of the archives for operation A (none, gz or xz)", default="")
+    parser.add_argument("--max_archive_size", "-mas", type=int, nargs="?", help="int, maximum size in bytes of each archive for operation A, before compression", default=4*1024**3)
+    parser.add_argument("--manifest", "-mf", type=str, nargs="?", help="str, path of the sha256sum manifest to write (operation H) or to verify against (operation V)", default=None)
+    parser.add_argument("--link_method", "-lm", type=str, nargs="?", choices=RECLAIM_METHODS, help="str, how duplicates are replaced by operation L (hardlink, reflink, or trash the duplicate and hardlink)", default="hardlink")
+    parser.add_argument("--keep_rules", "-kr", type=str, nargs="*", choices=KEEP_RULES, help="str, list of rules choosing the file that operation L keeps, in order (in input_folder, oldest, shortest path)", default=["in_folder1", "oldest", "shortest_path"])
+    parser.add_argument("--catalog", "-cat", type=str, nargs="?", help="str, path of the content catalog to update (operation K, {} in input_folder by default), or for operations C and M to look files up in before copying them".format(CATALOG_FILENAME), default=None)
+    parser.add_argument("--average_chunk_size", "-acs", type=int, nargs="?", help="int, average size in bytes of the chunks files are split into for operation B, only used when the chunk store is created", default=1024*1024)
+    parser.add_argument("--catalog_action", "-ca", type=str, nargs="?", choices=CATALOG_ACTIONS, help="str, what operations C and M do with files whose contents are already in the catalog (skip them, or link the file of the catalog at their destination)", default="skip")
     args = parser.parse_args()
 
     output = (args.get_file_extensions,
@@ -48,36 +92,86 @@ def parse_inputs() -> tuple[bool, str, str, list[str], list[str], str, bool, boo
               args.confirm_permanent_delete,
               args.keep_folder_structure, 
               args.min_filesize,
-              args.max_filesize)
+              args.max_filesize,
+              args.fast_trash,
+              args.plan,
+              args.report,
+              args.copy_block_size,
+              args.archive_compression,
+              args.max_archive_size,
+              args.manifest,
+              args.link_method,
+              args.keep_rules,
+              args.catalog,
+              args.catalog_action,
+              args.average_chunk_size,
+              args.verify_copies,
+              args.parallel_file_size)
 
     return output
 
 
 # FIXME output_folder is not checked with assertion
-def move_files(input_folder, output_folder = None, file_extensions: tuple[str, ...] = (), start_with: tuple[str, ...] = (), min_filesize: int = 0, max_filesize: int = Filelist.DEFAULT_MAX_FILESIZE, move_mode: str = "C", keep_folder_structure: bool = True, files_per_group: int = 100) -> list[tuple]:
+def move_files(input_folder, output_folder = None, file_extensions: tuple[str, ...] = (), start_with: tuple[str, ...] = (), min_filesize: int = 0, max_filesize: int = Filelist.DEFAULT_MAX_FILESIZE, move_mode: str = "C", keep_folder_structure: bool = True, files_per_group: int = 100, fast_trash: bool = False, report_filepath: str | None = None, copy_block_size: int = 16*1024*1024, archive_compression: str = "", max_archive_size: int = 4*1024**3, catalog_filepath: str | None = None, catalog_action: str = "skip", verify_copies: bool = False, parallel_file_size: int = PARALLEL_FILE_SIZE) -> list[tuple]:
     """
-    move_mode can be either "M" for move, "C" for copy, "T" for trash, "D" for permanently delete
+    move_mode can be either "M" for move, "C" for copy, "T" for trash, "D" for permanently delete,
+    "A" for archive (copy into tar archives in output_folder, see TarArchiveWriter)
 
-    output_folder should be defined for move_mode C or M, but is unused for T or D
+    input_folder can also be a tar or zip archive (see Filelist), its files can only be copied (move_mode "C"),
+    they are streamed from the archive to output_folder without extracting anything else
+
+    output_folder should be defined for move_mode C, M or A, but is unused for T or D.
+    for move_mode C it can also be a tuple of several folders, every file is then read once and written to all of them (see FanOutCopier)
 
     if file_extensions/start_with is empty tuple then all file extensions will be copied/moved
 
     if keep_folder_structure is False, all files in input folder and its subfolders will be dumped into the output folder,
     this only applies for move_mode in ["C", "M"]
 
-    returns the errors
+    if fast_trash is True (move_mode "T" only), files are renamed into a trash folder on their own drive (see FastTrash)
+    instead of being sent to the system trash, they can be put back with restore_trashed_files()
+
+    if report_filepath is given, the result of every file is written to it as JSON lines (see RunReport)
+
+    copy_block_size is the number of bytes read and written at a time when copying sparse or large files (see copy_file),
+    files of parallel_file_size bytes or more are copied as several byte ranges at the same time,
+    and read back and compared with their source before they are put in place if verify_copies is True (see copy_file_in_ranges)
+
+    archive_compression ("", "gz" or "xz") and max_archive_size (bytes before compression) are only used for move_mode "A"
+
+    if catalog_filepath is given (move_mode "C" or "M", see ContentCatalog), every file is looked up in the catalog before it is copied/moved,
+    files whose contents are already in the catalog's folder under any name are not copied:
+    with catalog_action "skip" they are left out (trashed for move_mode "M", like files that already existed),
+    with catalog_action "link" the file of the catalog is hardlinked at their destination instead.
+    files that are copied are added to the catalog
+
+    returns the errors, as a list of pairs of (error number, number of files)
     """
-    assert (move_mode in ["C", "M", "T", "D"]), "move_mode was not one of the options"
+    assert (move_mode in ["C", "M", "T", "D", "A"]), "move_mode was not one of the options"
     assert (isinstance(file_extensions, tuple)), "file_extensions was not a tuple"
     assert (isinstance(start_with, tuple)), "start_with was not a tuple"
     assert (os.path.exists(input_folder)), "input_folder does not exist"
     assert (isinstance(keep_folder_structure, bool)), "keep_folder_structure was not bool"
+    assert (isinstance(copy_block_size, int) and copy_block_size > 0), "copy_block_size was not a positive int"
+    assert (isinstance(parallel_file_size, int) and parallel_file_size > 0), "parallel_file_size was not a positive int"
+    assert (catalog_filepath is None or move_mode in ("C", "M")), "a catalog can only be used to copy or move files"
+    assert (catalog_action in CATALOG_ACTIONS), "catalog_action was not one of the options"
 
     input_folder = os.path.abspath(input_folder) # fix slashes
 
+    output_folders: tuple[str, ...] | None = None # only when copying to several folders at once
+    if isinstance(output_folder, (tuple, list)):
+        assert (len(output_folder) > 0), "output_folder was an empty tuple"
+        if len(output_folder) > 1:
+            assert (move_mode == "C"), "files can only be copied to several output folders"
+            output_folders = tuple([os.path.abspath(folder) for folder in output_folder])
+            for folder in output_folders:
+                os.makedirs(folder, exist_ok=True)
+        output_folder = output_folder[0]
+
     same_drive_input_output = False # in case it doesn't get defined below
 
-    if move_mode in ["C", "M"]:
+    if move_mode in ["C", "M", "A"]:
         if not os.path.exists(output_folder):
             try:
                 os.makedirs(output_folder)
@@ -91,6 +185,9 @@ def move_files(input_folder, output_folder = None, file_extensions: tuple[str, .
     filelist = Filelist(input_folder, file_extensions, start_with, min_filesize, max_filesize)
     number_of_files_total = len(filelist.get_filepaths())
     print("{} files found".format(number_of_files_total))
+    assert (move_mode == "C" or not filelist.is_archive()), "files in an archive can only be copied"
+    assert (output_folders is None or not filelist.is_archive()), "files in an archive can only be copied to one output folder"
+    assert (catalog_filepath is None or (output_folders is None and not filelist.is_archive())), "a catalog can only be used with one output folder, and not for files in an archive"
 
     input_files = filelist.get_filepaths()
 
@@ -99,7 +196,7 @@ def move_files(input_folder, output_folder = None, file_extensions: tuple[str, .
         folderpath = os.path.dirname(filepath)
         unique_folders.add(folderpath)
 
-    if move_mode == "C" or (move_mode == "M" and not same_drive_input_output):
+    if move_mode in ("C", "A") or (move_mode == "M" and not same_drive_input_output):
         # copy / move time is mainly based on raw MB/s throughput of drives
         rate_units = "MB"
     else:
@@ -108,106 +205,376 @@ def move_files(input_folder, output_folder = None, file_extensions: tuple[str, .
         rate_units = "files"
 
     number_of_files_processed = 0
-    error_counts = [0 for _ in range(9999)] # I hope that I never have over 9999 possible error codes
+    run_report = RunReport(report_filepath)
 
     total_size = sum(filelist.get_filesizes())
     total_processed_size = 0
 
     if move_mode == "C":
-        print("Copying Files from \"{}\" to \"{}\"".format(input_folder, output_folder))
+        print("Copying Files from \"{}\" to \"{}\"".format(input_folder, "\", \"".join(output_folders) if output_folders is not None else output_folder))
     elif move_mode == "M":
         print("Moving Files from \"{}\" to \"{}\"".format(input_folder, output_folder))
     elif move_mode == "T":
         print("Trashing Files from \"{}\"".format(input_folder))
     elif move_mode == "D":
         print("PERMANENTLY DELETING Files from \"{}\"".format(input_folder))
+    elif move_mode == "A":
+        print("Archiving Files from \"{}\" to \"{}\"".format(input_folder, output_folder))
 
     print("") # newline since first progress_bar() will \r
 
-    grouped_filepaths = [input_files[i:i+files_per_group] if i+files_per_group < len(input_files) else input_files[i:] for i in range(0, len(input_files), files_per_group)]
-
-    threads = list()
-
-    progress_bar_object = progress_bar(100, rate_units="Threads")
-    progress = 0
-
-    print("creating threads...")
-    with ThreadPoolExecutor() as executor:
-        for filepaths in grouped_filepaths:
-            thread = executor.submit(__move_files_unit_processor, filepaths, input_folder, output_folder, unique_folders, move_mode, keep_folder_structure)
-            threads.append(thread)
-
-        print("waiting for threads to return...")
-        all_threads_done = False
-        last_done_count = 0
-        while not all_threads_done:
-            done_count = 0
-            for thread in threads:
-                done_count += thread.done()
-            all_threads_done = (done_count == len(threads))
-            if done_count == 0:
-                continue
-            if last_done_count != done_count:
-                last_done_count = done_count
-                progress_bar_object.print_progress_bar(done_count / len(threads), done_count)
-            else:
-                sleep(min((progress_bar_object.get_ETA(done_count / len(threads))/100, 1)))
+    planned_destinations: dict[str, tuple[str | None, int]] | None = None
+    if not keep_folder_structure and move_mode in ("C", "M") and output_folders is None:
+        print("planning destination filenames...")
+        planned_destinations = plan_flattened_destinations(filelist, output_folder, move_mode)
 
-        print("") # to add a newline after the end of the progress bar
+    copy_function = partial(copy_file, buffer_chunk_size=copy_block_size, parallel_file_size=parallel_file_size, verify=verify_copies)
 
-        progress_bar_object = progress_bar(100, rate_units=rate_units)
+    catalog = None
+    if catalog_filepath is not None:
+        catalog = ContentCatalog(catalog_filepath)
+        print("looking files up in the catalog of \"{}\"".format(catalog.get_root_folder()))
 
-        print("processing outputs...")
-        for thread in threads:
-            (new_error_counts, new_number_of_files_processed, number_of_failed_files, new_total_processed_size, failed_files_size) = thread.result()
-            number_of_files_total -= number_of_failed_files
-            total_size -= failed_files_size
-            for i in range(len(error_counts)):
-                error_counts[i] += new_error_counts[i]
-            number_of_files_processed += new_number_of_files_processed
-            total_processed_size += new_total_processed_size
+    grouped_filepaths = [input_files[i:i+files_per_group] if i+files_per_group < len(input_files) else input_files[i:] for i in range(0, len(input_files), files_per_group)]
 
-            # update progress
-            if move_mode == "C" or (move_mode == "M" and not same_drive_input_output):
-                # copy / move time is mainly based on raw MB/s throughput of drives
-                try:
-                    progress = total_processed_size / total_size
-                except ZeroDivisionError:
-                    progress = 1 / 2**32
-                rate_progress = total_processed_size / (10**6)
-            else:
-                # basically just changing a few bytes in the filesystem per file,
-                # move time is based on seek time and is constant regardless of file size
-                progress = number_of_files_processed / number_of_files_total
-                rate_progress = number_of_files_processed
+    fast_trash_object = None
+    if move_mode == "T" and fast_trash:
+        fast_trash_object = FastTrash()
+
+    folder_entry_counts: dict[str, int] = dict()
+    removed_entry_counts: dict[str, int] = dict() # number of files moved/trashed/deleted out of each folder
+    if move_mode in ("M", "T", "D"):
+        # counted before any file is touched, so that emptied folders can be found without listing them again
+        folder_entry_counts = count_folder_entries(get_folders_to_clean(input_folder, unique_folders))
+
+    if move_mode == "D":
+        print("deleting files...")
+        filelist_filesizes = dict(zip(filelist.get_filepaths(), filelist.get_filesizes()))
+        input_filesizes = tuple([filelist_filesizes.get(filepath, 0) for filepath in input_files])
+        (number_of_files_processed, _, _, removed_entry_counts) = delete_files(input_files, folder_entry_counts, files_per_group, input_filesizes, run_report)
+    elif move_mode == "A":
+        print("archiving files...")
+        filelist_filesizes = dict(zip(filelist.get_filepaths(), filelist.get_filesizes()))
+        input_filesizes = tuple([filelist_filesizes.get(filepath, 0) for filepath in input_files])
+        (number_of_files_processed, _, archive_results, archive_writer) = archive_files(input_files, input_folder, output_folder, archive_compression, max_archive_size, input_filesizes)
+        run_report.add_results(archive_results)
+        print("{} archives written, index in \"{}\"".format(len(archive_writer.get_archive_filepaths()), archive_writer.get_index_filepath()))
+    elif output_folders is not None:
+        print("copying files to {} output folders...".format(len(output_folders)))
+        filelist_filesizes = dict(zip(filelist.get_filepaths(), filelist.get_filesizes()))
+        input_filesizes = tuple([filelist_filesizes.get(filepath, 0) for filepath in input_files])
+        (number_of_files_processed, _, results_by_output_folder) = fan_out_copy_files(input_files, input_folder, output_folders, keep_folder_structure, input_filesizes, copy_block_size)
+        for folder, folder_results in zip(output_folders, results_by_output_folder):
+            run_report.add_results(folder_results)
+            print("\"{}\": {} files copied, {} errors".format(folder, len([result for result in folder_results if result[4] == -1]), len([result for result in folder_results if result[4] != -1])))
+    elif filelist.is_archive():
+        print("copying files out of archive...")
+        (number_of_files_processed, _, archive_results) = copy_archive_members(input_folder, input_files, output_folder, keep_folder_structure, planned_destinations, filelist.get_filesizes())
+        run_report.add_results(archive_results)
+    else:
+        threads = list()
+        progress = 0
+
+        print("creating threads...")
+        with ThreadPoolExecutor() as executor:
+            for filepaths in grouped_filepaths:
+                if move_mode == "T":
+                    thread = executor.submit(__trash_files_unit_processor, filepaths, fast_trash_object)
+                else:
+                    thread = executor.submit(__move_files_unit_processor, filepaths, input_folder, output_folder, move_mode, keep_folder_structure, planned_destinations, copy_function, catalog, catalog_action)
+                threads.append(thread)
+
+            progress_bar_object = progress_bar(100, rate_units=rate_units)
+
+            print("processing outputs...")
+            # each group of results goes to the report as soon as its thread is done, as_completed only keeps the threads that are still pending
+            completed_threads = as_completed(threads)
+            threads = list()
+            for thread in completed_threads:
+                (new_results, new_number_of_files_processed, number_of_failed_files, new_total_processed_size, failed_files_size, new_removed_entry_counts) = thread.result()
+                for folderpath, removed_entry_count in new_removed_entry_counts.items():
+                    removed_entry_counts[folderpath] = removed_entry_counts.get(folderpath, 0) + removed_entry_count
+                number_of_files_total -= number_of_failed_files
+                total_size -= failed_files_size
+                run_report.add_results(new_results)
+                number_of_files_processed += new_number_of_files_processed
+                total_processed_size += new_total_processed_size
+
+                # update progress
+                if move_mode == "C" or (move_mode == "M" and not same_drive_input_output):
+                    # copy / move time is mainly based on raw MB/s throughput of drives
+                    try:
+                        progress = total_processed_size / total_size
+                    except ZeroDivisionError:
+                        progress = 1 / 2**32
+                    rate_progress = total_processed_size / (10**6)
+                else:
+                    # basically just changing a few bytes in the filesystem per file,
+                    # move time is based on seek time and is constant regardless of file size
+                    progress = number_of_files_processed / number_of_files_total
+                    rate_progress = number_of_files_processed
 
-            progress_bar_object.print_progress_bar(progress, rate_progress)
+                progress_bar_object.print_progress_bar(progress, rate_progress)
     
     print("") # to add a newline after the end of the progress bar
 
-    # process error_counts to only return what errors did happen:
-    error_return: list[tuple] = list()
-    for error_number in range(len(error_counts)):
-        if error_counts[error_number] > 0:
-            error_return.append((error_number, error_counts[error_number]))
+    if move_mode in ("M", "T", "D"):
+        print("removing emptied folders...")
+        print("{} folders removed".format(remove_emptied_folders(folder_entry_counts, removed_entry_counts)))
+
+    if catalog is not None:
+        catalog.close()
+
+    if fast_trash_object is not None:
+        fast_trash_object.close()
+        for run_folder in fast_trash_object.get_run_folders():
+            print("trashed files can be restored from \"{}\"".format(run_folder))
+
+    run_report.close()
+    for error_number, (number_of_files, number_of_bytes) in run_report.get_summary().items():
+        print("{} files ({} bytes) with {}".format(number_of_files, number_of_bytes, "no error" if error_number == -1 else "error {}".format(error_number)))
+    if report_filepath is not None:
+        print("report written to \"{}\"".format(report_filepath))
+
+    return run_report.get_error_counts()
+
+
+def plan_move_files(input_folder, output_folder = None, file_extensions: tuple[str, ...] = (), start_with: tuple[str, ...] = (), min_filesize: int = 0, max_filesize: int = Filelist.DEFAULT_MAX_FILESIZE, move_mode: str = "C", keep_folder_structure: bool = True) -> dict[str, int | float]:
+    """
+    dry run of move_files with the same inputs, nothing is written to any drive.
+    finds and filters the files, counts what would happen to them and estimates how long move_files would take
+
+    the estimate uses a cost model of (seconds per file * files) + (bytes to copy / bytes per second),
+    calibrated with a short read-only benchmark of the input drive and of the files already in output_folder (if any).
+    write speed can't be measured without writing, so copies are assumed to be as fast as the slowest of those reads
+
+    returns a dict of:
+    "files": number of files found,
+    "bytes": total size of the files found,
+    "conflicts": files whose filename is already taken at the destination,
+    "identical_duplicates": files that won't be copied/moved because an identical file will already be there (only known if keep_folder_structure is False),
+    "renames": files that will be moved within the same drive, costing no copying,
+    "files_to_copy": files whose bytes will be copied,
+    "bytes_to_copy": total size of files_to_copy,
+    "seconds_per_file": calibrated cost of each file,
+    "bytes_per_second": calibrated throughput,
+    "estimated_seconds": estimated time to run move_files
+    """
+    assert (move_mode in ["C", "M", "T", "D", "A"]), "move_mode was not one of the options"
+    assert (os.path.exists(input_folder)), "input_folder does not exist"
+    assert (move_mode not in ("C", "M", "A") or output_folder is not None), "output_folder is required for move_mode C, M or A"
+
+    input_folder = os.path.abspath(input_folder)
+
+    print("finding all files in input folder...")
+    filelist = Filelist(input_folder, file_extensions, start_with, min_filesize, max_filesize)
+    filesizes = filelist.get_filesizes()
+    filepaths = filelist.get_filepaths() # after get_filesizes() so that both are mapped to each other
+    print("{} files found".format(len(filepaths)))
+
+    plan: dict[str, int | float] = {"files": len(filepaths), "bytes": sum(filesizes), "conflicts": 0, "identical_duplicates": 0, "renames": 0, "files_to_copy": 0, "bytes_to_copy": 0}
+
+    print("measuring input drive...")
+    (seconds_per_file, bytes_per_second) = measure_read_speed(filepaths)
+
+    if move_mode == "A":
+        # every file is read, but written as part of a few big sequential archives, so the output drive has no per file cost
+        plan["files_to_copy"] = len(filepaths)
+        plan["bytes_to_copy"] = plan["bytes"]
+
+    if move_mode in ("C", "M"):
+        output_folder = os.path.abspath(output_folder)
+        same_device = (get_device(input_folder) == get_device(output_folder))
+
+        print("checking destination filenames...")
+        files_to_copy: list[int] = list() # indices of files that will be copied or moved
+        if not keep_folder_structure:
+            planned_destinations = plan_flattened_destinations(filelist, output_folder, move_mode)
+            for index in range(len(filepaths)):
+                (destination_filepath, error_number) = planned_destinations[filepaths[index]]
+                if destination_filepath is None:
+                    plan["identical_duplicates"] += 1
+                    continue
+                if error_number == 4:
+                    plan["conflicts"] += 1
+                files_to_copy.append(index)
+        else:
+            destination_filenames: dict[str, set[str]] = dict() # each destination folder is listed once
+            for index in range(len(filepaths)):
+                (folderpath, filename) = os.path.split(filepaths[index])
+                destination_folderpath = os.path.abspath(output_folder + "/" + folderpath.removeprefix(input_folder))
+                if destination_folderpath not in destination_filenames:
+                    try:
+                        destination_filenames[destination_folderpath] = set(os.listdir(destination_folderpath))
+                    except OSError: # doesn't exist yet
+                        destination_filenames[destination_folderpath] = set()
+                if filename in destination_filenames[destination_folderpath]:
+                    plan["conflicts"] += 1
+                files_to_copy.append(index)
+
+        if move_mode == "M" and same_device:
+            plan["renames"] = len(files_to_copy)
+        else:
+            plan["files_to_copy"] = len(files_to_copy)
+            plan["bytes_to_copy"] = sum([filesizes[index] for index in files_to_copy])
+
+            if os.path.exists(output_folder):
+                print("measuring output drive...")
+                (output_seconds_per_file, output_bytes_per_second) = measure_read_speed(__get_some_filepaths(output_folder))
+                seconds_per_file += output_seconds_per_file
+                if output_bytes_per_second > 0:
+                    bytes_per_second = min(bytes_per_second, output_bytes_per_second) if bytes_per_second > 0 else output_bytes_per_second
+
+    plan["seconds_per_file"] = seconds_per_file
+    plan["bytes_per_second"] = bytes_per_second
+
+    if plan["files_to_copy"] > 0:
+        estimated_seconds = plan["files_to_copy"] * seconds_per_file
+        if bytes_per_second > 0:
+            estimated_seconds += plan["bytes_to_copy"] / bytes_per_second
+    elif move_mode in ("C", "M"):
+        estimated_seconds = plan["renames"] * seconds_per_file
+    else:
+        estimated_seconds = plan["files"] * seconds_per_file # trash / delete only change the filesystem, not the files
+    plan["estimated_seconds"] = estimated_seconds
+
+    return plan
+
+
+def __get_some_filepaths(folderpath: str, max_files: int = 200) -> tuple[str, ...]:
+    """
+    returns up to max_files filepaths from folderpath and its subfolders, without going through all of them
+    """
+    filepaths: list[str] = list()
+
+    for path_to_file, _, sub_files in os.walk(folderpath):
+        filepaths.extend([os.path.abspath(path_to_file+"/"+sub_file) for sub_file in sub_files])
+        if len(filepaths) >= max_files:
+            break
+
+    return tuple(filepaths[:max_files])
+
+
+def plan_flattened_destinations(filelist: Filelist, output_folder, move_mode: str = "C") -> dict[str, tuple[str | None, int]]:
+    """
+    computes where every file in filelist will go when all files are dumped into output_folder (keep_folder_structure False),
+    before any file is copied/moved, so that the copy/move itself never runs into a filename conflict
+
+    output_folder is listed once to know which filenames are already taken.
+    files with the same filename are compared by size (from filelist) and then by hash, only if the sizes match,
+    identical files are not copied/moved again, other files get a new filename "name (n).ext"
+
+    returns a dict with the source filepaths as keys, values are a pair of
+    the destination filepath (None if the file is an identical duplicate and should not be copied/moved)
+    and the error number that move_file_error would have given for this file (-1 if there was no conflict)
+    """
+    assert (move_mode in ("C", "M")), "move_mode invalid for planning destinations"
+
+    output_folder = os.path.abspath(output_folder)
+
+    filesizes = filelist.get_filesizes()
+    filepaths = filelist.get_filepaths() # after get_filesizes() so that both are mapped to each other
+
+    # filenames already in output_folder, normcase so that case insensitive filesystems also get conflicts
+    existing_files: dict[str, os.DirEntry] = dict()
+    if os.path.exists(output_folder): # doesn't exist yet when only making a plan
+        existing_files = {os.path.normcase(entry.name): entry for entry in os.scandir(output_folder)}
+    taken_filenames: set[str] = set(existing_files.keys())
+
+    # files that were kept so far for each filename: list of (size, filepath, hash or None if not obtained yet)
+    kept_files_by_filename: dict[str, list[list]] = dict()
+    planned_destinations: dict[str, tuple[str | None, int]] = dict()
+
+    for index in range(len(filepaths)):
+        filepath = filepaths[index]
+        filesize = filesizes[index]
+        filename = os.path.basename(filepath)
+        filename_key = os.path.normcase(filename)
+
+        if filename_key not in kept_files_by_filename:
+            kept_files_by_filename[filename_key] = list()
+            existing_entry = existing_files.get(filename_key)
+            if existing_entry is not None and existing_entry.is_file():
+                kept_files_by_filename[filename_key].append([existing_entry.stat().st_size, existing_entry.path, None])
+
+        duplicate_found = False
+        for kept_file in kept_files_by_filename[filename_key]:
+            if kept_file[0] != filesize:
+                continue # can't be the same file
+            if kept_file[2] is None:
+                if kept_file[1] in planned_destinations:
+                    kept_file[2] = filelist.get_filehashes_of((kept_file[1],))[0]
+                else: # file that was already in output_folder
+                    try:
+                        kept_file[2] = get_file_hash(kept_file[1])
+                    except FileNotFoundError:
+                        kept_file[2] = ""
+            filehash = filelist.get_filehashes_of((filepath,))[0]
+            if filehash != "" and filehash == kept_file[2]:
+                duplicate_found = True
+                break
+
+        if duplicate_found:
+            # same as move_file_error, an identical copy already exists (or will exist) in output_folder
+            planned_destinations[filepath] = (None, 1 if move_mode == "M" else 0)
+            continue
+
+        new_filename = filename
+        error_number = -1
+        retry_count = 0
+        while os.path.normcase(new_filename) in taken_filenames:
+            new_filename = __numbered_filename(filename, retry_count)
+            error_number = 4 # file will be renamed to resolve conflict
+            retry_count += 1
+
+        taken_filenames.add(os.path.normcase(new_filename))
+        kept_files_by_filename[filename_key].append([filesize, filepath, None])
+        planned_destinations[filepath] = (os.path.join(output_folder, new_filename), error_number)
+
+    return planned_destinations
+
+
+def __numbered_filename(filename: str, number: int) -> str:
+    """
+    returns the filename with " (number)" added before the file extension
+    """
+    (name, extension) = os.path.splitext(filename)
 
-    return error_return
+    return "{} ({}){}".format(name, number, extension)
 
 
-def __move_files_unit_processor(filepaths: tuple[str, ...], input_folder, output_folder, unique_folders: set[str], move_mode: str, keep_folder_structure: bool):
+def __move_files_unit_processor(filepaths: tuple[str, ...], input_folder, output_folder, move_mode: str, keep_folder_structure: bool, planned_destinations: dict[str, tuple[str | None, int]] | None = None, copy_function = copy_file, catalog: ContentCatalog | None = None, catalog_action: str = "skip"):
     """
     multithreaded unit processor for move files
     do not use on its own
+
+    if planned_destinations is given (see plan_flattened_destinations), files are copied/moved to their planned
+    destination without checking if anything exists there first
+
+    copy_function is used to copy files, and by shutil.move when a file has to be copied to another drive
+
+    if catalog is given, files are looked up in it first (see __use_catalog), files that are copied are added to it
+
+    returns (results, number_of_files_processed, number_of_failed_files, total_processed_size, failed_files_size, removed_entry_counts),
+    results being one result per file for RunReport,
+    removed_entry_counts being the number of files that are no longer in each source folder
     """
     total_processed_size = 0
-    error_counts = [0 for _ in range(9999)] # I hope that I never have over 9999 possible error codes
+    results: list[tuple[str, str, int, float, int]] = list()
     number_of_files_processed = 0
     number_of_failed_files = 0
     failed_files_size = 0
+    removed_entry_counts: dict[str, int] = dict()
 
     for filepath in filepaths:
-        success = (-1, "") # reset to assume no problems happen
-        current_filesize = os.stat(filepath).st_size # bytes filesize
+        start_time = perf_counter()
+        error_number = -1 # reset to assume no problems happen
+        try:
+            current_filesize = os.stat(filepath).st_size # bytes filesize
+        except FileNotFoundError: # file was deleted, renamed or moved before it could be processed
+            results.append((filepath, move_mode, 0, perf_counter() - start_time, 6))
+            number_of_files_processed += 1
+            continue
         total_processed_size += current_filesize
 
         if keep_folder_structure and move_mode in ("C", "M"):
@@ -216,8 +583,14 @@ def __move_files_unit_processor(filepaths: tuple[str, ...], input_folder, output
         else:
             output_folder_path = output_folder
 
+        planned_destination = None
+        if planned_destinations is not None and filepath in planned_destinations:
+            planned_destination = planned_destinations[filepath]
+
         output_file_exists = True # assume this to get rid of unbound variable warning
-        if move_mode in ("C", "M"):
+        if planned_destination is not None:
+            pass # destination was planned ahead of time, nothing to check
+        elif move_mode in ("C", "M"):
             output_folder_exists = os.path.exists(output_folder_path)
             if not output_folder_exists:
                 try:
@@ -226,54 +599,210 @@ def __move_files_unit_processor(filepaths: tuple[str, ...], input_folder, output
                     assert (False), "destination folder didn't exist and couldn't be created"
             output_file_exists: bool = os.path.exists(os.path.abspath(output_folder_path+"/"+os.path.split(filepath)[1]))
 
+        catalog_error_number = None # the file still has to be copied/moved
+        catalog_hashes = ("", "")
+        destination_filepath = os.path.abspath(output_folder_path+"/"+os.path.split(filepath)[1])
+        if planned_destination is not None:
+            destination_filepath = planned_destination[0]
+
         try:
-            if move_mode == "C":
+            if catalog is not None and destination_filepath is not None:
+                # errors (like the file not being trashable) are counted for this file like any other
+                (catalog_error_number, *catalog_hashes) = __use_catalog(filepath, current_filesize, destination_filepath, move_mode, catalog, catalog_action)
+
+            if catalog_error_number is not None:
+                error_number = catalog_error_number
+            elif planned_destination is not None:
+                (destination_filepath, planned_error_number) = planned_destination
+                if destination_filepath is None:
+                    # identical file already exists (or will exist) in output_folder
+                    if move_mode == "M":
+                        send2trash(filepath)
+                elif move_mode == "C":
+                    copy_function(filepath, destination_filepath)
+                else:
+                    move(filepath, destination_filepath, copy_function=copy_function)
+                error_number = planned_error_number
+            elif move_mode == "C":
                 if not output_file_exists:
-                    copy2(filepath, output_folder_path)
+                    copy_function(filepath, output_folder_path)
                 else:
                     # if file already exists, check if it's the same file, etc
-                    success = move_file_error(filepath, output_folder_path, move_mode)
-                    error_counts[success[0]] += 1
+                    error_number = move_file_error(filepath, output_folder_path, move_mode, copy_function=copy_function)[0]
             elif move_mode == "M":
                 if not output_file_exists:
-                    move(filepath, output_folder_path)
+                    move(filepath, output_folder_path, copy_function=copy_function)
                 else:
                     # if file already exists, you can trash this copy
-                    success = move_file_error(filepath, output_folder_path, move_mode)
-                    error_counts[success[0]] += 1
+                    error_number = move_file_error(filepath, output_folder_path, move_mode, copy_function=copy_function)[0]
             elif move_mode == "T":
                 send2trash(filepath)
             elif move_mode == "D":
                 os.remove(filepath)
 
-            if move_mode in ("T", "D", "M"):
-                folderpath = os.path.dirname(filepath)
-                clean_subfolders(folderpath, unique_folders)
-
         except Error: # this shouldn't happen, and the line below will not be able to fix it
-            success = move_file_error(filepath, output_folder_path, move_mode)
-            error_counts[success[0]] += 1
+            error_number = move_file_error(filepath, output_folder_path, move_mode, copy_function=copy_function)[0]
         except FileNotFoundError: # file was deleted, renamed or moved before it could be processed
-            error_counts[6] += 1
+            error_number = 6
         except: # unknown error
-            error_counts[5] += 1
+            error_number = 5
         number_of_files_processed += 1
 
+        if catalog is not None and catalog_error_number is None and (error_number == -1 or planned_destination is not None) and error_number in (-1, 4):
+            catalog.add(destination_filepath, *catalog_hashes) # so that the next files with the same contents aren't copied either
+
+        if move_mode in ("M", "D") and error_number not in (0, 3, 5):
+            folderpath = os.path.dirname(filepath)
+            removed_entry_counts[folderpath] = removed_entry_counts.get(folderpath, 0) + 1
+
         # if there was a failure, update the progress accordingly
-        if success[0] in (0, 1, 3, 5):
+        if error_number in (0, 1, 3, 5):
             number_of_files_processed -= 1
             number_of_failed_files += 1
             total_processed_size -= current_filesize
             failed_files_size += current_filesize
 
-    return (error_counts, number_of_files_processed, number_of_failed_files, total_processed_size, failed_files_size)
+        results.append((filepath, move_mode, current_filesize, perf_counter() - start_time, error_number))
+
+    return (results, number_of_files_processed, number_of_failed_files, total_processed_size, failed_files_size, removed_entry_counts)
+
+
+def __use_catalog(filepath: str, filesize: int, destination_filepath: str, move_mode: str, catalog: ContentCatalog, catalog_action: str) -> tuple[int | None, str, str]:
+    """
+    looks filepath up in catalog (see ContentCatalog.find), if its contents are already in the catalog's folder:
+    catalog_action "skip" leaves it out (trashes it for move_mode "M"),
+    catalog_action "link" hardlinks the file of the catalog at destination_filepath (then trashes filepath for move_mode "M"),
+    only if nothing is there yet and both are on the same drive
+
+    returns (error number, partial hash, full hash), the error number being None if the file still has to be copied/moved,
+    the hashes being the ones find() obtained for filepath, to add the copy to the catalog
+    """
+    try:
+        (catalog_filepath, partial_hash, full_hash) = catalog.find(filepath, filesize)
+    except FileNotFoundError:
+        return (None, "", "") # handled when it is copied/moved
+    if catalog_filepath is None:
+        return (None, partial_hash, full_hash)
+
+    if catalog_action == "link":
+        if os.path.exists(destination_filepath):
+            return (None, partial_hash, full_hash) # filename conflict, dealt with like any other file
+        try:
+            os.makedirs(os.path.dirname(destination_filepath), exist_ok=True)
+            os.link(catalog_filepath, destination_filepath)
+        except OSError: # other drive, or links not supported, the file is copied instead
+            return (None, partial_hash, full_hash)
+        if move_mode == "M":
+            send2trash(filepath)
+        return (-1, partial_hash, full_hash)
+
+    # same as move_file_error, an identical copy already exists
+    if move_mode == "M":
+        send2trash(filepath)
+        return (1, partial_hash, full_hash)
+
+    return (0, partial_hash, full_hash)
 
 
-def move_file_error(filepath: str, destination_folder, move_mode: str = "C", max_retries = 100) -> tuple[int, str]:
+def __trash_files_unit_processor(filepaths: tuple[str, ...], fast_trash_object: FastTrash | None = None):
+    """
+    multithreaded unit processor for move files in trash mode
+    do not use on its own
+
+    files are sent to the trash one list per folder instead of one at a time,
+    or renamed into a trash folder on their own drive if fast_trash_object is given (one list per folder too, see FastTrash.trash_files).
+    emptied folders are not removed here, see remove_emptied_folders
+
+    returns the same as __move_files_unit_processor,
+    files trashed together in one list all get an equal share of the time the list took
+    """
+    results: list[tuple[str, str, int, float, int]] = list()
+    number_of_files_processed = 0
+    number_of_failed_files = 0
+    total_processed_size = 0
+    failed_files_size = 0
+    removed_entry_counts: dict[str, int] = dict()
+
+    filepaths_by_folder: dict[str, list[tuple[str, int]]] = dict()
+    for filepath in filepaths:
+        folderpath = os.path.dirname(filepath)
+        start_time = perf_counter()
+        try:
+            current_filesize = os.stat(filepath).st_size # bytes filesize
+        except FileNotFoundError: # file was deleted, renamed or moved before it could be processed
+            results.append((filepath, "T", 0, perf_counter() - start_time, 6))
+            number_of_files_processed += 1
+            removed_entry_counts[folderpath] = removed_entry_counts.get(folderpath, 0) + 1
+            continue
+        if folderpath not in filepaths_by_folder:
+            filepaths_by_folder[folderpath] = list()
+        filepaths_by_folder[folderpath].append((filepath, current_filesize))
+
+    for folderpath, folder_files in filepaths_by_folder.items():
+        number_of_failed_files_before_folder = number_of_failed_files
+        files_to_send2trash: list[tuple[str, int]] = list()
+        if fast_trash_object is None:
+            files_to_send2trash = folder_files
+        else:
+            # the whole folder at once, so the trash manifest is only put on the drive once
+            start_time = perf_counter()
+            outcomes = fast_trash_object.trash_files([filepath for filepath, _ in folder_files])
+            seconds_per_file = (perf_counter() - start_time) / len(folder_files)
+            for (filepath, current_filesize), error_number in zip(folder_files, outcomes):
+                if error_number is None:
+                    files_to_send2trash.append((filepath, current_filesize)) # no trash folder on this drive
+                    continue
+                if error_number == -1:
+                    number_of_files_processed += 1
+                    total_processed_size += current_filesize
+                elif error_number == 6: # file was deleted, renamed or moved before it could be processed
+                    number_of_files_processed += 1
+                else:
+                    number_of_failed_files += 1
+                    failed_files_size += current_filesize
+                results.append((filepath, "T", current_filesize, seconds_per_file, error_number))
+
+        if len(files_to_send2trash) > 0:
+            start_time = perf_counter()
+            try:
+                send2trash([filepath for filepath, _ in files_to_send2trash])
+                number_of_files_processed += len(files_to_send2trash)
+                total_processed_size += sum([current_filesize for _, current_filesize in files_to_send2trash])
+                seconds_per_file = (perf_counter() - start_time) / len(files_to_send2trash)
+                results.extend([(filepath, "T", current_filesize, seconds_per_file, -1) for filepath, current_filesize in files_to_send2trash])
+            except: # some file in the list failed, trash them one at a time to know which
+                seconds_per_file = (perf_counter() - start_time) / len(files_to_send2trash)
+                for filepath, current_filesize in files_to_send2trash:
+                    start_time = perf_counter()
+                    if not os.path.exists(filepath):
+                        # was trashed before the failure
+                        number_of_files_processed += 1
+                        total_processed_size += current_filesize
+                        results.append((filepath, "T", current_filesize, seconds_per_file, -1))
+                        continue
+                    try:
+                        send2trash(filepath)
+                        number_of_files_processed += 1
+                        total_processed_size += current_filesize
+                        results.append((filepath, "T", current_filesize, seconds_per_file + perf_counter() - start_time, -1))
+                    except: # unknown error
+                        number_of_failed_files += 1
+                        failed_files_size += current_filesize
+                        results.append((filepath, "T", current_filesize, seconds_per_file + perf_counter() - start_time, 5))
+
+        number_of_removed_files = len(folder_files) - (number_of_failed_files - number_of_failed_files_before_folder)
+        removed_entry_counts[folderpath] = removed_entry_counts.get(folderpath, 0) + number_of_removed_files
+
+    return (results, number_of_files_processed, number_of_failed_files, total_processed_size, failed_files_size, removed_entry_counts)
+
+
+def move_file_error(filepath: str, destination_folder, move_mode: str = "C", max_retries = 100, copy_function = copy_file) -> tuple[int, str]:
     """
     deals with errors in copying a file.
     it's probably just that the destination already has the filename
 
+    copy_function is used to copy the file if it gets a new filename
+
     returns a pair of error number and accompanying string to explain the error
     """
     assert (move_mode in ("C", "M")), "move_mode invalid for error handling"
@@ -344,9 +873,9 @@ def move_file_error(filepath: str, destination_folder, move_mode: str = "C", max
         # so we use new_filename to copy/move the source file
         try:
             if move_mode == "C":
-                copy2(filepath, os.path.abspath(destination_folder+"/"+new_filename)) # this is guaranteed not to overwrite a file
+                copy_function(filepath, os.path.abspath(destination_folder+"/"+new_filename)) # this is guaranteed not to overwrite a file
             else:
-                move(filepath, os.path.abspath(destination_folder+"/"+new_filename)) # this is guaranteed not to overwrite a file
+                move(filepath, os.path.abspath(destination_folder+"/"+new_filename), copy_function=copy_function) # this is guaranteed not to overwrite a file
             return errors[4] # error was resolved
         except Error:
             # couldn't resolve the issue for some reason
@@ -359,21 +888,132 @@ def move_file_error(filepath: str, destination_folder, move_mode: str = "C", max
 
 def main() -> None:
     start_time = time()
-    (get_file_extensions_or_run_program, input_folder, output_folder, file_extensions, file_starts, move_mode, permanent_delete_confirmed, keep_folder_structure, min_filesize, max_filesize) = parse_inputs()
+    (get_file_extensions_or_run_program, input_folder, output_folder, file_extensions, file_starts, move_mode, permanent_delete_confirmed, keep_folder_structure, min_filesize, max_filesize, fast_trash, plan, report_filepath, copy_block_size, archive_compression, max_archive_size, manifest_filepath, link_method, keep_rules, catalog_filepath, catalog_action, average_chunk_size, verify_copies, parallel_file_size) = parse_inputs()
     assert (os.path.exists(input_folder)), "input folder does not exist"
+    if output_folder is not None and len(output_folder) == 1:
+        output_folder = output_folder[0]
+    elif output_folder is not None and len(output_folder) == 0:
+        output_folder = None
 
     if get_file_extensions_or_run_program: # True means get file extensions
         filelist = Filelist(input_folder)
         [print(extension, end=" ") for extension in filelist.get_file_extensions()]
         print("") # add a newline after the list
 
+    elif move_mode == "R":
+        (restored_count, failed_count) = restore_trashed_files(input_folder)
+        print("{} files restored, {} files could not be restored".format(restored_count, failed_count))
+
+    elif move_mode == "H":
+        assert (manifest_filepath is not None), "manifest path must be given with --manifest or -mf"
+        filelist = Filelist(input_folder, tuple(file_extensions), tuple(file_starts), min_filesize, max_filesize)
+        (hashed_count, failed_count) = write_manifest(filelist, input_folder, manifest_filepath)
+        print("{} files written to \"{}\", {} files could not be read".format(hashed_count, manifest_filepath, failed_count))
+
+    elif move_mode == "V":
+        assert (manifest_filepath is not None), "manifest path must be given with --manifest or -mf"
+        counts = verify_manifest(manifest_filepath, input_folder, report_filepath)
+        print("{ok} files OK, {corrupt} corrupt, {unreadable} could not be read, {missing} missing, {extra} not in the manifest, {invalid_lines} invalid manifest lines".format(**counts))
+        if report_filepath is not None:
+            print("problems written to \"{}\"".format(report_filepath))
+
+    elif move_mode == "L":
+        assert (not isinstance(output_folder, list)), "duplicates can only be linked between two folders"
+        filelist = Filelist(input_folder, tuple(file_extensions), tuple(file_starts), min_filesize, max_filesize)
+        if output_folder is not None:
+            duplicate_groups = [(filesize, input_filepaths + output_filepaths) for filesize, input_filepaths, output_filepaths
+                                in filelist.get_duplicates_with(Filelist(output_folder, tuple(file_extensions), tuple(file_starts), min_filesize, max_filesize))]
+        else:
+            duplicate_groups = list(filelist.get_duplicates())
+        print("{} groups of duplicate files ({} files)".format(len(duplicate_groups), sum([len(group_filepaths) for _, group_filepaths in duplicate_groups])))
+        if not plan:
+            (replaced_count, failed_count, bytes_reclaimed, results) = reclaim_duplicates(duplicate_groups, link_method, tuple(keep_rules), input_folder)
+            run_report = RunReport(report_filepath)
+            run_report.add_results(results)
+            run_report.close()
+            print("{} files replaced by links, {} files could not be replaced, {} bytes freed".format(replaced_count, failed_count, bytes_reclaimed))
+            if report_filepath is not None:
+                print("report written to \"{}\"".format(report_filepath))
+
+    elif move_mode == "F":
+        root_folders = [input_folder] + (output_folder if isinstance(output_folder, list) else [output_folder] if output_folder is not None else [])
+        root_folders = tuple([os.path.abspath(root_folder) for root_folder in root_folders])
+        filepaths_by_root = tuple([Filelist(root_folder, tuple(file_extensions), tuple(file_starts), min_filesize, max_filesize).get_filepaths() for root_folder in root_folders])
+        duplicate_report = DuplicateReport(report_filepath, root_folders) if report_filepath is not None else None
+        for filesize, group_filepaths_by_root in iterate_duplicate_files_in_roots(filepaths_by_root, root_folders):
+            if duplicate_report is not None: # written as soon as each group is found
+                duplicate_report.add_group(filesize, group_filepaths_by_root)
+        if duplicate_report is not None:
+            duplicate_report.close()
+            print("{} groups of duplicates ({} files) written to \"{}\"".format(*duplicate_report.get_counts(), report_filepath))
+
+    elif move_mode == "K":
+        if catalog_filepath is None:
+            catalog_filepath = os.path.join(input_folder, CATALOG_FILENAME)
+        catalog = ContentCatalog(catalog_filepath, input_folder)
+        (_, _, number_of_files) = catalog.update()
+        catalog.close()
+        print("{} files in the catalog \"{}\"".format(number_of_files, catalog_filepath))
+
+    elif move_mode == "B":
+        assert (output_folder is not None and not isinstance(output_folder, list)), "one output folder must be given for the chunk store"
+        filelist = Filelist(input_folder, tuple(file_extensions), tuple(file_starts), min_filesize, max_filesize)
+        assert (not filelist.is_archive()), "files in an archive can't be backed up into a chunk store"
+        filesizes = filelist.get_filesizes()
+        (backed_up_count, failed_count, results, stats) = backup_files(filelist.get_filepaths(), input_folder, output_folder, filesizes, average_chunk_size)
+        run_report = RunReport(report_filepath)
+        run_report.add_results(results)
+        run_report.close()
+        print("{} files backed up, {} files could not be backed up".format(backed_up_count, failed_count))
+        print("{bytes} bytes in {chunks} chunks, {new_chunks} new chunks ({new_bytes} bytes) stored, dedupe ratio {dedupe_ratio:.2f}, {megabytes_per_second:.2f} MB/s".format(**stats))
+
+    elif move_mode == "X":
+        assert (output_folder is not None and not isinstance(output_folder, list)), "one output folder must be given to restore into"
+        (restored_count, failed_count, results) = restore_files(input_folder, output_folder)
+        run_report = RunReport(report_filepath)
+        run_report.add_results(results)
+        run_report.close()
+        print("{} files restored, {} files could not be restored".format(restored_count, failed_count))
+
+    elif move_mode == "E":
+        assert (output_folder is not None and not isinstance(output_folder, list)), "one output folder must be given to compare with"
+        filelist_a = Filelist(input_folder, tuple(file_extensions), tuple(file_starts), min_filesize, max_filesize)
+        filelist_b = Filelist(output_folder, tuple(file_extensions), tuple(file_starts), min_filesize, max_filesize)
+        (relative_filepaths, stats) = compare_filelists(filelist_a, filelist_b)
+        print("{} files only in \"{}\", {} files only in \"{}\", {} files the same, {} files differing".format(len(relative_filepaths["only_in_a"]), input_folder, len(relative_filepaths["only_in_b"]), output_folder, len(relative_filepaths["same"]), len(relative_filepaths["differing"])))
+        print("{differing_size} differing by size, {same_inode} same file, {differing_partial_hash} differing by partial hash ({partial_bytes_read} bytes read), {differing_full_hash} differing by full hash, {same_full_hash} same full hash, {unreadable} could not be read".format(**stats))
+        if report_filepath is not None:
+            # like the report of operation V, one line per file that isn't the same
+            with open(report_filepath, "w", encoding="utf-8") as report_file:
+                for key, problem in (("only_in_a", "ONLY IN A"), ("only_in_b", "ONLY IN B"), ("differing", "DIFFERENT")):
+                    for relative_filepath in relative_filepaths[key]:
+                        report_file.write("{}: {}\n".format(relative_filepath, problem))
+            print("differences written to \"{}\"".format(report_filepath))
+
+    elif plan:
+        assert (move_mode in ("C", "M", "T", "D", "A")), "operation type invalid or not given"
+        assert (not isinstance(output_folder, list)), "plan can only be made for one output folder"
+        plan_results = plan_move_files(input_folder, output_folder, tuple(file_extensions), tuple(file_starts), min_filesize, max_filesize, move_mode, keep_folder_structure)
+        print("{} files ({} bytes) found".format(plan_results["files"], plan_results["bytes"]))
+        if move_mode in ("C", "M"):
+            print("{} filename conflicts, {} identical files that won't be copied/moved".format(plan_results["conflicts"], plan_results["identical_duplicates"]))
+            print("{} files moved within the same drive".format(plan_results["renames"]))
+            print("{} files ({} bytes) to copy".format(plan_results["files_to_copy"], plan_results["bytes_to_copy"]))
+        elif move_mode == "A":
+            print("{} files ({} bytes) to archive".format(plan_results["files_to_copy"], plan_results["bytes_to_copy"]))
+        print("measured {:.2e} seconds per file, {:.2f} MB/s".format(plan_results["seconds_per_file"], plan_results["bytes_per_second"] / 10**6))
+        print("estimated time: {}".format(seconds_to_time(plan_results["estimated_seconds"])))
+
     else:
-        assert (move_mode in ("C", "M", "T", "D")), "operation type invalid or not given"
+        assert (move_mode in ("C", "M", "T", "D", "A")), "operation type invalid or not given"
         assert (move_mode != "D" or permanent_delete_confirmed), "permanent deletion must be confirmed with --confirm_permanent_delete or -cpd"
         file_extensions = tuple(file_extensions)
         file_starts = tuple(file_starts)
 
-        print("\n\nerrors: " + str(move_files(input_folder, output_folder, file_extensions, file_starts, min_filesize, max_filesize, move_mode, keep_folder_structure)))
+        if isinstance(output_folder, list):
+            output_folder = tuple(output_folder)
+
+        print("\n\nerrors: " + str(move_files(input_folder, output_folder, file_extensions, file_starts, min_filesize, max_filesize, move_mode, keep_folder_structure, fast_trash=fast_trash, report_filepath=report_filepath, copy_block_size=copy_block_size, archive_compression=archive_compression, max_archive_size=max_archive_size, catalog_filepath=catalog_filepath, catalog_action=catalog_action, verify_copies=verify_copies, parallel_file_size=parallel_file_size)))
 
     print("{} seconds to run".format(time() - start_time))
     return None
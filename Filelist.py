@@ -1,6 +1,7 @@
 import os
 from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait
 import hashlib
+from archive_input import is_archive, get_archive_members, get_archive_filepath, get_member_name, get_member_hashes
 
 class Filelist():
     """
@@ -11,6 +12,9 @@ class Filelist():
     Filelist only obtains information from the filesystem (I/O bottlenecked operations) when it is requested.
     However, once information has been obtained, it is saved so that if it is requested again it can be returned instantly.
     Therefore, creating a filelist object is extremely fast, but obtaining the list of filepaths for the first time is I/O bottlenecked.
+
+    input_folder can also be a tar or zip archive, which is then treated as a folder: its files are listed from the archive's index
+    (with filepaths like input_folder/path/inside/archive) and nothing is extracted, see archive_input.
     """
     DEFAULT_MAX_FILESIZE = 2**126
     FILES_PER_MULTITHREADED_COMPUTE_GROUP = 100000 # for compute bound groups
@@ -37,10 +41,16 @@ class Filelist():
 
         self.__filepaths: tuple[str, ...] = tuple() # full (absolute) filepath strings
         self.__filesizes: tuple[int, ...] = tuple() # number of bytes, maps 1:1 with filepaths
+        self.__inodes: tuple[tuple[int, int], ...] = tuple() # pairs of (st_dev, st_ino), maps 1:1 with filepaths, (0, 0) for archive members
         self.__subfolders: tuple[str, ...] = tuple() # full (absolute) folderpath strings for all subfolders of input_folder
         self.__filehashes: tuple[str, ...] = tuple() # sha256 hashes of each of the files (entire file)
+        self.__filehashes_by_filepath: dict[str, str] = dict() # sha256 hashes of only some of the files, obtained on demand
         self.__file_extensions_found: tuple[str, ...] = tuple() # all the unique file extensions found in filepaths
         self.__folder_has_files: bool | None = None # None until known
+        self.__is_archive: bool = is_archive(self.__input_folder)
+        self.__archive_filesizes: dict[str, int] = dict() # sizes from the archive's index, only used if input_folder is an archive
+        self.__duplicates: tuple[tuple[int, tuple[str, ...]], ...] | None = None # None until known
+        self.__duplicates_with: dict[Filelist, tuple[tuple[int, tuple[str, ...], tuple[str, ...]], ...]] = dict() # keys are the other Filelist
 
         return None
 
@@ -54,7 +64,13 @@ class Filelist():
 
         files: list[str] = list()
 
-        for path_to_file, _, sub_files in os.walk(self.__input_folder):
+        if self.__is_archive:
+            for member_name, member_size in get_archive_members(self.__input_folder):
+                filepath = get_archive_filepath(self.__input_folder, member_name)
+                files.append(filepath)
+                self.__archive_filesizes[filepath] = member_size
+
+        for path_to_file, _, sub_files in os.walk(self.__input_folder): # does nothing if input_folder is an archive
             files.extend([os.path.abspath(path_to_file+"/"+sub_file) for sub_file in sub_files])
 
         self.__filepaths = tuple(files)
@@ -69,7 +85,7 @@ class Filelist():
 
     def __create_size_list(self) -> None:
         """
-        populates self.__filesizes
+        populates self.__filesizes and self.__inodes
 
         if any files no longer exist (fail to obtain size), they will be removed from filelist
         """
@@ -79,19 +95,30 @@ class Filelist():
         self.__create_filelist()
 
         filesizes: list[int] = list()
+        inodes: list[tuple[int, int]] = list()
         indices_to_remove: list[int] = list()
 
         for index in range(len(self.__filepaths)):
             filepath = self.__filepaths[index]
+            if self.__is_archive:
+                if filepath in self.__archive_filesizes:
+                    filesizes.append(self.__archive_filesizes[filepath])
+                    inodes.append((0, 0))
+                else:
+                    indices_to_remove.append(index)
+                continue
             try:
-                filesizes.append(os.stat(filepath).st_size)
+                file_stat = os.stat(filepath)
+                filesizes.append(file_stat.st_size)
+                inodes.append((file_stat.st_dev, file_stat.st_ino))
             except:
                 # os.stat failed, file is no longer accessible
                 indices_to_remove.append(index)
 
         self.__filepaths = tuple([self.__filepaths[index] for index in range(len(self.__filepaths)) if index not in indices_to_remove])
         self.__filesizes = tuple(filesizes)
-        # these two are now mapped to each other and of the same length
+        self.__inodes = tuple(inodes)
+        # these three are now mapped to each other and of the same length
 
         return None
 
@@ -108,6 +135,15 @@ class Filelist():
 
         folders: list[str] = list()
 
+        if self.__is_archive:
+            archive_folders: set[str] = set()
+            for member_name, _ in get_archive_members(self.__input_folder):
+                member_folder = member_name.rpartition("/")[0]
+                while member_folder != "" and member_folder not in archive_folders:
+                    archive_folders.add(member_folder)
+                    member_folder = member_folder.rpartition("/")[0]
+            folders.extend([get_archive_filepath(self.__input_folder, member_folder) for member_folder in sorted(archive_folders)])
+
         for path_to_file, sub_folders, _ in os.walk(self.__input_folder):
             folders.extend([os.path.abspath(path_to_file+"/"+sub_folder) for sub_folder in sub_folders])
 
@@ -142,7 +178,7 @@ class Filelist():
         for filepath in self.__filepaths:
             filename = os.path.basename(filepath)
             if filename.startswith(self.__start_with):
-                new_filepaths.append(filename)
+                new_filepaths.append(filepath)
 
         self.__filepaths = tuple(new_filepaths)
 
@@ -163,8 +199,11 @@ class Filelist():
 
         indices_to_keep: list[int] = [index for index in range(len(self.__filepaths)) if (self.__filesizes[index] >= self.__min_filesize and self.__filesizes[index] <= self.__max_filesize)]
 
-        self.__filepaths = tuple([self.__filepaths[index] for index in range(len(self.__filepaths)) if index in indices_to_keep])
-        self.__filesizes = tuple([self.__filesizes[index] for index in range(len(self.__filepaths)) if index in indices_to_keep])
+        indices_to_keep_set = set(indices_to_keep)
+        # all three are filtered with the same indices so that they stay mapped to each other
+        self.__filesizes = tuple([self.__filesizes[index] for index in range(len(self.__filepaths)) if index in indices_to_keep_set])
+        self.__inodes = tuple([self.__inodes[index] for index in range(len(self.__filepaths)) if index in indices_to_keep_set])
+        self.__filepaths = tuple([self.__filepaths[index] for index in range(len(self.__filepaths)) if index in indices_to_keep_set])
 
         return None
 
@@ -194,8 +233,11 @@ class Filelist():
             wait(threads)
             [indices_to_keep.extend(thread.result()) for thread in threads]
 
-        self.__filepaths = tuple([self.__filepaths[index] for index in range(len(self.__filepaths)) if index in indices_to_keep])
-        self.__filesizes = tuple([self.__filesizes[index] for index in range(len(self.__filepaths)) if index in indices_to_keep])
+        indices_to_keep_set = set(indices_to_keep)
+        # all three are filtered with the same indices so that they stay mapped to each other
+        self.__filesizes = tuple([self.__filesizes[index] for index in range(len(self.__filepaths)) if index in indices_to_keep_set])
+        self.__inodes = tuple([self.__inodes[index] for index in range(len(self.__filepaths)) if index in indices_to_keep_set])
+        self.__filepaths = tuple([self.__filepaths[index] for index in range(len(self.__filepaths)) if index in indices_to_keep_set])
 
         return None
 
@@ -205,27 +247,25 @@ class Filelist():
         gets the hash (sha256) of a file
         default buffer size of 16MiB
 
+        files of an archive are hashed together instead, see __get_member_hashes
+
         may raise FileNotFoundError
         """
-        if not os.path.exists(file):
-            raise FileNotFoundError # to be handled by caller
+        return get_file_hash(file, buffer_chunk_size, only_read_one_chunk)
 
-        sha256 = hashlib.sha256()
 
-        try:
-            with open(file, 'rb') as f:
-                while True:
-                    chunk = f.read(buffer_chunk_size)
-                    if not chunk: # if chunk is empty due to reaching the end of the file
-                        break
-                    sha256.update(chunk)
-                    if only_read_one_chunk:
-                        break
-        except Exception as e:
-            print("EXCEPTION when reading file in Filelist.__get_hash():\n{}".format(e))
-            return ""
+    def __get_member_hashes(self, filepaths: tuple[str, ...], buffer_chunk_size: int = 16*1024*1024) -> tuple[str, ...]:
+        """
+        gets the hashes (sha256) of files of an archive (see get_member_hashes), mapped 1:1 with filepaths,
+        an empty string for a file that is not in the archive
+        """
+        if len(filepaths) == 0:
+            return ()
 
-        return sha256.hexdigest()
+        member_names = tuple([get_member_name(self.__input_folder, filepath) for filepath in filepaths])
+        hashes = get_member_hashes(self.__input_folder, member_names, buffer_chunk_size)
+
+        return tuple([hashes.get(member_name, "") for member_name in member_names])
 
 
     def __create_filehash_list(self, buffer_chunk_size: int = 16*1024*1024, only_read_one_chunk: bool = False) -> None:
@@ -237,6 +277,11 @@ class Filelist():
         if len(self.__filehashes) == 0:
             return None # filehashes have already been gotten
 
+        if self.__is_archive:
+            # one pass through the archive for all of the files
+            self.__filehashes = self.__get_member_hashes(self.__filepaths, buffer_chunk_size)
+            return None
+
         file_hashes = list()
 
         for filepath in self.__filepaths:
@@ -251,6 +296,77 @@ class Filelist():
         return None
 
 
+    def __create_filehash_dict(self) -> None:
+        """
+        populates self.__filehashes_by_filepath with the hashes of every file if they were all obtained already
+        """
+        if len(self.__filehashes) != 0 and len(self.__filehashes_by_filepath) == 0:
+            # all hashes were already obtained, reuse them
+            self.__filehashes_by_filepath = dict(zip(self.__filepaths, self.__filehashes))
+
+        return None
+
+
+    def __find_duplicates(self, filelists: tuple["Filelist", ...], files_per_group: int, compare_group_size: int) -> list[tuple[int, tuple[tuple[str, ...], ...]]]:
+        """
+        finds the identical files among the files of filelists (see DuplicateFinder), with the sizes, inodes and hashes they already have,
+        the full hashes obtained along the way are kept in the Filelist each file comes from.
+        a filepath that is in several of the filelists is only in the first one of them
+
+        returns a list of pairs of (filesize, filepaths of each Filelist), filepaths including every hardlink of each file
+        """
+        from duplicate_finder import DuplicateFinder # imported here, duplicate_finder imports Filelist
+
+        filepaths: list[str] = list()
+        filesizes: list[int] = list()
+        inodes: list[tuple[int, int]] = list()
+        known_hashes: dict[int, str] = dict()
+        filelist_starts: list[int] = list() # index of the first file of each Filelist
+        filepaths_seen: set[str] = set()
+        for filelist in filelists:
+            assert (not filelist.__is_archive), "duplicates can't be found inside of an archive"
+            filelist.__create_size_list()
+            filelist.__create_filehash_dict()
+            filelist_starts.append(len(filepaths))
+            for filepath, filesize, inode in zip(filelist.__filepaths, filelist.__filesizes, filelist.__inodes):
+                if filepath in filepaths_seen:
+                    continue
+                filepaths_seen.add(filepath)
+                filehash = filelist.__filehashes_by_filepath.get(filepath, "")
+                if filehash != "":
+                    known_hashes[len(filepaths)] = filehash
+                filepaths.append(filepath)
+                filesizes.append(filesize)
+                inodes.append(inode)
+        filepaths_seen = set() # free the memory before finding duplicates
+        filelist_starts.append(len(filepaths))
+
+        duplicate_finder = DuplicateFinder(tuple(filepaths), tuple(filesizes), files_per_group, compare_group_size=compare_group_size, inodes=tuple(inodes), known_hashes=known_hashes)
+        duplicate_groups = duplicate_finder.find()
+
+        # keep every hash, so that the next query doesn't read those files again
+        filelist_index = 0
+        for file_id in sorted(known_hashes):
+            while file_id >= filelist_starts[filelist_index + 1]:
+                filelist_index += 1
+            filelists[filelist_index].__filehashes_by_filepath[filepaths[file_id]] = known_hashes[file_id]
+
+        duplicates: list[tuple[int, tuple[tuple[str, ...], ...]]] = list()
+        for filesize, file_ids in duplicate_groups:
+            all_file_ids = sorted([linked_file_id for file_id in file_ids for linked_file_id in (file_id,) + duplicate_finder.get_links(file_id)])
+            duplicates.append((filesize, tuple([tuple([filepaths[file_id] for file_id in all_file_ids if filelist_starts[filelist_index] <= file_id < filelist_starts[filelist_index + 1]])
+                                                for filelist_index in range(len(filelists))])))
+
+        return duplicates
+
+
+    def get_input_folder(self) -> str:
+        """
+        returns the absolute path of the folder (or archive) the files are in
+        """
+        return self.__input_folder
+
+
     def get_filepaths(self) -> tuple[str, ...]:
         """
         returns the list (well, a tuple) of filepaths
@@ -270,6 +386,16 @@ class Filelist():
         return self.__filesizes
 
 
+    def get_inodes(self) -> tuple[tuple[int, int], ...]:
+        """
+        returns the list (well, a tuple) of pairs of (st_dev, st_ino) of the files, files with the same pair are hardlinks of each other.
+        this is mapped to the tuple of filepaths from get_filepaths(), archive members are all (0, 0)
+        """
+        self.__create_size_list()
+
+        return self.__inodes
+
+
     def get_file_extensions_singlethreaded(self) -> tuple[str, ...]:
         """
         returns a tuple of all unique file extensions
@@ -341,6 +467,10 @@ class Filelist():
 
         # otherwise we aren't sure, so we check
 
+        if self.__is_archive:
+            self.__folder_has_files = len(get_archive_members(self.__input_folder)) > 0
+            return self.__folder_has_files
+
         for _, _, sub_files in os.walk(self.__input_folder):
             if len(sub_files) > 0:
                 self.__folder_has_files = True
@@ -360,6 +490,13 @@ class Filelist():
         return self.__subfolders
 
 
+    def is_archive(self) -> bool:
+        """
+        returns True if the input folder is a tar or zip archive
+        """
+        return self.__is_archive
+
+
     def get_filehashes(self) -> tuple[str, ...]:
         """
         returns a tuple of the sha256 hashes of all of the files of the input path
@@ -369,6 +506,96 @@ class Filelist():
         return self.__filehashes
 
 
+    def get_filehashes_of(self, filepaths: tuple[str, ...]) -> tuple[str, ...]:
+        """
+        returns a tuple of the sha256 hashes of only the given filepaths (which should come from get_filepaths()),
+        mapped 1:1 with the filepaths given
+
+        only hashes files whose hash has not been obtained yet, so that callers which only need a few hashes
+        (for example to compare files that have the same size) don't have to read every file in the Filelist
+
+        a file that could not be read has an empty string as its hash
+        """
+        assert (isinstance(filepaths, tuple)), "filepaths was not a tuple"
+
+        self.__create_filehash_dict()
+
+        if self.__is_archive:
+            # one pass through the archive for all of the files not hashed yet
+            filepaths_to_hash = tuple(set([filepath for filepath in filepaths if filepath not in self.__filehashes_by_filepath]))
+            self.__filehashes_by_filepath.update(zip(filepaths_to_hash, self.__get_member_hashes(filepaths_to_hash)))
+
+        for filepath in filepaths:
+            if filepath in self.__filehashes_by_filepath:
+                continue # we have already hashed this file
+            try:
+                self.__filehashes_by_filepath[filepath] = self.__get_hash(filepath)
+            except FileNotFoundError:
+                self.__filehashes_by_filepath[filepath] = ""
+
+        return tuple([self.__filehashes_by_filepath[filepath] for filepath in filepaths])
+
+
+    def get_duplicates(self, files_per_group: int = FILES_PER_MULTITHREADED_IO_GROUP, compare_group_size: int = 3) -> tuple[tuple[int, tuple[str, ...]], ...]:
+        """
+        returns a tuple of the groups of identical files, each being a pair of (filesize, filepaths), filepaths including every hardlink of each file.
+        files that are only hardlinks of each other are not duplicates, they already take the space of one file
+
+        sizes, inodes and hashes that were already obtained are reused instead of reading the files again (see DuplicateFinder),
+        and the hashes obtained are kept (see get_filehashes_of). the result is kept too, so asking again costs nothing
+        """
+        if self.__duplicates is None:
+            self.__duplicates = tuple([(filesize, filepaths_by_filelist[0]) for filesize, filepaths_by_filelist in self.__find_duplicates((self,), files_per_group, compare_group_size)])
+
+        return self.__duplicates
+
+
+    def get_duplicates_with(self, other_filelist: "Filelist", files_per_group: int = FILES_PER_MULTITHREADED_IO_GROUP, compare_group_size: int = 3) -> tuple[tuple[int, tuple[str, ...], tuple[str, ...]], ...]:
+        """
+        same as get_duplicates() for the files of this Filelist and other_filelist together,
+        returns a tuple of (filesize, filepaths in this Filelist, filepaths in other_filelist), either of them can be empty.
+        filepaths that are in both Filelists (one folder inside of the other) are only in this one
+
+        the hashes obtained are kept in the Filelist each file comes from, the result is kept in this one
+        """
+        assert (isinstance(other_filelist, Filelist)), "other_filelist was not a Filelist"
+
+        if other_filelist not in self.__duplicates_with:
+            self.__duplicates_with[other_filelist] = tuple([(filesize, filepaths_by_filelist[0], filepaths_by_filelist[1]) for filesize, filepaths_by_filelist in self.__find_duplicates((self, other_filelist), files_per_group, compare_group_size)])
+
+        return self.__duplicates_with[other_filelist]
+
+
+
+def get_file_hash(file, buffer_chunk_size: int = 16*1024*1024, only_read_one_chunk: bool = False) -> str:
+    """
+    gets the hash (sha256) of a file
+    default buffer size of 16MiB
+
+    returns an empty string if the file could not be read
+
+    may raise FileNotFoundError
+    """
+    if not os.path.exists(file):
+        raise FileNotFoundError # to be handled by caller
+
+    sha256 = hashlib.sha256()
+
+    try:
+        with open(file, 'rb') as f:
+            while True:
+                chunk = f.read(buffer_chunk_size)
+                if not chunk: # if chunk is empty due to reaching the end of the file
+                    break
+                sha256.update(chunk)
+                if only_read_one_chunk:
+                    break
+    except Exception as e:
+        print("EXCEPTION when reading file in get_file_hash():\n{}".format(e))
+        return ""
+
+    return sha256.hexdigest()
+
 
 def get_file_extensions_singlethreaded(filelist: Filelist, start_index: int, stop_index: int) -> set[str]:
     """
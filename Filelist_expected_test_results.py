@@ -38,14 +38,14 @@ EXPECTED_TEST_RESULTS: list[list[object]] = [
         ()
     ],
     [
-        ('file1.png', 'file1.png', 'file11.qoi'),
-        ('file1.png', 'file1.png', 'file11.qoi'),
+        ('/home/d3zyre/Documents/GitHub/Copy-All-Files-From-Folder/FILELIST_TESTING/test2/file1.png', '/home/d3zyre/Documents/GitHub/Copy-All-Files-From-Folder/FILELIST_TESTING/test1/file1.png', '/home/d3zyre/Documents/GitHub/Copy-All-Files-From-Folder/FILELIST_TESTING/test1/test11/file11.qoi'),
+        ('/home/d3zyre/Documents/GitHub/Copy-All-Files-From-Folder/FILELIST_TESTING/test2/file1.png', '/home/d3zyre/Documents/GitHub/Copy-All-Files-From-Folder/FILELIST_TESTING/test1/file1.png', '/home/d3zyre/Documents/GitHub/Copy-All-Files-From-Folder/FILELIST_TESTING/test1/test11/file11.qoi'),
         ('.qoi', '.png'),
         ('.qoi', '.png'),
         ('.qoi', '.png'),
-        (),
-        (),
-        (),
+        (1048576, 1048576, 1048576),
+        (1048576, 1048576, 1048576),
+        (1048576, 1048576, 1048576),
         True,
         True,
         True,
@@ -57,14 +57,14 @@ EXPECTED_TEST_RESULTS: list[list[object]] = [
         ()
     ],
     [
-        ('file1.png', 'file1.png'),
-        ('file1.png', 'file1.png'),
+        ('/home/d3zyre/Documents/GitHub/Copy-All-Files-From-Folder/FILELIST_TESTING/test2/file1.png', '/home/d3zyre/Documents/GitHub/Copy-All-Files-From-Folder/FILELIST_TESTING/test1/file1.png'),
+        ('/home/d3zyre/Documents/GitHub/Copy-All-Files-From-Folder/FILELIST_TESTING/test2/file1.png', '/home/d3zyre/Documents/GitHub/Copy-All-Files-From-Folder/FILELIST_TESTING/test1/file1.png'),
         ('.png',),
         ('.png',),
         ('.png',),
-        (),
-        (),
-        (),
+        (1048576, 1048576),
+        (1048576, 1048576),
+        (1048576, 1048576),
         True,
         True,
         True,
@@ -190,20 +190,20 @@ EXPECTED_TEST_RESULTS: list[list[object]] = [
         ()
     ],
     [
-        (),
-        (),
-        (),
-        (),
-        (),
-        (),
-        (),
-        (),
+        ('/home/d3zyre/Documents/GitHub/Copy-All-Files-From-Folder/FILELIST_TESTING/test2/file1.png', '/home/d3zyre/Documents/GitHub/Copy-All-Files-From-Folder/FILELIST_TESTING/test1/file1.png'),
+        ('/home/d3zyre/Documents/GitHub/Copy-All-Files-From-Folder/FILELIST_TESTING/test2/file1.png', '/home/d3zyre/Documents/GitHub/Copy-All-Files-From-Folder/FILELIST_TESTING/test1/file1.png'),
+        ('.png',),
+        ('.png',),
+        ('.png',),
+        (1048576, 1048576),
+        (1048576, 1048576),
+        (1048576, 1048576),
         True,
         True,
         True,
-        (),
-        (),
-        (),
+        ('.png',),
+        ('.png',),
+        ('.png',),
         (),
         (),
         ()
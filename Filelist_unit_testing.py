@@ -1,9 +1,35 @@
 import unittest
 from time import time
 from copy import deepcopy
-from Filelist import Filelist
+from Filelist import Filelist, get_file_hash
 import os
 from pprint import pprint
+from tree_diff import compare_filelists
+import csv
+import hashlib
+from duplicate_report import DuplicateReport
+import random
+from duplicate_finder import DuplicateFinder, get_sample_ranges, get_sampled_hash, compare_files_in_lockstep
+from fan_out_copy import fan_out_copy_files
+from archive_output import archive_files, extract_archived_file
+from checksum_manifest import write_manifest, verify_manifest, parse_manifest_line
+from file_copy import copy_file, copy_file_in_ranges, copy_large_file, is_sparse_file, get_data_ranges
+from duplicate_reclaimer import reclaim_duplicates
+import shutil
+from fast_trash import FastTrash, restore_trashed_files
+import json
+from chunk_store import backup_files, restore_files, get_chunk_filepath
+from content_catalog import ContentCatalog, CATALOG_FILENAME
+from file_folder_getters import get_folders_to_clean, count_folder_entries, remove_emptied_folders, get_duplicate_files, get_duplicate_files_in_roots
+from fast_delete import delete_files
+from run_report import RunReport
+from archive_input import get_archive_members, get_archive_filepath, get_member_name, get_member_hashes, copy_archive_members
+import tarfile
+import tempfile
+try:
+    from Copy_All_Files_From_Folder import move_files, plan_flattened_destinations
+except ImportError: # send2trash is not installed, move_files can't be tested
+    move_files = None
 
 
 TEST_FOLDER_RELATIVE_PATH = "FILELIST_TESTING"
@@ -232,6 +258,1129 @@ class test_Filelist_everything_3(test_Filelist, unittest.TestCase):
 
 
 
+class test_Filelist_duplicates(unittest.TestCase):
+    """all of the test files are identical"""
+    def setUp(self) -> None:
+        self.test_filelist = Filelist(TEST_FOLDER_RELATIVE_PATH)
+        self.expected_filepaths = set([os.path.abspath(os.path.join(TEST_FOLDER_RELATIVE_PATH, file)) for file in TEST_FILES])
+
+    def tearDown(self) -> None:
+        del self.test_filelist
+
+    def test_obtaining_duplicates(self) -> None:
+        result = self.test_filelist.get_duplicates()
+        self.assertEqual(len(result), 1)
+        self.assertEqual(result[0][0], TEST_FILE_SIZE)
+        self.assertEqual(set(result[0][1]), self.expected_filepaths)
+
+    def test_obtaining_duplicates_after_obtaining_duplicates(self) -> None:
+        result = self.test_filelist.get_duplicates()
+        self.assertIs(self.test_filelist.get_duplicates(), result)
+
+    def test_obtaining_duplicates_after_obtaining_file_hashes(self) -> None:
+        filehashes = self.test_filelist.get_filehashes_of(self.test_filelist.get_filepaths())
+        result = self.test_filelist.get_duplicates()
+        self.assertEqual(set(result[0][1]), self.expected_filepaths)
+        self.assertEqual(self.test_filelist.get_filehashes_of(self.test_filelist.get_filepaths()), filehashes)
+
+    def test_obtaining_file_hashes_after_obtaining_duplicates(self) -> None:
+        self.test_filelist.get_duplicates()
+        result = self.test_filelist.get_filehashes_of(self.test_filelist.get_filepaths())
+        self.assertEqual(set(result), set([get_file_hash(filepath) for filepath in self.expected_filepaths]))
+
+    def test_obtaining_duplicates_with(self) -> None:
+        other_filelist = Filelist(os.path.join(TEST_FOLDER_RELATIVE_PATH, "test2"))
+        result = self.test_filelist.get_duplicates_with(other_filelist)
+        self.assertEqual(len(result), 1)
+        self.assertEqual(set(result[0][1]), self.expected_filepaths) # the files of test2 are in both Filelists, they are only in the first one
+        self.assertEqual(result[0][2], ())
+        self.assertIs(self.test_filelist.get_duplicates_with(other_filelist), result)
+
+    def test_obtaining_duplicates_with_separate_folders(self) -> None:
+        filelist1 = Filelist(os.path.join(TEST_FOLDER_RELATIVE_PATH, "test1"))
+        filelist2 = Filelist(os.path.join(TEST_FOLDER_RELATIVE_PATH, "test2"))
+        result = filelist1.get_duplicates_with(filelist2)
+        self.assertEqual(len(result), 1)
+        self.assertEqual(set(result[0][1]), set(filelist1.get_filepaths()))
+        self.assertEqual(set(result[0][2]), set(filelist2.get_filepaths()))
+
+
+
+class test_archive_input(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temporary_folder = tempfile.TemporaryDirectory()
+        self.source_folder = os.path.join(self.temporary_folder.name, "source")
+        os.makedirs(os.path.join(self.source_folder, "sub"))
+        self.contents = {"b.txt": b"b" * 1000, "sub/c.txt": b"c" * 3000}
+        for member_name, data in self.contents.items():
+            with open(os.path.join(self.source_folder, *member_name.split("/")), "wb") as file_handle:
+                file_handle.write(data)
+        # same as "tar -cf archive.tar ." from inside of the source folder
+        self.archive_filepath = os.path.join(self.temporary_folder.name, "archive.tar")
+        with tarfile.open(self.archive_filepath, "w") as tar_archive:
+            tar_archive.add(self.source_folder, arcname=".")
+        self.output_folder = os.path.join(self.temporary_folder.name, "output")
+
+    def tearDown(self) -> None:
+        self.temporary_folder.cleanup()
+
+    def test_member_names_are_normalized(self) -> None:
+        self.assertEqual(set([member_name for member_name, _ in get_archive_members(self.archive_filepath)]), set(self.contents.keys()))
+
+    def test_copying_members_with_dot_slash_names(self) -> None:
+        filelist = Filelist(self.archive_filepath)
+        (copied_count, failed_count, results) = copy_archive_members(self.archive_filepath, filelist.get_filepaths(), self.output_folder, filesizes=filelist.get_filesizes())
+        self.assertEqual((copied_count, failed_count), (2, 0))
+        self.assertEqual(set([result[4] for result in results]), {-1})
+        for member_name, data in self.contents.items():
+            with open(os.path.join(self.output_folder, *member_name.split("/")), "rb") as file_handle:
+                self.assertEqual(file_handle.read(), data)
+
+    def test_copying_members_starting_with(self) -> None:
+        filelist = Filelist(self.archive_filepath, start_with=("c",))
+        self.assertEqual(filelist.get_filepaths(), (get_archive_filepath(self.archive_filepath, "sub/c.txt"),))
+        self.assertEqual(filelist.get_filesizes(), (3000,))
+        (copied_count, failed_count, results) = copy_archive_members(self.archive_filepath, filelist.get_filepaths(), self.output_folder, filesizes=filelist.get_filesizes())
+        self.assertEqual((copied_count, failed_count), (1, 0))
+        with open(os.path.join(self.output_folder, "sub", "c.txt"), "rb") as file_handle:
+            self.assertEqual(file_handle.read(), self.contents["sub/c.txt"])
+
+    def test_hashing_members_of_compressed_archive(self) -> None:
+        compressed_archive_filepath = os.path.join(self.temporary_folder.name, "archive.tar.gz")
+        with tarfile.open(compressed_archive_filepath, "w:gz") as tar_archive:
+            tar_archive.add(self.source_folder, arcname=".")
+        self.assertEqual(get_member_hashes(compressed_archive_filepath, ("sub/c.txt", "not_there.txt", "b.txt")),
+                         {member_name: hashlib.sha256(data).hexdigest() for member_name, data in self.contents.items()})
+
+        filelist = Filelist(compressed_archive_filepath)
+        filepaths = filelist.get_filepaths() + (get_archive_filepath(compressed_archive_filepath, "not_there.txt"),)
+        self.assertEqual(filelist.get_filehashes_of(filepaths),
+                         tuple([hashlib.sha256(self.contents[get_member_name(compressed_archive_filepath, filepath)]).hexdigest() for filepath in filepaths[:-1]]) + ("",))
+
+    def test_copying_member_not_in_archive(self) -> None:
+        filepath = get_archive_filepath(self.archive_filepath, "not_there.txt")
+        (copied_count, failed_count, results) = copy_archive_members(self.archive_filepath, (filepath,), self.output_folder)
+        self.assertEqual((copied_count, failed_count), (0, 1))
+        self.assertEqual(results[0][4], 6)
+        self.assertEqual(os.listdir(self.output_folder), [])
+
+
+class test_delete_files(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temporary_folder = tempfile.TemporaryDirectory()
+        self.input_folder = os.path.realpath(self.temporary_folder.name)
+        self.filepaths = list()
+        for relative_filepath in ("a/1.jpg", "a/2.png", "b/3.jpg", "b/c/4.jpg", "b/c/5.jpg"):
+            filepath = os.path.join(self.input_folder, *relative_filepath.split("/"))
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+            with open(filepath, "wb") as file_handle:
+                file_handle.write(b"x" * 100)
+            self.filepaths.append(filepath)
+
+    def tearDown(self) -> None:
+        self.temporary_folder.cleanup()
+
+    def __get_folder_entry_counts(self, filepaths: tuple[str, ...]) -> dict[str, int]:
+        return count_folder_entries(get_folders_to_clean(self.input_folder, set([os.path.dirname(filepath) for filepath in filepaths])))
+
+    def test_deleting_partly_matched_folder(self) -> None:
+        filepaths = (self.filepaths[0],) # a/2.png isn't matched
+        (deleted_count, failed_count, results, _) = delete_files(filepaths, self.__get_folder_entry_counts(filepaths))
+        self.assertEqual((deleted_count, failed_count), (1, 0))
+        self.assertEqual(os.listdir(os.path.join(self.input_folder, "a")), ["2.png"])
+
+    def test_deleting_fully_matched_subtree(self) -> None:
+        filepaths = tuple(self.filepaths[2:]) # all of b
+        folder_entry_counts = self.__get_folder_entry_counts(filepaths)
+        (deleted_count, failed_count, results, removed_entry_counts) = delete_files(filepaths, folder_entry_counts)
+        self.assertEqual((deleted_count, failed_count), (3, 0))
+        self.assertEqual(set([result[0] for result in results]), set(filepaths))
+        self.assertEqual(sorted(os.listdir(self.input_folder)), ["a"])
+        self.assertEqual(remove_emptied_folders(folder_entry_counts, removed_entry_counts), 0) # b was already removed
+
+    def test_deleting_subtree_with_file_added_after_counting(self) -> None:
+        filepaths = tuple(self.filepaths[2:])
+        folder_entry_counts = self.__get_folder_entry_counts(filepaths)
+        added_filepath = os.path.join(self.input_folder, "b", "c", "added.jpg")
+        with open(added_filepath, "wb") as file_handle:
+            file_handle.write(b"new")
+        (deleted_count, failed_count, results, removed_entry_counts) = delete_files(filepaths, folder_entry_counts)
+        self.assertEqual((deleted_count, failed_count), (3, 0))
+        self.assertEqual(set([result[0] for result in results]), set(filepaths))
+        self.assertTrue(os.path.exists(added_filepath))
+        self.assertEqual(remove_emptied_folders(folder_entry_counts, removed_entry_counts), 0)
+        self.assertEqual(os.listdir(os.path.join(self.input_folder, "b", "c")), ["added.jpg"])
+
+    def test_deleting_with_run_report(self) -> None:
+        report_filepath = os.path.join(self.input_folder, "report.jsonl")
+        run_report = RunReport(report_filepath)
+        filepaths = tuple(self.filepaths)
+        (deleted_count, failed_count, results, _) = delete_files(filepaths, self.__get_folder_entry_counts(filepaths), files_per_group=2, filesizes=(100,) * len(filepaths), run_report=run_report)
+        run_report.close()
+        self.assertEqual((deleted_count, failed_count, results), (5, 0, []))
+        self.assertEqual(run_report.get_summary(), {-1: (5, 500)})
+        with open(report_filepath, "r", encoding="utf-8") as report_file:
+            self.assertEqual(sorted([json.loads(line)["path"] for line in report_file]), sorted(filepaths))
+
+
+class test_content_catalog(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temporary_folder = tempfile.TemporaryDirectory()
+        self.archive_folder = os.path.join(self.temporary_folder.name, "archive")
+        self.input_folder = os.path.join(self.temporary_folder.name, "input")
+        self.output_folder = os.path.join(self.archive_folder, "new")
+        os.makedirs(os.path.join(self.archive_folder, "old"))
+        os.makedirs(self.input_folder)
+        self.contents = {"small": b"s" * 1000, "large": os.urandom(3*1024**2)}
+        for name, data in self.contents.items():
+            with open(os.path.join(self.archive_folder, "old", name + "_archived.bin"), "wb") as file_handle:
+                file_handle.write(data)
+            with open(os.path.join(self.input_folder, name + ".bin"), "wb") as file_handle:
+                file_handle.write(data)
+        with open(os.path.join(self.input_folder, "different.bin"), "wb") as file_handle:
+            file_handle.write(b"d" * 1000) # same size as small, different contents
+        self.catalog_filepath = os.path.join(self.archive_folder, CATALOG_FILENAME)
+        catalog = ContentCatalog(self.catalog_filepath, self.archive_folder)
+        catalog.update()
+        catalog.close()
+
+    def tearDown(self) -> None:
+        self.temporary_folder.cleanup()
+
+    def test_finding_files_already_in_catalog(self) -> None:
+        catalog = ContentCatalog(self.catalog_filepath)
+        for name in self.contents.keys():
+            filepath = os.path.join(self.input_folder, name + ".bin")
+            (catalog_filepath, _, full_hash) = catalog.find(filepath, os.path.getsize(filepath))
+            self.assertEqual(catalog_filepath, os.path.join(self.archive_folder, "old", name + "_archived.bin"))
+            self.assertEqual(full_hash, get_file_hash(filepath))
+        (catalog_filepath, _, _) = catalog.find(os.path.join(self.input_folder, "different.bin"), 1000)
+        self.assertIsNone(catalog_filepath)
+        catalog.close()
+
+    def test_finding_added_file(self) -> None:
+        catalog = ContentCatalog(self.catalog_filepath)
+        filepath = os.path.join(self.input_folder, "different.bin")
+        (_, partial_hash, full_hash) = catalog.find(filepath, 1000)
+        os.makedirs(self.output_folder)
+        copied_filepath = os.path.join(self.output_folder, "different.bin")
+        with open(copied_filepath, "wb") as file_handle:
+            file_handle.write(b"d" * 1000)
+        self.assertTrue(catalog.add(copied_filepath, partial_hash, full_hash))
+        self.assertEqual(catalog.find(filepath, 1000)[0], copied_filepath)
+        catalog.close()
+
+    def test_not_matching_unreadable_files(self) -> None:
+        # directories in place of files can't be read, both get an empty hash
+        archived_filepath = os.path.join(self.archive_folder, "old", "small_archived.bin")
+        os.remove(archived_filepath)
+        os.makedirs(archived_filepath)
+        unreadable_filepath = os.path.join(self.input_folder, "unreadable.bin")
+        os.makedirs(unreadable_filepath)
+        catalog = ContentCatalog(self.catalog_filepath)
+        self.assertEqual(catalog.find(unreadable_filepath, 1000), (None, "", ""))
+        self.assertIsNone(catalog.find(os.path.join(self.input_folder, "small.bin"), 1000)[0])
+        catalog.close()
+
+    @unittest.skipIf(move_files is None, "send2trash is not installed")
+    def test_copying_with_catalog_skip(self) -> None:
+        errors = move_files(self.input_folder, self.output_folder, move_mode="C", catalog_filepath=self.catalog_filepath, catalog_action="skip")
+        self.assertEqual(os.listdir(self.output_folder), ["different.bin"])
+        self.assertEqual(errors, [(0, 2)]) # the two files already in the catalog, like identical files that already existed
+
+    @unittest.skipIf(move_files is None, "send2trash is not installed")
+    def test_copying_with_catalog_link(self) -> None:
+        move_files(self.input_folder, self.output_folder, move_mode="C", catalog_filepath=self.catalog_filepath, catalog_action="link")
+        self.assertEqual(sorted(os.listdir(self.output_folder)), ["different.bin", "large.bin", "small.bin"])
+        for name in self.contents.keys():
+            self.assertTrue(os.path.samefile(os.path.join(self.output_folder, name + ".bin"), os.path.join(self.archive_folder, "old", name + "_archived.bin")))
+        self.assertFalse(os.path.samefile(os.path.join(self.output_folder, "different.bin"), os.path.join(self.input_folder, "different.bin")))
+
+
+class test_chunk_store(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temporary_folder = tempfile.TemporaryDirectory()
+        self.input_folder = os.path.join(self.temporary_folder.name, "input")
+        self.store_folder = os.path.join(self.temporary_folder.name, "store")
+        self.output_folder = os.path.join(self.temporary_folder.name, "output")
+        os.makedirs(os.path.join(self.input_folder, "sub"))
+        self.filepaths = (os.path.join(self.input_folder, "big.bin"), os.path.join(self.input_folder, "sub", "small.txt"))
+        self.data = os.urandom(4*1024**2)
+        with open(self.filepaths[0], "wb") as file_handle:
+            file_handle.write(self.data)
+        with open(self.filepaths[1], "wb") as file_handle:
+            file_handle.write(b"small file\n")
+
+    def tearDown(self) -> None:
+        self.temporary_folder.cleanup()
+
+    def __backup(self, run_name: str) -> dict[str, int | float]:
+        (backed_up_count, failed_count, _, stats) = backup_files(self.filepaths, self.input_folder, self.store_folder, average_chunk_size=64*1024, max_workers=2, run_name=run_name)
+        self.assertEqual((backed_up_count, failed_count), (2, 0))
+        return stats
+
+    def __assert_restored(self, output_folder: str) -> None:
+        for filepath in self.filepaths:
+            restored_filepath = os.path.join(output_folder, os.path.relpath(filepath, self.input_folder))
+            self.assertEqual(get_file_hash(restored_filepath), get_file_hash(filepath))
+            self.assertEqual(int(os.path.getmtime(restored_filepath)), int(os.path.getmtime(filepath)))
+
+    def test_backing_up_again_after_insertion(self) -> None:
+        first_stats = self.__backup("first")
+        with open(self.filepaths[0], "wb") as file_handle:
+            file_handle.write(self.data[:1000000] + b"inserted bytes" + self.data[1000000:])
+        second_stats = self.__backup("second")
+        self.assertGreater(first_stats["new_chunks"], 10)
+        self.assertLessEqual(second_stats["new_chunks"], 3) # only the chunks around the insertion
+        (restored_count, failed_count, results) = restore_files(os.path.join(self.store_folder, "recipes", "second"), self.output_folder)
+        self.assertEqual((restored_count, failed_count), (2, 0))
+        self.__assert_restored(self.output_folder)
+
+    def test_restoring_over_existing_files(self) -> None:
+        self.__backup("first")
+        recipes_folder = os.path.join(self.store_folder, "recipes", "first")
+        restore_files(recipes_folder, self.output_folder)
+        with open(os.path.join(self.output_folder, "sub", "small.txt"), "wb") as file_handle:
+            file_handle.write(b"changed since\n")
+        (restored_count, failed_count, results) = restore_files(recipes_folder, self.output_folder)
+        self.assertEqual((restored_count, failed_count), (1, 0))
+        self.assertEqual(sorted([(os.path.basename(result[0]), result[4]) for result in results]), [("big.bin", 0), ("small.txt", 4)])
+        with open(os.path.join(self.output_folder, "sub", "small.txt"), "rb") as file_handle:
+            self.assertEqual(file_handle.read(), b"changed since\n")
+        with open(os.path.join(self.output_folder, "sub", "small (0).txt"), "rb") as file_handle:
+            self.assertEqual(file_handle.read(), b"small file\n")
+
+    def test_restoring_with_missing_chunk(self) -> None:
+        self.__backup("first")
+        with open(os.path.join(self.store_folder, "recipes", "first", "sub", "small.txt.recipe"), "r", encoding="utf-8") as recipe_file:
+            chunk_hash = json.load(recipe_file)["chunks"][0][0]
+        os.remove(get_chunk_filepath(self.store_folder, chunk_hash))
+        (restored_count, failed_count, results) = restore_files(os.path.join(self.store_folder, "recipes", "first"), self.output_folder)
+        self.assertEqual((restored_count, failed_count), (1, 1))
+        self.assertEqual(os.listdir(os.path.join(self.output_folder, "sub")), [])
+
+    def test_restoring_next_to_files_with_temporary_names(self) -> None:
+        self.__backup("first")
+        os.makedirs(os.path.join(self.output_folder, "sub"))
+        user_filenames = ["small.txt.restoring", "small.txt.{}.0.restoring".format(os.getpid())]
+        for user_filename in user_filenames:
+            with open(os.path.join(self.output_folder, "sub", user_filename), "wb") as file_handle:
+                file_handle.write(b"user data")
+        with open(os.path.join(self.store_folder, "recipes", "first", "sub", "small.txt.recipe"), "r", encoding="utf-8") as recipe_file:
+            chunk_hash = json.load(recipe_file)["chunks"][0][0]
+        chunk_filepath = get_chunk_filepath(self.store_folder, chunk_hash)
+        os.rename(chunk_filepath, chunk_filepath + ".moved")
+
+        (restored_count, failed_count, _) = restore_files(os.path.join(self.store_folder, "recipes", "first"), self.output_folder)
+        self.assertEqual((restored_count, failed_count), (1, 1))
+        os.rename(chunk_filepath + ".moved", chunk_filepath)
+        (restored_count, failed_count, _) = restore_files(os.path.join(self.store_folder, "recipes", "first"), self.output_folder)
+        self.assertEqual((restored_count, failed_count), (1, 0))
+        self.__assert_restored(self.output_folder)
+        self.assertEqual(sorted(os.listdir(os.path.join(self.output_folder, "sub"))), sorted(["small.txt"] + user_filenames))
+        for user_filename in user_filenames:
+            with open(os.path.join(self.output_folder, "sub", user_filename), "rb") as file_handle:
+                self.assertEqual(file_handle.read(), b"user data")
+
+
+class test_fast_trash(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temporary_folder = tempfile.TemporaryDirectory()
+        self.filepath = os.path.join(os.path.realpath(self.temporary_folder.name), "file.txt")
+        with open(self.filepath, "wb") as file_handle:
+            file_handle.write(b"trash me")
+        self.fast_trash = FastTrash("unit_testing_{}".format(os.getpid()))
+
+    def tearDown(self) -> None:
+        self.fast_trash.close()
+        for run_folder in self.fast_trash.get_run_folders():
+            shutil.rmtree(run_folder)
+        self.temporary_folder.cleanup()
+
+    def test_trashing_and_restoring(self) -> None:
+        if not self.fast_trash.trash(self.filepath):
+            self.skipTest("no trash folder can be made on the drive of the temporary folder")
+        self.assertFalse(os.path.exists(self.filepath))
+        run_folder = self.fast_trash.get_run_folders()[0]
+        # written to the manifest before the file was renamed, without waiting for close()
+        with open(os.path.join(run_folder, FastTrash.MANIFEST_FILENAME), "r", encoding="utf-8") as manifest:
+            entries = [json.loads(line) for line in manifest]
+        self.assertEqual([entry["original"] for entry in entries], [self.filepath])
+        self.assertEqual(restore_trashed_files(run_folder), (1, 0))
+        with open(self.filepath, "rb") as file_handle:
+            self.assertEqual(file_handle.read(), b"trash me")
+
+    def test_trashing_batch(self) -> None:
+        filepaths = [os.path.join(os.path.dirname(self.filepath), "file{}.txt".format(index)) for index in range(5)]
+        for index, filepath in enumerate(filepaths):
+            with open(filepath, "wb") as file_handle:
+                file_handle.write(b"trash me " + bytes([48 + index]))
+        missing_filepath = os.path.join(os.path.dirname(self.filepath), "missing.txt")
+        outcomes = self.fast_trash.trash_files(filepaths + [missing_filepath])
+        if outcomes[0] is None:
+            self.skipTest("no trash folder can be made on the drive of the temporary folder")
+        self.assertEqual(outcomes, [-1, -1, -1, -1, -1, 6])
+        for filepath in filepaths:
+            self.assertFalse(os.path.exists(filepath))
+
+        run_folder = self.fast_trash.get_run_folders()[0]
+        with open(os.path.join(run_folder, FastTrash.MANIFEST_FILENAME), "r", encoding="utf-8") as manifest:
+            entries = [json.loads(line) for line in manifest]
+        self.assertEqual([entry["original"] for entry in entries], filepaths)
+        self.assertEqual(restore_trashed_files(run_folder), (5, 0))
+        for index, filepath in enumerate(filepaths):
+            with open(filepath, "rb") as file_handle:
+                self.assertEqual(file_handle.read(), b"trash me " + bytes([48 + index]))
+
+
+class test_reclaim_duplicates(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temporary_folder = tempfile.TemporaryDirectory()
+        folderpath = os.path.realpath(self.temporary_folder.name)
+        self.filepaths = tuple([os.path.join(folderpath, filename) for filename in ("old.bin", "newer.bin", "newest.bin")])
+        for index, filepath in enumerate(self.filepaths):
+            with open(filepath, "wb") as file_handle:
+                file_handle.write(b"duplicate" * 100)
+            os.utime(filepath, (1000000000 + index, 1000000000 + index))
+        self.fast_trash = FastTrash("unit_testing_{}".format(os.getpid()))
+
+    def tearDown(self) -> None:
+        self.fast_trash.close()
+        for run_folder in self.fast_trash.get_run_folders():
+            shutil.rmtree(run_folder)
+        self.temporary_folder.cleanup()
+
+    def test_replacing_with_hardlinks(self) -> None:
+        (replaced_count, failed_count, bytes_reclaimed, results) = reclaim_duplicates([(900, self.filepaths)], "hardlink", ("oldest",))
+        self.assertEqual((replaced_count, failed_count, bytes_reclaimed), (2, 0, 1800))
+        for filepath in self.filepaths[1:]:
+            self.assertTrue(os.path.samefile(filepath, self.filepaths[0]))
+        self.assertEqual(len(os.listdir(os.path.dirname(self.filepaths[0]))), 3) # no temporary file left
+
+    def test_replacing_next_to_files_with_temporary_names(self) -> None:
+        folderpath = os.path.dirname(self.filepaths[0])
+        user_filepaths = [os.path.join(folderpath, filename) for filename in (".newer.bin.reclaim", ".newer.bin.trash", ".newer.bin.{}.0.reclaim".format(os.getpid()), ".newer.bin.{}.0.trash".format(os.getpid()))]
+        for user_filepath in user_filepaths:
+            with open(user_filepath, "wb") as file_handle:
+                file_handle.write(b"user data")
+
+        for method in ("hardlink", "trash"):
+            (replaced_count, failed_count, _, _) = reclaim_duplicates([(900, self.filepaths)], method, ("oldest",), fast_trash=self.fast_trash)
+            if method == "trash" and failed_count == 2:
+                continue # no trash folder can be made on the drive of the temporary folder
+            self.assertEqual(failed_count, 0)
+            for user_filepath in user_filepaths:
+                with open(user_filepath, "rb") as file_handle:
+                    self.assertEqual(file_handle.read(), b"user data")
+            self.assertEqual(len(os.listdir(folderpath)), 3 + len(user_filepaths)) # no temporary file left
+            for filepath in self.filepaths[1:]:
+                with open(filepath, "wb") as file_handle: # duplicates of their own again for the next method
+                    file_handle.write(b"duplicate" * 100)
+
+    def test_replacing_again(self) -> None:
+        reclaim_duplicates([(900, self.filepaths)], "hardlink", ("oldest",))
+        (replaced_count, failed_count, bytes_reclaimed, results) = reclaim_duplicates([(900, self.filepaths)], "hardlink", ("oldest",))
+        self.assertEqual((replaced_count, failed_count, bytes_reclaimed), (0, 0, 0))
+        self.assertEqual([result[4] for result in results], [0, 0])
+
+    def test_not_replacing_changed_file(self) -> None:
+        with open(self.filepaths[2], "ab") as file_handle:
+            file_handle.write(b"changed")
+        (replaced_count, failed_count, bytes_reclaimed, results) = reclaim_duplicates([(900, self.filepaths)], "hardlink", ("oldest",))
+        self.assertEqual((replaced_count, failed_count), (1, 1))
+        self.assertFalse(os.path.samefile(self.filepaths[2], self.filepaths[0]))
+
+    def test_replacing_and_trashing(self) -> None:
+        (replaced_count, failed_count, _, results) = reclaim_duplicates([(900, self.filepaths)], "trash", ("oldest",), fast_trash=self.fast_trash)
+        if failed_count == 2:
+            self.skipTest("no trash folder can be made on the drive of the temporary folder")
+        self.assertEqual((replaced_count, failed_count), (2, 0))
+        for filepath in self.filepaths[1:]:
+            self.assertTrue(os.path.samefile(filepath, self.filepaths[0]))
+        with open(os.path.join(self.fast_trash.get_run_folders()[0], FastTrash.MANIFEST_FILENAME), "r", encoding="utf-8") as manifest:
+            entries = [json.loads(line) for line in manifest]
+        self.assertEqual(sorted([entry["original"] for entry in entries]), sorted(self.filepaths[1:]))
+        for entry in entries:
+            self.assertEqual(os.path.getsize(entry["trashed"]), 900)
+            self.assertFalse(os.path.samefile(entry["trashed"], self.filepaths[0]))
+
+
+class test_copy_file_in_ranges(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temporary_folder = tempfile.TemporaryDirectory()
+        self.source_filepath = os.path.join(self.temporary_folder.name, "source.bin")
+        self.destination_filepath = os.path.join(self.temporary_folder.name, "destination.bin")
+        with open(self.source_filepath, "wb") as file_handle:
+            file_handle.write(os.urandom(3*1024**2 + 123)) # last range is shorter
+        os.utime(self.source_filepath, (1000000000, 1000000000))
+
+    def tearDown(self) -> None:
+        self.temporary_folder.cleanup()
+
+    def __assert_copied(self) -> None:
+        self.assertEqual(get_file_hash(self.destination_filepath), get_file_hash(self.source_filepath))
+        self.assertEqual(os.path.getmtime(self.destination_filepath), 1000000000)
+        self.assertEqual(sorted(os.listdir(self.temporary_folder.name)), ["destination.bin", "source.bin"]) # no temporary file left
+
+    def test_copying_in_ranges(self) -> None:
+        copy_file_in_ranges(self.source_filepath, self.destination_filepath, range_size=1024**2, max_workers=3, buffer_chunk_size=100000, drop_behind_size=300000)
+        self.__assert_copied()
+
+    def test_copying_in_ranges_and_verifying(self) -> None:
+        copy_file_in_ranges(self.source_filepath, self.destination_filepath, range_size=1024**2, verify=True, buffer_chunk_size=100000)
+        self.__assert_copied()
+
+    def test_copying_in_ranges_through_copy_file(self) -> None:
+        self.assertEqual(copy_file(self.source_filepath, self.temporary_folder.name + os.sep + "destination.bin", parallel_file_size=1024**2, verify=True), self.destination_filepath)
+        self.__assert_copied()
+
+    def test_copying_missing_file(self) -> None:
+        with self.assertRaises(FileNotFoundError):
+            copy_file_in_ranges(os.path.join(self.temporary_folder.name, "missing.bin"), self.destination_filepath)
+        self.assertEqual(os.listdir(self.temporary_folder.name), ["source.bin"])
+
+
+class test_checksum_manifest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temporary_folder = tempfile.TemporaryDirectory()
+        self.input_folder = os.path.join(self.temporary_folder.name, "input")
+        self.manifest_filepath = os.path.join(self.temporary_folder.name, "manifest.sha256")
+        self.report_filepath = os.path.join(self.temporary_folder.name, "report.txt")
+        self.relative_filepaths = ("a.txt", "b/c.txt", "b/d.txt", "e/f/g.txt", "back\\slash.txt", "new\nline.txt")
+        for index, relative_filepath in enumerate(self.relative_filepaths):
+            filepath = os.path.join(self.input_folder, *relative_filepath.split("/"))
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+            with open(filepath, "wb") as file_handle:
+                file_handle.write(str(index).encode() * 1000)
+        self.assertEqual(write_manifest(Filelist(self.input_folder), self.input_folder, self.manifest_filepath), (len(self.relative_filepaths), 0))
+
+    def tearDown(self) -> None:
+        self.temporary_folder.cleanup()
+
+    def __verify(self) -> dict[str, int]:
+        return verify_manifest(self.manifest_filepath, self.input_folder, self.report_filepath, number_of_shards=2, files_per_batch=2, lines_per_run=2)
+
+    def __get_report(self) -> list[str]:
+        with open(self.report_filepath, "r", encoding="utf-8") as report_file:
+            return sorted(report_file.read().splitlines())
+
+    def test_manifest_round_trip(self) -> None:
+        with open(self.manifest_filepath, "r", encoding="utf-8", newline="\n") as manifest_file:
+            parsed_lines = [parse_manifest_line(line) for line in manifest_file]
+        self.assertEqual(sorted([relative_filepath for _, relative_filepath in parsed_lines]), sorted(self.relative_filepaths))
+        self.assertEqual(self.__verify(), {"ok": 6, "corrupt": 0, "unreadable": 0, "missing": 0, "extra": 0, "invalid_lines": 0})
+        self.assertEqual(self.__get_report(), [])
+
+    def test_verifying_changed_folder(self) -> None:
+        with open(os.path.join(self.input_folder, "b", "c.txt"), "ab") as file_handle:
+            file_handle.write(b"corrupted")
+        os.remove(os.path.join(self.input_folder, "a.txt"))
+        with open(os.path.join(self.input_folder, "b", "extra.txt"), "wb") as file_handle:
+            file_handle.write(b"extra")
+        self.assertEqual(self.__verify(), {"ok": 4, "corrupt": 1, "unreadable": 0, "missing": 1, "extra": 1, "invalid_lines": 0})
+        self.assertEqual(self.__get_report(), ["a.txt: MISSING", "b/c.txt: FAILED", "b/extra.txt: EXTRA"])
+
+    def test_verifying_repeated_lines(self) -> None:
+        with open(self.manifest_filepath, "r", encoding="utf-8", newline="\n") as manifest_file:
+            lines = manifest_file.readlines()
+        with open(self.manifest_filepath, "a", encoding="utf-8", newline="\n") as manifest_file:
+            manifest_file.write(lines[0])
+            manifest_file.write("not a manifest line\n")
+        self.assertEqual(self.__verify(), {"ok": 7, "corrupt": 0, "unreadable": 0, "missing": 0, "extra": 0, "invalid_lines": 1})
+
+    def test_verifying_windows_line_endings(self) -> None:
+        with open(self.manifest_filepath, "r", encoding="utf-8", newline="\n") as manifest_file:
+            content = manifest_file.read()
+        with open(self.manifest_filepath, "w", encoding="utf-8", newline="\n") as manifest_file:
+            manifest_file.write(content.replace("\n", "\r\n"))
+        self.assertEqual(self.__verify(), {"ok": 6, "corrupt": 0, "unreadable": 0, "missing": 0, "extra": 0, "invalid_lines": 0})
+
+
+class test_duplicate_files_in_roots(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temporary_folder = tempfile.TemporaryDirectory()
+        self.folder = os.path.realpath(self.temporary_folder.name)
+        contents = {"a/1.bin": b"same" * 100, "a/sub/2.bin": b"same" * 100, "b/3.bin": b"same" * 100, "a/4.bin": b"other" * 80, "b/5.bin": b"diff!" * 80}
+        self.filepaths = dict()
+        for relative_filepath, data in contents.items():
+            filepath = os.path.join(self.folder, *relative_filepath.split("/"))
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+            with open(filepath, "wb") as file_handle:
+                file_handle.write(data)
+            self.filepaths[relative_filepath] = filepath
+
+    def tearDown(self) -> None:
+        self.temporary_folder.cleanup()
+
+    def test_finding_duplicates_in_separate_roots(self) -> None:
+        root_a = tuple([filepath for relative_filepath, filepath in self.filepaths.items() if relative_filepath.startswith("a/")])
+        root_b = tuple([filepath for relative_filepath, filepath in self.filepaths.items() if relative_filepath.startswith("b/")])
+        duplicate_groups = get_duplicate_files_in_roots((root_a, root_b), files_per_group=2, compare_group_size=0)
+        self.assertEqual([(filesize, tuple([sorted(filepaths) for filepaths in filepaths_by_root])) for filesize, filepaths_by_root in duplicate_groups],
+                         [(400, (sorted([self.filepaths["a/1.bin"], self.filepaths["a/sub/2.bin"]]), [self.filepaths["b/3.bin"]]))])
+
+    def test_finding_duplicates_in_overlapping_roots(self) -> None:
+        root_all = tuple(self.filepaths.values())
+        root_a = tuple([filepath for relative_filepath, filepath in self.filepaths.items() if relative_filepath.startswith("a/")])
+        duplicate_groups = get_duplicate_files_in_roots((root_all, root_a), compare_group_size=3)
+        self.assertEqual(len(duplicate_groups), 1)
+        (filesize, (filepaths_all, filepaths_a)) = duplicate_groups[0]
+        self.assertEqual(sorted(filepaths_all), sorted([self.filepaths["a/1.bin"], self.filepaths["a/sub/2.bin"], self.filepaths["b/3.bin"]]))
+        self.assertEqual(filepaths_a, ()) # every filepath of the second root belongs to the first one
+
+    def test_finding_duplicates_in_same_filepaths(self) -> None:
+        filepaths = tuple(self.filepaths.values())
+        duplicate_groups = get_duplicate_files(filepaths, filepaths[::-1])
+        self.assertEqual(len(duplicate_groups), 1)
+        self.assertEqual(duplicate_groups[0][0], duplicate_groups[0][1])
+        self.assertEqual(len(duplicate_groups[0][0]), 3)
+
+    def test_finding_duplicates_in_three_roots(self) -> None:
+        filepath_c = os.path.join(self.folder, "c", "6.bin")
+        os.makedirs(os.path.dirname(filepath_c))
+        with open(filepath_c, "wb") as file_handle:
+            file_handle.write(b"other" * 80)
+        root_a = tuple([filepath for relative_filepath, filepath in self.filepaths.items() if relative_filepath.startswith("a/")])
+        root_b = tuple([filepath for relative_filepath, filepath in self.filepaths.items() if relative_filepath.startswith("b/")])
+        duplicate_groups = get_duplicate_files_in_roots((root_a, root_b, (filepath_c,)), root_names=("a", "b", "c"), compare_group_size=0)
+        self.assertEqual(sorted([(filesize, tuple([sorted(filepaths) for filepaths in filepaths_by_root])) for filesize, filepaths_by_root in duplicate_groups]),
+                         [(400, (sorted([self.filepaths["a/1.bin"], self.filepaths["a/sub/2.bin"]]), [self.filepaths["b/3.bin"]], [])),
+                          (400, ([self.filepaths["a/4.bin"]], [], [filepath_c]))])
+
+    def test_hardlinks_listed_with_their_root(self) -> None:
+        filepath_link = os.path.join(self.folder, "c", "link.bin")
+        os.makedirs(os.path.dirname(filepath_link))
+        os.link(self.filepaths["b/3.bin"], filepath_link)
+        root_b = tuple([filepath for relative_filepath, filepath in self.filepaths.items() if relative_filepath.startswith("b/")])
+        duplicate_groups = get_duplicate_files_in_roots(((self.filepaths["a/1.bin"],), root_b, (filepath_link,)))
+        self.assertEqual(duplicate_groups, ((400, ((self.filepaths["a/1.bin"],), (self.filepaths["b/3.bin"],), (filepath_link,))),))
+
+        # only hardlinks of each other, they take no extra space
+        self.assertEqual(get_duplicate_files_in_roots((root_b, (filepath_link,))), ())
+
+
+class test_archive_output(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temporary_folder = tempfile.TemporaryDirectory()
+        self.input_folder = os.path.join(self.temporary_folder.name, "input")
+        self.output_folder = os.path.join(self.temporary_folder.name, "output")
+        os.makedirs(os.path.join(self.input_folder, "sub"))
+        self.filepaths = tuple([os.path.join(self.input_folder, relative_filepath) for relative_filepath in ("1.bin", "2.bin", os.path.join("sub", "3.bin"), os.path.join("sub", "4.bin"))])
+        for index, filepath in enumerate(self.filepaths):
+            with open(filepath, "wb") as file_handle:
+                file_handle.write(os.urandom(5000))
+            os.utime(filepath, (1000000000 + index, 1000000000 + index))
+
+    def tearDown(self) -> None:
+        self.temporary_folder.cleanup()
+
+    def __assert_extracted(self, index_filepath: str) -> None:
+        for filepath in self.filepaths:
+            extracted_filepath = os.path.join(self.temporary_folder.name, "extracted.bin")
+            self.assertTrue(extract_archived_file(index_filepath, os.path.relpath(filepath, self.input_folder).replace(os.sep, "/"), extracted_filepath))
+            self.assertEqual(get_file_hash(extracted_filepath), get_file_hash(filepath))
+            self.assertEqual(os.path.getmtime(extracted_filepath), os.path.getmtime(filepath))
+
+    def test_archives_stay_within_max_archive_size(self) -> None:
+        # two files of 5000 bytes fit in 12000 bytes, but not with their headers and the end of the archive
+        (archived_count, failed_count, results, archive_writer) = archive_files(self.filepaths, self.input_folder, self.output_folder, max_archive_size=12000, filesizes=(5000,) * 4)
+        self.assertEqual((archived_count, failed_count), (4, 0))
+        self.assertEqual(len(archive_writer.get_archive_filepaths()), 4)
+        for archive_filepath in archive_writer.get_archive_filepaths():
+            self.assertLessEqual(os.path.getsize(archive_filepath), 12000)
+        self.__assert_extracted(archive_writer.get_index_filepath())
+
+    def test_archiving_with_compression(self) -> None:
+        (archived_count, failed_count, results, archive_writer) = archive_files(self.filepaths, self.input_folder, self.output_folder, compression="gz")
+        self.assertEqual((archived_count, failed_count), (4, 0))
+        self.assertEqual(len(archive_writer.get_archive_filepaths()), 1)
+        with tarfile.open(archive_writer.get_archive_filepaths()[0], "r:gz") as tar_archive:
+            self.assertEqual(sorted(tar_archive.getnames()), ["1.bin", "2.bin", "sub/3.bin", "sub/4.bin"])
+        self.__assert_extracted(archive_writer.get_index_filepath())
+
+    def test_archiving_hardlinks(self) -> None:
+        link_filepath = os.path.join(self.input_folder, "link.bin")
+        os.link(self.filepaths[0], link_filepath)
+        for max_archive_size in (12000, 4*1024**3): # the link in another archive than its first path, then in the same one
+            output_folder = os.path.join(self.output_folder, str(max_archive_size))
+            (archived_count, failed_count, results, archive_writer) = archive_files(self.filepaths + (link_filepath,), self.input_folder, output_folder, max_archive_size=max_archive_size)
+            self.assertEqual((archived_count, failed_count), (5, 0))
+            extracted_filepath = os.path.join(self.temporary_folder.name, "extracted.bin")
+            self.assertTrue(extract_archived_file(archive_writer.get_index_filepath(), "link.bin", extracted_filepath))
+            self.assertEqual(get_file_hash(extracted_filepath), get_file_hash(self.filepaths[0]))
+            with tarfile.open(archive_writer.get_archive_filepaths()[-1], "r") as tar_archive:
+                self.assertTrue(tar_archive.getmember("link.bin").isreg())
+
+    def test_archiving_missing_file(self) -> None:
+        (archived_count, failed_count, results, archive_writer) = archive_files(self.filepaths + (os.path.join(self.input_folder, "missing.bin"),), self.input_folder, self.output_folder)
+        self.assertEqual((archived_count, failed_count), (4, 1))
+        self.assertEqual(results[-1][4], 6)
+        self.assertFalse(extract_archived_file(archive_writer.get_index_filepath(), "missing.bin", os.path.join(self.temporary_folder.name, "extracted.bin")))
+
+
+class test_plan_flattened_destinations(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temporary_folder = tempfile.TemporaryDirectory()
+        self.input_folder = os.path.join(self.temporary_folder.name, "input")
+        self.output_folder = os.path.join(self.temporary_folder.name, "output")
+        contents = {"input/a/x.jpg": b"first x", "input/b/x.jpg": b"second x", "input/c/x.jpg": b"first x", "input/d/y.jpg": b"same y", "input/d/z.jpg": b"z",
+                    "output/x.jpg": b"other x", "output/y.jpg": b"same y"}
+        for relative_filepath, data in contents.items():
+            filepath = os.path.join(self.temporary_folder.name, *relative_filepath.split("/"))
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+            with open(filepath, "wb") as file_handle:
+                file_handle.write(data)
+
+    def tearDown(self) -> None:
+        self.temporary_folder.cleanup()
+
+    def __get_filepath(self, relative_filepath: str) -> str:
+        return os.path.abspath(os.path.join(self.input_folder, *relative_filepath.split("/")))
+
+    @unittest.skipIf(move_files is None, "send2trash is not installed")
+    def test_planning_destinations(self) -> None:
+        planned_destinations = plan_flattened_destinations(Filelist(self.input_folder), self.output_folder, "C")
+        self.assertEqual(len(planned_destinations), 5)
+        self.assertEqual(planned_destinations[self.__get_filepath("d/y.jpg")], (None, 0)) # identical to a file already in output_folder
+        self.assertEqual(planned_destinations[self.__get_filepath("d/z.jpg")], (os.path.join(os.path.abspath(self.output_folder), "z.jpg"), -1))
+        # one of the identical x.jpg is copied with a new filename, the other one isn't copied
+        identical_destinations = sorted([planned_destinations[self.__get_filepath(relative_filepath)] for relative_filepath in ("a/x.jpg", "c/x.jpg")], key=str)
+        self.assertEqual(identical_destinations[1], (None, 0))
+        self.assertEqual(identical_destinations[0][1], 4)
+        self.assertEqual(planned_destinations[self.__get_filepath("b/x.jpg")][1], 4)
+        self.assertEqual(sorted([os.path.basename(identical_destinations[0][0]), os.path.basename(planned_destinations[self.__get_filepath("b/x.jpg")][0])]), ["x (0).jpg", "x (1).jpg"])
+
+    @unittest.skipIf(move_files is None, "send2trash is not installed")
+    def test_planning_moved_duplicates(self) -> None:
+        planned_destinations = plan_flattened_destinations(Filelist(self.input_folder), self.output_folder, "M")
+        self.assertEqual(planned_destinations[self.__get_filepath("d/y.jpg")], (None, 1)) # trashed, like move_file_error
+
+    @unittest.skipIf(move_files is None, "send2trash is not installed")
+    def test_copying_flattened(self) -> None:
+        move_files(self.input_folder, self.output_folder, move_mode="C", keep_folder_structure=False)
+        self.assertEqual(sorted(os.listdir(self.output_folder)), ["x (0).jpg", "x (1).jpg", "x.jpg", "y.jpg", "z.jpg"])
+        with open(os.path.join(self.output_folder, "x.jpg"), "rb") as file_handle:
+            self.assertEqual(file_handle.read(), b"other x") # never overwritten
+
+
+class test_copy_sparse_file(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temporary_folder = tempfile.TemporaryDirectory()
+        self.source_filepath = os.path.join(self.temporary_folder.name, "sparse.img")
+        self.destination_filepath = os.path.join(self.temporary_folder.name, "copy.img")
+        # data, then a hole, then data, then a hole up to the end of the file
+        with open(self.source_filepath, "wb") as file_handle:
+            file_handle.write(os.urandom(64*1024))
+            file_handle.seek(8*1024**2)
+            file_handle.write(os.urandom(64*1024))
+            file_handle.truncate(16*1024**2)
+
+    def tearDown(self) -> None:
+        self.temporary_folder.cleanup()
+
+    def test_copying_sparse_file(self) -> None:
+        if not is_sparse_file(self.source_filepath):
+            self.skipTest("the filesystem of the temporary folder doesn't keep holes")
+        self.assertEqual(copy_file(self.source_filepath, self.temporary_folder.name + os.sep + "copy.img", buffer_chunk_size=10000), self.destination_filepath)
+        self.assertEqual(os.path.getsize(self.destination_filepath), 16*1024**2)
+        self.assertEqual(get_file_hash(self.destination_filepath), get_file_hash(self.source_filepath))
+        self.assertTrue(is_sparse_file(self.destination_filepath))
+        self.assertLess(os.stat(self.destination_filepath).st_blocks * 512, 1024**2) # the holes weren't written out
+
+    def test_finding_data_ranges(self) -> None:
+        if not is_sparse_file(self.source_filepath):
+            self.skipTest("the filesystem of the temporary folder doesn't keep holes")
+        file_descriptor = os.open(self.source_filepath, os.O_RDONLY)
+        try:
+            data_ranges = get_data_ranges(file_descriptor, 16*1024**2)
+        finally:
+            os.close(file_descriptor)
+        # filesystems can round data ranges to their block size, but never make the holes go away
+        self.assertEqual(len(data_ranges), 2)
+        self.assertEqual(data_ranges[0][0], 0)
+        self.assertGreaterEqual(data_ranges[0][1], 64*1024)
+        self.assertLessEqual(data_ranges[1][0], 8*1024**2)
+        self.assertLess(data_ranges[1][1], 16*1024**2)
+
+    def test_copying_regular_file(self) -> None:
+        with open(self.source_filepath, "wb") as file_handle:
+            file_handle.write(os.urandom(100000))
+        self.assertFalse(is_sparse_file(self.source_filepath))
+        copy_file(self.source_filepath, self.destination_filepath)
+        self.assertEqual(get_file_hash(self.destination_filepath), get_file_hash(self.source_filepath))
+
+
+class test_copy_large_file(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temporary_folder = tempfile.TemporaryDirectory()
+        self.source_filepath = os.path.join(self.temporary_folder.name, "large.bin")
+        self.destination_filepath = os.path.join(self.temporary_folder.name, "copy.bin")
+        with open(self.source_filepath, "wb") as file_handle:
+            file_handle.write(os.urandom(3*1024**2 + 5))
+        os.utime(self.source_filepath, (1000000000, 1000000000))
+
+    def tearDown(self) -> None:
+        self.temporary_folder.cleanup()
+
+    def __assert_copied(self) -> None:
+        self.assertEqual(get_file_hash(self.destination_filepath), get_file_hash(self.source_filepath))
+        self.assertEqual(os.path.getsize(self.destination_filepath), 3*1024**2 + 5) # nothing left from preallocating
+        self.assertEqual(os.path.getmtime(self.destination_filepath), 1000000000)
+
+    @unittest.skipUnless(hasattr(os, "posix_fadvise"), "copy_large_file needs posix_fadvise")
+    def test_copying_large_file(self) -> None:
+        copy_large_file(self.source_filepath, self.destination_filepath, buffer_chunk_size=100000, drop_behind_size=500000)
+        self.__assert_copied()
+
+    @unittest.skipUnless(hasattr(os, "posix_fadvise"), "copy_large_file needs posix_fadvise")
+    def test_copying_large_file_through_copy_file(self) -> None:
+        copy_file(self.source_filepath, self.destination_filepath, large_file_size=1024**2)
+        self.__assert_copied()
+
+    @unittest.skipUnless(hasattr(os, "posix_fadvise"), "copy_large_file needs posix_fadvise")
+    def test_copying_over_longer_file(self) -> None:
+        with open(self.destination_filepath, "wb") as file_handle:
+            file_handle.write(b"x" * 4*1024**2)
+        copy_large_file(self.source_filepath, self.destination_filepath)
+        self.__assert_copied()
+
+
+class test_fan_out_copy(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temporary_folder = tempfile.TemporaryDirectory()
+        self.input_folder = os.path.join(self.temporary_folder.name, "input")
+        self.output_folders = tuple([os.path.join(self.temporary_folder.name, "output{}".format(index)) for index in range(3)])
+        os.makedirs(os.path.join(self.input_folder, "sub"))
+        self.contents = {"a.bin": os.urandom(300000), "sub/b.bin": os.urandom(1000), "sub/empty.bin": b""}
+        self.filepaths = tuple([os.path.join(self.input_folder, *relative_filepath.split("/")) for relative_filepath in self.contents.keys()])
+        for filepath, data in zip(self.filepaths, self.contents.values()):
+            with open(filepath, "wb") as file_handle:
+                file_handle.write(data)
+
+    def tearDown(self) -> None:
+        self.temporary_folder.cleanup()
+
+    def __copy(self, filepaths: tuple[str, ...]) -> tuple[int, int, list[list[tuple[str, str, int, float, int]]]]:
+        # small chunks and queues, so that the writers have to wait for each other
+        return fan_out_copy_files(filepaths, self.input_folder, self.output_folders, buffer_chunk_size=4096, max_buffered_bytes=16384)
+
+    def test_copying_to_every_output_folder(self) -> None:
+        (read_count, failed_count, results) = self.__copy(self.filepaths)
+        self.assertEqual((read_count, failed_count), (3, 0))
+        for output_folder, folder_results in zip(self.output_folders, results):
+            self.assertEqual([result[4] for result in folder_results], [-1, -1, -1])
+            for relative_filepath, data in self.contents.items():
+                with open(os.path.join(output_folder, *relative_filepath.split("/")), "rb") as file_handle:
+                    self.assertEqual(file_handle.read(), data)
+
+    def test_copying_over_existing_files(self) -> None:
+        os.makedirs(os.path.join(self.output_folders[1], "sub"))
+        with open(os.path.join(self.output_folders[1], "a.bin"), "wb") as file_handle:
+            file_handle.write(self.contents["a.bin"])
+        with open(os.path.join(self.output_folders[1], "sub", "b.bin"), "wb") as file_handle:
+            file_handle.write(b"something else")
+        (_, _, results) = self.__copy(self.filepaths)
+        self.assertEqual([result[4] for result in results[0]], [-1, -1, -1])
+        self.assertEqual([result[4] for result in results[1]], [0, 4, -1]) # identical, renamed, copied
+        with open(os.path.join(self.output_folders[1], "sub", "b (0).bin"), "rb") as file_handle:
+            self.assertEqual(file_handle.read(), self.contents["sub/b.bin"])
+
+    def test_copying_missing_file(self) -> None:
+        (read_count, failed_count, results) = self.__copy((os.path.join(self.input_folder, "missing.bin"),) + self.filepaths[:1])
+        self.assertEqual((read_count, failed_count), (1, 1))
+        for output_folder, folder_results in zip(self.output_folders, results):
+            self.assertEqual(sorted([result[4] for result in folder_results]), [-1, 6])
+            self.assertEqual(os.listdir(output_folder), ["a.bin"])
+
+    @unittest.skipIf(not os.path.exists("/proc/self/mem"), "needs a file that can be opened but not read")
+    def test_copying_unreadable_file(self) -> None:
+        # /proc/self/mem opens, then fails to read at offset 0
+        (read_count, failed_count, results) = fan_out_copy_files(("/proc/self/mem",) + self.filepaths[:1], self.input_folder, self.output_folders, keep_folder_structure=False)
+        self.assertEqual((read_count, failed_count), (1, 1))
+        for output_folder, folder_results in zip(self.output_folders, results):
+            self.assertEqual(sorted([(result[0], result[4]) for result in folder_results]), [("/proc/self/mem", 5), (self.filepaths[0], -1)]) # once per output folder
+            self.assertEqual(os.listdir(output_folder), ["a.bin"])
+
+
+class test_DuplicateFinder(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temporary_folder = tempfile.TemporaryDirectory()
+        random_generator = random.Random(12345)
+        base_data = bytes([random_generator.randrange(256) for _ in range(40000)])
+        contents: list[bytes] = list()
+        for filesize in (1, 100, 5000, 40000):
+            for variant in range(4):
+                data = base_data[:filesize - 1] + bytes([variant]) # same size, differs at the end
+                contents.extend([data] * (variant + 1)) # 1 to 4 copies of each
+        middle_changed = bytearray(base_data)
+        middle_changed[13000] ^= 0xff # outside of every sample, only the full hash or comparing tells it apart
+        contents.extend([bytes(middle_changed), bytes(middle_changed), b"", b""])
+        random_generator.shuffle(contents)
+
+        filepaths = list()
+        for index, data in enumerate(contents):
+            filepath = os.path.join(self.temporary_folder.name, "file_{}.bin".format(index))
+            with open(filepath, "wb") as file_handle:
+                file_handle.write(data)
+            filepaths.append(filepath)
+        self.filepaths = tuple(filepaths)
+
+    def tearDown(self) -> None:
+        self.temporary_folder.cleanup()
+
+    def __get_brute_force_groups(self) -> set[frozenset[str]]:
+        filepaths_by_contents: dict[tuple[int, str], list[str]] = dict()
+        for filepath in self.filepaths:
+            filesize = os.path.getsize(filepath)
+            if filesize > 0:
+                filepaths_by_contents.setdefault((filesize, get_file_hash(filepath)), list()).append(filepath)
+        return set([frozenset(filepaths) for filepaths in filepaths_by_contents.values() if len(filepaths) > 1])
+
+    def __find(self, compare_group_size: int) -> tuple[set[frozenset[str]], dict[str, int]]:
+        # small samples and small_file_size so that files of 40000 bytes go through the partial hash stage
+        duplicate_finder = DuplicateFinder(self.filepaths, files_per_group=3, sample_size=1000, sample_offsets=(), small_file_size=4096, compare_group_size=compare_group_size)
+        groups = set([frozenset([self.filepaths[file_id] for file_id in file_ids]) for _, file_ids in duplicate_finder.find()])
+        return (groups, duplicate_finder.get_stage_metrics())
+
+    def test_always_hashing(self) -> None:
+        (groups, stage_metrics) = self.__find(0)
+        self.assertEqual(groups, self.__get_brute_force_groups())
+        self.assertEqual(stage_metrics["compared"], 0)
+        self.assertGreater(stage_metrics["unique_full_hash"], 0) # the file with its middle changed
+
+    def test_comparing_small_groups(self) -> None:
+        (groups, stage_metrics) = self.__find(3)
+        self.assertEqual(groups, self.__get_brute_force_groups())
+        self.assertGreater(stage_metrics["compared"], 0)
+
+    def test_comparing_every_group(self) -> None:
+        (groups, stage_metrics) = self.__find(1000)
+        self.assertEqual(groups, self.__get_brute_force_groups())
+        self.assertEqual(stage_metrics["full_hashed"], 0)
+
+    def test_stage_metrics_add_up(self) -> None:
+        for compare_group_size in (0, 3, 1000):
+            (groups, stage_metrics) = self.__find(compare_group_size)
+            self.assertEqual(stage_metrics["duplicates"], sum([len(group) for group in groups]))
+            self.assertEqual(stage_metrics["files"], stage_metrics["empty_or_unreadable"] + stage_metrics["hardlinks"] + stage_metrics["unique_size"] + stage_metrics["unique_partial_hash"]
+                             + stage_metrics["unique_full_hash"] + stage_metrics["unique_compare"] + stage_metrics["duplicates"])
+
+
+class test_get_sampled_hash(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temporary_folder = tempfile.TemporaryDirectory()
+        self.data = bytes(range(256)) * 400 # 102400 bytes
+
+    def tearDown(self) -> None:
+        self.temporary_folder.cleanup()
+
+    def __write_file(self, filename: str, data: bytes) -> str:
+        filepath = os.path.join(self.temporary_folder.name, filename)
+        with open(filepath, "wb") as file_handle:
+            file_handle.write(data)
+        return filepath
+
+    def test_sample_ranges(self) -> None:
+        self.assertEqual(get_sample_ranges(10000, 1000, (0.0, 0.5, 1.0), ()), [(0, 1000), (4500, 5500), (9000, 10000)])
+        self.assertEqual(get_sample_ranges(1500, 1000, (0.0, 0.5, 1.0), ()), [(0, 1500)]) # overlapping ranges are merged
+        self.assertEqual(get_sample_ranges(500, 1000, (0.0, 1.0), ()), [(0, 500)])
+        self.assertEqual(get_sample_ranges(10000, 1000, (0.0,), (2000, 9500)), [(0, 1000), (2000, 3000)]) # offsets past the end are left out
+
+    def test_only_samples_are_read(self) -> None:
+        filepath = self.__write_file("file.bin", self.data)
+        (sampled_hash, bytes_read) = get_sampled_hash(filepath, len(self.data), 1000, (0.0, 0.5, 1.0), ())
+        self.assertEqual(bytes_read, 3000)
+
+        changed_data = bytearray(self.data)
+        changed_data[20000] ^= 0xff # between two samples
+        changed_filepath = self.__write_file("changed outside.bin", bytes(changed_data))
+        self.assertEqual(get_sampled_hash(changed_filepath, len(self.data), 1000, (0.0, 0.5, 1.0), ())[0], sampled_hash)
+
+        changed_data[51200] ^= 0xff # inside of the middle sample
+        changed_filepath = self.__write_file("changed inside.bin", bytes(changed_data))
+        self.assertNotEqual(get_sampled_hash(changed_filepath, len(self.data), 1000, (0.0, 0.5, 1.0), ())[0], sampled_hash)
+
+    def test_same_headers_differ(self) -> None:
+        filepath_a = self.__write_file("a.bin", self.data)
+        filepath_b = self.__write_file("b.bin", self.data[:50000] + bytes(len(self.data) - 50000))
+        self.assertNotEqual(get_sampled_hash(filepath_a, len(self.data), 1000)[0], get_sampled_hash(filepath_b, len(self.data), 1000)[0])
+
+    def test_missing_file(self) -> None:
+        with self.assertRaises(FileNotFoundError):
+            get_sampled_hash(os.path.join(self.temporary_folder.name, "missing.bin"), 100)
+
+
+class test_compare_files_in_lockstep(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temporary_folder = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.temporary_folder.cleanup()
+
+    def __write_files(self, contents: list[bytes]) -> tuple[str, ...]:
+        filepaths = list()
+        for index, data in enumerate(contents):
+            filepath = os.path.join(self.temporary_folder.name, "file_{}.bin".format(index))
+            with open(filepath, "wb") as file_handle:
+                file_handle.write(data)
+            filepaths.append(filepath)
+        return tuple(filepaths)
+
+    def test_groups(self) -> None:
+        data = bytes(range(256)) * 40
+        filepaths = self.__write_files([data, b"x" + data[1:], data, data[:-1] + b"x", b"x" + data[1:], data])
+        (identical_groups, _) = compare_files_in_lockstep(filepaths, 1000)
+        self.assertEqual(sorted(identical_groups), [(0, 2, 5), (1, 4)])
+
+    def test_files_differing_early_are_not_read(self) -> None:
+        filepaths = self.__write_files([b"a" * 10000, b"b" * 10000, b"c" * 10000])
+        (identical_groups, bytes_read) = compare_files_in_lockstep(filepaths, 1000)
+        self.assertEqual(identical_groups, list())
+        self.assertEqual(bytes_read, 3000)
+
+    def test_missing_file_left_out(self) -> None:
+        filepaths = self.__write_files([b"same", b"same"]) + (os.path.join(self.temporary_folder.name, "missing.bin"),)
+        (identical_groups, _) = compare_files_in_lockstep(filepaths)
+        self.assertEqual(identical_groups, [(0, 1)])
+
+
+class test_DuplicateFinder_hardlinks(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temporary_folder = tempfile.TemporaryDirectory()
+        self.filepaths = tuple([os.path.join(self.temporary_folder.name, filename) for filename in ("a.bin", "a link.bin", "b.bin", "b link.bin", "c.bin")])
+        for filepath in (self.filepaths[0], self.filepaths[2], self.filepaths[4]):
+            with open(filepath, "wb") as file_handle:
+                file_handle.write(b"same contents")
+        with open(self.filepaths[4], "wb") as file_handle:
+            file_handle.write(b"diff contents")
+        os.link(self.filepaths[0], self.filepaths[1])
+        os.link(self.filepaths[2], self.filepaths[3])
+
+    def tearDown(self) -> None:
+        self.temporary_folder.cleanup()
+
+    def test_collapsed(self) -> None:
+        duplicate_finder = DuplicateFinder(self.filepaths)
+        self.assertEqual(duplicate_finder.find(), [(13, (0, 2))]) # one file id per inode
+        self.assertEqual(duplicate_finder.get_links(0), (1,))
+        self.assertEqual(duplicate_finder.get_links(2), (3,))
+        self.assertEqual(sorted(duplicate_finder.get_hardlink_groups()), [(13, (0, 1)), (13, (2, 3))])
+        self.assertEqual(duplicate_finder.get_stage_metrics()["hardlinks"], 2)
+
+    def test_only_hardlinks(self) -> None:
+        duplicate_finder = DuplicateFinder(self.filepaths[:2])
+        self.assertEqual(duplicate_finder.find(), list()) # a single inode has no duplicate
+        self.assertEqual(duplicate_finder.get_hardlink_groups(), [(13, (0, 1))])
+
+    def test_not_collapsed(self) -> None:
+        duplicate_finder = DuplicateFinder(self.filepaths, collapse_hardlinks=False)
+        self.assertEqual([(filesize, sorted(file_ids)) for filesize, file_ids in duplicate_finder.find()], [(13, [0, 1, 2, 3])])
+        self.assertEqual(duplicate_finder.get_hardlink_groups(), list())
+
+    def test_inodes_given(self) -> None:
+        inodes = tuple([(os.stat(filepath).st_dev, os.stat(filepath).st_ino) for filepath in self.filepaths])
+        filesizes = tuple([os.path.getsize(filepath) for filepath in self.filepaths])
+        duplicate_finder = DuplicateFinder(self.filepaths, filesizes=filesizes, inodes=inodes)
+        self.assertEqual(duplicate_finder.find(), [(13, (0, 2))])
+        self.assertEqual(duplicate_finder.get_links(0), (1,))
+
+
+class test_DuplicateReport(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temporary_folder = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.temporary_folder.cleanup()
+
+    def __write_report(self, report_filename: str) -> str:
+        report_filepath = os.path.join(self.temporary_folder.name, report_filename)
+        duplicate_report = DuplicateReport(report_filepath, ("drive A", "drive \"B\""))
+        duplicate_report.add_group(10, (("a/1.bin", "a/2.bin"), ("b/1.bin",)))
+        with open(report_filepath, "r", encoding="utf-8") as report_file:
+            self.assertGreater(len(report_file.read()), 0) # flushed as soon as it's added
+        duplicate_report.add_group(20, (("a/3.bin", "a/4.bin"), ()))
+        self.assertEqual(duplicate_report.get_counts(), (2, 5))
+        duplicate_report.close()
+        return report_filepath
+
+    def test_json_lines(self) -> None:
+        with open(self.__write_report("report.jsonl"), "r", encoding="utf-8") as report_file:
+            groups = [json.loads(line) for line in report_file]
+        self.assertEqual(groups, [{"group": 0, "size": 10, "roots": {"drive A": ["a/1.bin", "a/2.bin"], "drive \"B\"": ["b/1.bin"]}},
+                                  {"group": 1, "size": 20, "roots": {"drive A": ["a/3.bin", "a/4.bin"]}}])
+
+    def test_csv(self) -> None:
+        with open(self.__write_report("report.csv"), "r", encoding="utf-8", newline="") as report_file:
+            rows = list(csv.reader(report_file))
+        self.assertEqual(rows, [["group", "size", "root", "path"], ["0", "10", "drive A", "a/1.bin"], ["0", "10", "drive A", "a/2.bin"], ["0", "10", "drive \"B\"", "b/1.bin"],
+                                ["1", "20", "drive A", "a/3.bin"], ["1", "20", "drive A", "a/4.bin"]])
+
+    def test_groups_yielded_before_the_end(self) -> None:
+        filepaths = list()
+        for index, data in enumerate([b"1" * 10, b"1" * 10, b"2" * 20, b"2" * 20, b"3" * 30, b"4" * 30]):
+            filepath = os.path.join(self.temporary_folder.name, "file_{}.bin".format(index))
+            with open(filepath, "wb") as file_handle:
+                file_handle.write(data)
+            filepaths.append(filepath)
+
+        duplicate_finder = DuplicateFinder(tuple(filepaths), files_per_group=1, max_workers=1)
+        duplicate_groups = duplicate_finder.find_iter()
+        first_group = next(duplicate_groups)
+        self.assertEqual(duplicate_finder.get_stage_metrics()["duplicates"], 2) # only counts the groups yielded so far
+        self.assertEqual(sorted([(filesize, sorted(file_ids)) for filesize, file_ids in [first_group] + list(duplicate_groups)]), [(10, [0, 1]), (20, [2, 3])])
+        self.assertEqual(duplicate_finder.get_stage_metrics()["duplicates"], 4)
+
+
+class test_compare_filelists(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temporary_folder = tempfile.TemporaryDirectory()
+        self.folder_a = os.path.join(self.temporary_folder.name, "a")
+        self.folder_b = os.path.join(self.temporary_folder.name, "b")
+        data = os.urandom(1024*1024)
+        middle_changed = bytearray(data)
+        middle_changed[150000] ^= 0xff # outside of the samples of the partial hash
+        contents_a = {"only a.bin": b"a", "same.bin": data, "sub/same.bin": b"sub", "size.bin": b"12345", "head.bin": data, "middle.bin": data, "empty.bin": b""}
+        contents_b = {"sub/only b.bin": b"b", "same.bin": data, "sub/same.bin": b"sub", "size.bin": b"1234", "head.bin": b"x" + data[1:], "middle.bin": bytes(middle_changed), "empty.bin": b""}
+        for folder, contents in ((self.folder_a, contents_a), (self.folder_b, contents_b)):
+            for relative_filepath, file_data in contents.items():
+                filepath = os.path.join(folder, *relative_filepath.split("/"))
+                os.makedirs(os.path.dirname(filepath), exist_ok=True)
+                with open(filepath, "wb") as file_handle:
+                    file_handle.write(file_data)
+        os.link(os.path.join(self.folder_a, "same.bin"), os.path.join(self.folder_a, "link.bin"))
+        os.link(os.path.join(self.folder_a, "same.bin"), os.path.join(self.folder_b, "link.bin"))
+
+    def tearDown(self) -> None:
+        self.temporary_folder.cleanup()
+
+    def test_classes(self) -> None:
+        (relative_filepaths, stats) = compare_filelists(Filelist(self.folder_a), Filelist(self.folder_b), files_per_group=2)
+        self.assertEqual(relative_filepaths, {"only_in_a": ["only a.bin"], "only_in_b": ["sub/only b.bin"],
+                                              "same": ["empty.bin", "link.bin", "same.bin", "sub/same.bin"], "differing": ["head.bin", "middle.bin", "size.bin"]})
+        self.assertEqual(stats["differing_size"], 1)
+        self.assertEqual(stats["same_inode"], 1)
+        self.assertEqual(stats["differing_partial_hash"], 1)
+        self.assertEqual(stats["differing_full_hash"], 1)
+        self.assertEqual(stats["same_full_hash"], 3)
+        self.assertEqual(stats["unreadable"], 0)
+        self.assertGreater(stats["partial_bytes_read"], 0)
+
+    def test_same_folder(self) -> None:
+        (relative_filepaths, stats) = compare_filelists(Filelist(self.folder_a), Filelist(self.folder_a))
+        self.assertEqual(relative_filepaths["only_in_a"], list())
+        self.assertEqual(relative_filepaths["only_in_b"], list())
+        self.assertEqual(relative_filepaths["differing"], list())
+        self.assertEqual(stats["same_inode"], len(relative_filepaths["same"])) # every file is itself, none is read
+        self.assertEqual(stats["partial_bytes_read"], 0)
+
+    def test_empty_folder(self) -> None:
+        empty_folder = os.path.join(self.temporary_folder.name, "empty")
+        os.makedirs(empty_folder)
+        (relative_filepaths, _) = compare_filelists(Filelist(empty_folder), Filelist(self.folder_b))
+        self.assertEqual(relative_filepaths["only_in_a"], list())
+        self.assertEqual(relative_filepaths["only_in_b"], ["empty.bin", "head.bin", "link.bin", "middle.bin", "same.bin", "size.bin", "sub/only b.bin", "sub/same.bin"])
+
+
 if __name__ == "__main__":
     create_test_setup()
     unittest.main()
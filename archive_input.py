@@ -0,0 +1,317 @@
+import os
+import posixpath
+import tarfile
+import zipfile
+import hashlib
+from time import perf_counter, mktime
+from progress_bar import progress_bar
+
+
+def is_archive(path) -> bool:
+    """
+    returns True if path is a tar (compressed or not) or zip file that can be used as an input instead of a folder
+    """
+    if not os.path.isfile(path):
+        return False
+
+    return zipfile.is_zipfile(path) or tarfile.is_tarfile(path)
+
+
+def get_archive_filepath(archive_filepath: str, member_name: str) -> str:
+    """
+    returns the filepath that stands for member_name (a path inside of the archive, with / separators),
+    as if the archive was a folder
+    """
+    return os.path.join(os.path.abspath(archive_filepath), *member_name.split("/"))
+
+
+def get_member_name(archive_filepath: str, filepath: str) -> str:
+    """
+    opposite of get_archive_filepath
+    """
+    return os.path.relpath(filepath, os.path.abspath(archive_filepath)).replace(os.sep, "/")
+
+
+class ArchiveReader():
+    """
+    Reads the files in a tar or zip archive without extracting them to the drive.
+
+    The list of files comes from the archive's index (the central directory of a zip file,
+    the headers of a tar file, which are skipped over without reading the data in between when the tar is not compressed).
+    Reading files in the order of get_members() only goes forward through the archive, which matters for compressed tar files.
+    Not meant to be shared between threads.
+    """
+    def __init__(self, archive_filepath: str) -> None:
+        assert (is_archive(archive_filepath)), "archive_filepath was not a tar or zip file"
+
+        self.__archive_filepath = os.path.abspath(archive_filepath)
+        self.__zip_archive = None
+        self.__tar_archive = None
+        if zipfile.is_zipfile(self.__archive_filepath):
+            self.__zip_archive = zipfile.ZipFile(self.__archive_filepath, "r")
+        else:
+            self.__tar_archive = tarfile.open(self.__archive_filepath, "r:*")
+
+        self.__members: list[tuple[str, int]] | None = None # None until listed
+        # all keyed by the normalized member name (see normalize_member_name), the names stored in the archive can be "./a/b.txt" and such
+        self.__zip_members: dict[str, zipfile.ZipInfo] = dict()
+        self.__tar_members: dict[str, tarfile.TarInfo] = dict()
+        self.__mtimes: dict[str, float] = dict()
+
+        return None
+
+
+    def get_members(self) -> list[tuple[str, int]]:
+        """
+        returns a list of pairs of (member name, size in bytes) of the regular files in the archive, in archive order.
+        member names are normalized (see normalize_member_name), so that they map back from get_archive_filepath.
+        members whose name would end up outside of the archive (absolute, or with ..) are left out
+        """
+        if self.__members is not None:
+            return self.__members
+
+        members: list[tuple[str, int]] = list()
+        if self.__zip_archive is not None:
+            for zip_info in self.__zip_archive.infolist():
+                member_name = normalize_member_name(zip_info.filename)
+                if not zip_info.is_dir() and is_safe_member_name(member_name):
+                    members.append((member_name, zip_info.file_size))
+                    self.__zip_members[member_name] = zip_info
+                    self.__mtimes[member_name] = mktime(zip_info.date_time + (0, 0, -1)) # zip times are local time
+        else:
+            for tar_info in self.__tar_archive:
+                member_name = normalize_member_name(tar_info.name)
+                if tar_info.isfile() and is_safe_member_name(member_name):
+                    members.append((member_name, tar_info.size))
+                    self.__tar_members[member_name] = tar_info
+                    self.__mtimes[member_name] = tar_info.mtime
+
+        self.__members = members
+
+        return members
+
+
+    def open_member(self, member_name: str):
+        """
+        returns a readable binary file object for member_name (as returned by get_members())
+
+        may raise KeyError if member_name is not in the archive
+        """
+        self.get_members()
+        if self.__zip_archive is not None:
+            return self.__zip_archive.open(self.__zip_members[member_name], "r")
+
+        return self.__tar_archive.extractfile(self.__tar_members[member_name])
+
+
+    def get_member_mtime(self, member_name: str) -> float:
+        """
+        returns the modification time of member_name, in seconds since the epoch
+
+        may raise KeyError if member_name is not in the archive
+        """
+        self.get_members()
+
+        return self.__mtimes[member_name]
+
+
+    def close(self) -> None:
+        if self.__zip_archive is not None:
+            self.__zip_archive.close()
+        if self.__tar_archive is not None:
+            self.__tar_archive.close()
+
+        return None
+
+
+def normalize_member_name(member_name: str) -> str:
+    """
+    returns member_name without "./" at its start and without "." or empty parts ("./a//b.txt" is "a/b.txt"),
+    the same name get_member_name gives back for its filepath
+    """
+    member_name = posixpath.normpath(member_name)
+    if member_name.startswith("//"): # normpath keeps two leading slashes
+        member_name = member_name[1:]
+
+    return member_name
+
+
+def is_safe_member_name(member_name: str) -> bool:
+    """
+    returns False if member_name is absolute or goes up a folder, it couldn't be mapped into the archive's "folder"
+    """
+    return not (member_name.startswith("/") or ".." in member_name.split("/") or member_name.strip("/") in ("", "."))
+
+
+def get_archive_members(archive_filepath: str) -> list[tuple[str, int]]:
+    """
+    returns a list of pairs of (member name, size in bytes) of the regular files in the archive, see ArchiveReader.get_members()
+    """
+    archive_reader = ArchiveReader(archive_filepath)
+    try:
+        return archive_reader.get_members()
+    finally:
+        archive_reader.close()
+
+
+def get_member_hash(archive_filepath: str, member_name: str, buffer_chunk_size: int = 16*1024*1024) -> str:
+    """
+    gets the hash (sha256) of a file inside of an archive, same as Filelist.get_file_hash for a file on the drive.
+    opens the archive for this one file, see get_member_hashes to hash many of them
+
+    may raise KeyError if member_name is not in the archive
+    """
+    return get_member_hashes(archive_filepath, (member_name,), buffer_chunk_size)[member_name]
+
+
+def get_member_hashes(archive_filepath: str, member_names: tuple[str, ...], buffer_chunk_size: int = 16*1024*1024) -> dict[str, str]:
+    """
+    gets the hashes (sha256) of files inside of an archive, in one pass through the archive:
+    it is opened once and the members are read in archive order, a compressed tar is only decompressed once instead of once per member
+
+    returns a dict of the hashes by member name, member names that are not in the archive are left out
+    """
+    hashes: dict[str, str] = dict()
+    member_names_to_hash = set(member_names)
+
+    archive_reader = ArchiveReader(archive_filepath)
+    try:
+        for member_name, _ in archive_reader.get_members():
+            if member_name not in member_names_to_hash or member_name in hashes:
+                continue
+            sha256 = hashlib.sha256()
+            with archive_reader.open_member(member_name) as member_handle:
+                while True:
+                    chunk = member_handle.read(buffer_chunk_size)
+                    if not chunk: # end of the file
+                        break
+                    sha256.update(chunk)
+            hashes[member_name] = sha256.hexdigest()
+    finally:
+        archive_reader.close()
+
+    return hashes
+
+
+def copy_archive_members(archive_filepath: str, filepaths: tuple[str, ...], output_folder: str, keep_folder_structure: bool = True, planned_destinations: dict[str, tuple[str | None, int]] | None = None, filesizes: tuple[int, ...] | None = None, buffer_chunk_size: int = 1024*1024) -> tuple[int, int, list[tuple[str, str, int, float, int]]]:
+    """
+    copies the files of a Filelist made from an archive (filepaths from get_archive_filepath) to output_folder,
+    streaming each one straight from the archive to its destination, in archive order, without extracting anything else
+
+    destinations are the same as move_files in copy mode: the path inside of the archive if keep_folder_structure is True,
+    otherwise planned_destinations (see plan_flattened_destinations) or output_folder directly.
+    a destination that already exists is compared while the file is being copied to a temporary file:
+    identical files are left as they are (error 0), otherwise the copy gets a numbered filename (error 4)
+
+    filesizes (same order as filepaths) is only used for the results and the progress bar
+
+    returns (number_of_files_copied, number_of_failed_files, results), results being one result per file for RunReport
+    """
+    assert (isinstance(filepaths, tuple)), "filepaths was not a tuple"
+
+    output_folder = os.path.abspath(output_folder)
+
+    results: list[tuple[str, str, int, float, int]] = list()
+    number_of_files_copied = 0
+    number_of_failed_files = 0
+    total_size = sum(filesizes) if filesizes is not None else 0
+    processed_size = 0
+
+    progress = progress_bar(100, rate_units="MB")
+    archive_reader = ArchiveReader(archive_filepath)
+    try:
+        for index in range(len(filepaths)):
+            filepath = filepaths[index]
+            filesize = filesizes[index] if filesizes is not None else 0
+            start_time = perf_counter()
+            member_name = get_member_name(archive_filepath, filepath)
+
+            if keep_folder_structure:
+                destination_filepath = os.path.join(output_folder, *member_name.split("/"))
+            elif planned_destinations is not None and filepath in planned_destinations:
+                destination_filepath = planned_destinations[filepath][0]
+            else:
+                destination_filepath = os.path.join(output_folder, os.path.basename(filepath))
+
+            try:
+                if destination_filepath is None:
+                    error_number = planned_destinations[filepath][1] # identical file already exists (or will exist) in output_folder
+                else:
+                    error_number = __copy_member(archive_reader, member_name, destination_filepath, buffer_chunk_size)
+                    if planned_destinations is not None and filepath in planned_destinations:
+                        error_number = planned_destinations[filepath][1]
+                if error_number != 0:
+                    number_of_files_copied += 1
+            except KeyError: # not in the archive
+                error_number = 6
+                number_of_failed_files += 1
+            except OSError: # unknown error
+                error_number = 5
+                number_of_failed_files += 1
+            results.append((filepath, "C", filesize, perf_counter() - start_time, error_number))
+
+            processed_size += filesize
+            if total_size > 0:
+                progress.print_progress_bar(processed_size / total_size, processed_size / 10**6)
+    finally:
+        archive_reader.close()
+
+    print("") # to add a newline after the end of the progress bar
+
+    return (number_of_files_copied, number_of_failed_files, results)
+
+
+def __copy_member(archive_reader: ArchiveReader, member_name: str, destination_filepath: str, buffer_chunk_size: int) -> int:
+    """
+    copies one member to destination_filepath through a temporary file next to it,
+    comparing it with destination_filepath at the same time if that already exists
+
+    returns the error number of move_file_error: -1 if copied, 0 if an identical file was already there, 4 if renamed
+    """
+    (destination_folder, destination_filename) = os.path.split(destination_filepath)
+    os.makedirs(destination_folder, exist_ok=True)
+    temporary_filepath = os.path.join(destination_folder, ".{}.partial".format(destination_filename))
+
+    existing_handle = None
+    if os.path.exists(destination_filepath):
+        existing_handle = open(destination_filepath, "rb")
+    files_are_identical = existing_handle is not None
+
+    try:
+        with archive_reader.open_member(member_name) as member_handle, open(temporary_filepath, "wb") as temporary_handle:
+            while True:
+                chunk = member_handle.read(buffer_chunk_size)
+                if files_are_identical and existing_handle.read(len(chunk)) != chunk:
+                    files_are_identical = False
+                if not chunk: # end of the file
+                    break
+                temporary_handle.write(chunk)
+        if files_are_identical and existing_handle.read(1) != b"": # existing file is longer
+            files_are_identical = False
+    except BaseException:
+        try:
+            os.remove(temporary_filepath)
+        except FileNotFoundError: # the member couldn't be opened, the temporary file wasn't created
+            pass
+        raise
+    finally:
+        if existing_handle is not None:
+            existing_handle.close()
+
+    mtime = archive_reader.get_member_mtime(member_name)
+    os.utime(temporary_filepath, (mtime, mtime))
+
+    if files_are_identical:
+        os.remove(temporary_filepath)
+        return 0
+    if existing_handle is None:
+        os.replace(temporary_filepath, destination_filepath)
+        return -1
+
+    (name, extension) = os.path.splitext(destination_filename)
+    retry_count = 0
+    while os.path.exists(os.path.join(destination_folder, "{} ({}){}".format(name, retry_count, extension))):
+        retry_count += 1
+    os.replace(temporary_filepath, os.path.join(destination_folder, "{} ({}){}".format(name, retry_count, extension)))
+
+    return 4
@@ -0,0 +1,240 @@
+import os
+import json
+import tarfile
+import gzip
+import lzma
+from shutil import copyfileobj
+from time import strftime, perf_counter
+from progress_bar import progress_bar
+
+
+class TarArchiveWriter():
+    """
+    Packs files into a sequence of tar archives (optionally compressed with gzip or xz) in an output folder,
+    starting a new archive whenever the current one would go over a maximum size.
+    Many small files are written as a few big sequential files, which is much faster on drives where every file costs
+    a round-trip (network shares, USB drives).
+
+    Every file is written to a sidecar index (JSON lines) with the archive it is in and the offset of its data,
+    so that one file can be extracted without going through the archive, see extract_archived_file().
+    Not meant to be shared between threads, tar archives are written sequentially.
+    """
+    COMPRESSIONS = ("", "gz", "xz")
+
+    def __init__(self, output_folder: str, compression: str = "", max_archive_size: int = 4*1024**3, run_name: str | None = None) -> None:
+        """
+        compression is "" for none, "gz" or "xz"
+
+        max_archive_size is in bytes of tar data (before compression), counting the headers, the padding and the end of the archive,
+        a file bigger than that gets an archive of its own
+
+        run_name is the start of the filenames of the archives and of the index, defaults to the current date and time
+        """
+        assert (compression in self.COMPRESSIONS), "compression was not one of the options"
+        assert (isinstance(max_archive_size, int) and max_archive_size > 0), "max_archive_size was not a positive int"
+        if run_name is None:
+            run_name = "archive_" + strftime("%Y-%m-%d_%H-%M-%S")
+
+        self.__output_folder = os.path.abspath(output_folder)
+        os.makedirs(self.__output_folder, exist_ok=True)
+        self.__compression = compression
+        self.__max_archive_size = max_archive_size
+        self.__run_name = run_name
+
+        self.__archive = None # open tarfile.TarFile, None until the first file is added
+        self.__archive_filepaths: list[str] = list()
+        self.__index_filepath = os.path.join(self.__output_folder, "{}.index.jsonl".format(run_name))
+        self.__index_file = open(self.__index_filepath, "w", encoding="utf-8")
+
+        return None
+
+
+    def __start_new_archive(self) -> None:
+        """
+        closes the current archive and opens the next one
+        """
+        if self.__archive is not None:
+            self.__archive.close()
+
+        archive_filename = "{}_{:05d}.tar".format(self.__run_name, len(self.__archive_filepaths))
+        if self.__compression != "":
+            archive_filename += "." + self.__compression
+        archive_filepath = os.path.join(self.__output_folder, archive_filename)
+
+        self.__archive = tarfile.open(archive_filepath, "w:" + self.__compression, format=tarfile.PAX_FORMAT, copybufsize=1024*1024)
+        self.__archive_filepaths.append(archive_filepath)
+
+        return None
+
+
+    def add(self, filepath: str, archived_path: str) -> None:
+        """
+        adds filepath to the current archive as archived_path (a relative path with / separators), with its metadata
+
+        may raise FileNotFoundError or other OSError
+        """
+        with open(filepath, "rb") as file_handle:
+            if self.__archive is None:
+                self.__start_new_archive()
+            tarinfo = self.__archive.gettarinfo(arcname=archived_path, fileobj=file_handle)
+            # a path of an inode that was already added would be a hardlink member without data, which may be in an earlier archive,
+            # every file is stored with its data so that it can be extracted on its own
+            tarinfo.type = tarfile.REGTYPE
+            tarinfo.linkname = ""
+            tarinfo.size = os.fstat(file_handle.fileno()).st_size
+            if self.__archive.offset > 0 and self.__get_archive_size_with(tarinfo) > self.__max_archive_size:
+                self.__start_new_archive()
+
+            self.__archive.addfile(tarinfo, file_handle)
+
+        # data is right before the end of the archive, padded to a multiple of 512 bytes
+        data_offset = self.__archive.offset - ((tarinfo.size + tarfile.BLOCKSIZE - 1) // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+        self.__index_file.write('{{"path": {}, "archive": {}, "offset": {}, "size": {}, "mtime": {}}}\n'.format(json.dumps(archived_path), json.dumps(os.path.basename(self.__archive_filepaths[-1])), data_offset, tarinfo.size, tarinfo.mtime))
+
+        return None
+
+
+    def __get_archive_size_with(self, tarinfo: tarfile.TarInfo) -> int:
+        """
+        returns the size the current archive would be once closed if the file of tarinfo was added to it:
+        its header (longer for long paths, see PAX_FORMAT), its data padded to a multiple of 512 bytes,
+        then the two empty blocks that end the archive, the whole archive being padded to a multiple of tarfile.RECORDSIZE
+        """
+        header_size = len(tarinfo.tobuf(self.__archive.format, self.__archive.encoding, self.__archive.errors))
+        data_size = ((tarinfo.size + tarfile.BLOCKSIZE - 1) // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+        archive_size = self.__archive.offset + header_size + data_size + 2 * tarfile.BLOCKSIZE
+
+        return ((archive_size + tarfile.RECORDSIZE - 1) // tarfile.RECORDSIZE) * tarfile.RECORDSIZE
+
+
+    def get_archive_filepaths(self) -> tuple[str, ...]:
+        """
+        returns the archives written so far, in order
+        """
+        return tuple(self.__archive_filepaths)
+
+
+    def get_index_filepath(self) -> str:
+        """
+        returns the filepath of the sidecar index
+        """
+        return self.__index_filepath
+
+
+    def close(self) -> None:
+        """
+        finishes the current archive and the index, must be called once all files are added
+        """
+        if self.__archive is not None:
+            self.__archive.close()
+            self.__archive = None
+        if self.__index_file is not None:
+            self.__index_file.close()
+            self.__index_file = None
+
+        return None
+
+
+def archive_files(filepaths: tuple[str, ...], input_folder: str, output_folder: str, compression: str = "", max_archive_size: int = 4*1024**3, filesizes: tuple[int, ...] | None = None) -> tuple[int, int, list[tuple[str, str, int, float, int]], TarArchiveWriter]:
+    """
+    packs filepaths into tar archives in output_folder (see TarArchiveWriter),
+    each file being stored with its path relative to input_folder
+
+    filesizes (same order as filepaths) is only used for the progress bar
+
+    returns (number_of_files_archived, number_of_failed_files, results, archive_writer),
+    results being one result per file for RunReport (operation "A"), archive_writer being closed already
+    """
+    assert (isinstance(filepaths, tuple)), "filepaths was not a tuple"
+
+    input_folder = os.path.abspath(input_folder)
+    archive_writer = TarArchiveWriter(output_folder, compression, max_archive_size)
+
+    results: list[tuple[str, str, int, float, int]] = list()
+    number_of_files_archived = 0
+    number_of_failed_files = 0
+    total_size = sum(filesizes) if filesizes is not None else 0
+    processed_size = 0
+
+    progress = progress_bar(100, rate_units="MB")
+    try:
+        for index in range(len(filepaths)):
+            filepath = filepaths[index]
+            start_time = perf_counter()
+            error_number = -1
+            filesize = filesizes[index] if filesizes is not None else 0
+            try:
+                archive_writer.add(filepath, os.path.relpath(filepath, input_folder).replace(os.sep, "/"))
+                number_of_files_archived += 1
+            except FileNotFoundError: # file was deleted, renamed or moved before it could be processed
+                error_number = 6
+                number_of_failed_files += 1
+            except OSError: # unknown error
+                error_number = 5
+                number_of_failed_files += 1
+            results.append((filepath, "A", filesize, perf_counter() - start_time, error_number))
+
+            processed_size += filesize
+            if total_size > 0:
+                progress.print_progress_bar(processed_size / total_size, processed_size / 10**6)
+    finally:
+        archive_writer.close()
+
+    print("") # to add a newline after the end of the progress bar
+
+    return (number_of_files_archived, number_of_failed_files, results, archive_writer)
+
+
+def extract_archived_file(index_filepath: str, archived_path: str, destination_filepath: str) -> bool:
+    """
+    extracts one file that was written by TarArchiveWriter, using its index to go straight to the file's data.
+    uncompressed archives are read from that offset directly, compressed ones are decompressed up to it without reading any tar headers
+
+    returns False if archived_path is not in the index, True once the file is extracted
+    """
+    archive_filename = None
+    with open(index_filepath, "r", encoding="utf-8") as index_file:
+        for line in index_file: # streamed, the index can have millions of lines
+            entry = json.loads(line)
+            if entry["path"] == archived_path:
+                archive_filename = entry["archive"]
+                break
+    if archive_filename is None:
+        return False
+
+    archive_filepath = os.path.join(os.path.dirname(os.path.abspath(index_filepath)), archive_filename)
+    if archive_filename.endswith(".gz"):
+        archive_handle = gzip.open(archive_filepath, "rb")
+    elif archive_filename.endswith(".xz"):
+        archive_handle = lzma.open(archive_filepath, "rb")
+    else:
+        archive_handle = open(archive_filepath, "rb")
+
+    with archive_handle:
+        archive_handle.seek(entry["offset"])
+        with open(destination_filepath, "wb") as destination_handle:
+            copyfileobj(__LimitedReader(archive_handle, entry["size"]), destination_handle, 1024*1024)
+
+    os.utime(destination_filepath, (entry["mtime"], entry["mtime"]))
+
+    return True
+
+
+class __LimitedReader():
+    """
+    file-like object that only reads the next size bytes of file_handle
+    """
+    def __init__(self, file_handle, size: int) -> None:
+        self.__file_handle = file_handle
+        self.__remaining = size
+
+        return None
+
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0 or size > self.__remaining:
+            size = self.__remaining
+        data = self.__file_handle.read(size)
+        self.__remaining -= len(data)
+
+        return data
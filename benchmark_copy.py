@@ -0,0 +1,80 @@
+from os import path, remove, makedirs, stat, urandom, sync
+from time import time
+from shutil import copy2
+from file_copy import copy_file, copy_large_file, copy_file_in_ranges
+
+folder_path: str = path.abspath("COPY_BENCHMARK") # created and then emptied by this script
+sparse_file_size: int = 4 * 1024**3 # apparent size of the sparse file, in bytes
+sparse_data_size: int = 16 * 1024**2 # size of each block of data in the sparse file, in bytes
+sparse_data_blocks: int = 8 # number of blocks of data, spread out over the sparse file
+large_file_size: int = 1024**3 # size of the large (not sparse) file, in bytes, should be at least file_copy.LARGE_FILE_SIZE
+
+
+def create_sparse_file(filepath: str) -> None:
+    """
+    creates a file of sparse_file_size bytes that only has sparse_data_blocks blocks of data, the rest being holes
+    """
+    with open(filepath, "wb") as file_handle:
+        for block_i in range(sparse_data_blocks):
+            file_handle.seek(block_i * (sparse_file_size // sparse_data_blocks))
+            file_handle.write(b"\x01" * sparse_data_size)
+        file_handle.truncate(sparse_file_size)
+
+    return None
+
+
+def create_large_file(filepath: str) -> None:
+    """
+    creates a file of large_file_size bytes of data, without holes
+    """
+    chunk = urandom(sparse_data_size)
+    with open(filepath, "wb") as file_handle:
+        for _ in range(large_file_size // sparse_data_size):
+            file_handle.write(chunk)
+
+    return None
+
+
+def time_copy(copy_function, source_filepath: str, destination_filepath: str) -> None:
+    """
+    copies the file with copy_function and prints how long it took and how much space the copy takes,
+    the time includes writing the copy to the drive, otherwise it could still be sitting in the os cache
+    """
+    sync()
+    t = time()
+    copy_function(source_filepath, destination_filepath)
+    sync()
+    time_taken = time() - t
+    with open(source_filepath, "rb") as source, open(destination_filepath, "rb") as destination:
+        assert (source.read(sparse_data_size) == destination.read(sparse_data_size)), "copy is not the same as the source"
+    print("{}: {:.2f} seconds, copy uses {:.1f} MiB on the drive".format(copy_function.__name__, time_taken, os_stat_used_bytes(destination_filepath) / 1024**2))
+    remove(destination_filepath)
+
+    return None
+
+
+def os_stat_used_bytes(filepath: str) -> int:
+    """
+    returns the number of bytes filepath actually uses on the drive
+    """
+    return stat(filepath).st_blocks * 512
+
+
+if input("a sparse file of {} GiB and a file of {} GiB will be created in \"{}\" and copied, continue? (Y/N)\n".format(sparse_file_size / 1024**3, large_file_size / 1024**3, folder_path)).upper() != "Y":
+    raise InterruptedError
+
+makedirs(folder_path, exist_ok=True)
+source_filepath = path.join(folder_path, "sparse.img")
+create_sparse_file(source_filepath)
+print("source uses {:.1f} MiB on the drive".format(os_stat_used_bytes(source_filepath) / 1024**2))
+time_copy(copy2, source_filepath, path.join(folder_path, "copy2.img"))
+time_copy(copy_file, source_filepath, path.join(folder_path, "copy_file.img"))
+remove(source_filepath)
+
+source_filepath = path.join(folder_path, "large.bin")
+create_large_file(source_filepath)
+print("large file of {:.1f} MiB".format(large_file_size / 1024**2))
+time_copy(copy2, source_filepath, path.join(folder_path, "copy2.bin"))
+time_copy(copy_large_file, source_filepath, path.join(folder_path, "copy_large_file.bin"))
+time_copy(copy_file_in_ranges, source_filepath, path.join(folder_path, "copy_file_in_ranges.bin"))
+remove(source_filepath)
@@ -0,0 +1,60 @@
+from os import path, makedirs
+from time import time
+from concurrent.futures import ThreadPoolExecutor, wait
+import Copy_All_Files_From_Folder
+from Filelist import Filelist
+from file_folder_getters import get_folders_to_clean, count_folder_entries
+from fast_delete import delete_files
+
+number_of_files: int = 1000000 # number of files to create for each run
+files_per_folder: int = 1000 # number of files in each subfolder
+folder_path: str = path.abspath("DELETE_BENCHMARK") # created and then emptied by this script
+
+
+def create_tree() -> tuple[str, ...]:
+    """
+    creates number_of_files empty files split into subfolders of files_per_folder files
+
+    returns the filepaths
+    """
+    filepaths: list[str] = list()
+    for file_i in range(number_of_files):
+        subfolder_path = path.join(folder_path, "folder_{}".format(file_i // files_per_folder))
+        if file_i % files_per_folder == 0:
+            makedirs(subfolder_path, exist_ok=True)
+        filepath = path.join(subfolder_path, "test_file_{}.test".format(file_i))
+        open(filepath, "wb").close()
+        filepaths.append(filepath)
+
+    return tuple(filepaths)
+
+
+# what move_files used for operation D before fast_delete, os.stat and os.remove with the full path of each file
+move_files_unit_processor = getattr(Copy_All_Files_From_Folder, "__move_files_unit_processor")
+
+
+if input("{} files will be created in \"{}\" and deleted three times, continue? (Y/N)\n".format(number_of_files, folder_path)).upper() != "Y":
+    raise InterruptedError
+
+print("creating files...")
+filepaths = create_tree()
+print("deleting with move_files unit processor in groups of 100 files...")
+t = time()
+with ThreadPoolExecutor() as executor:
+    wait([executor.submit(move_files_unit_processor, filepaths[i:i+100], folder_path, None, "D", True) for i in range(0, len(filepaths), 100)])
+time_taken = time() - t
+print("{:.2f} seconds ({:.0f} files/s)".format(time_taken, number_of_files / time_taken))
+
+print("creating files...")
+filepaths = create_tree()
+print("deleting with fast_delete (only matching some files so folders aren't removed as a whole)...")
+filepaths = Filelist(folder_path, file_extensions=(".test",)).get_filepaths()
+folder_entry_counts = count_folder_entries(get_folders_to_clean(folder_path, set([path.dirname(filepath) for filepath in filepaths])))
+folder_entry_counts = {folderpath: entry_count + 1 for folderpath, entry_count in folder_entry_counts.items()} # pretend there is one more file so no folder is fully matched
+delete_files(filepaths, folder_entry_counts)
+
+print("creating files...")
+filepaths = create_tree()
+print("deleting with fast_delete (folders removed as a whole)...")
+folder_entry_counts = count_folder_entries(get_folders_to_clean(folder_path, set([path.dirname(filepath) for filepath in filepaths])))
+delete_files(filepaths, folder_entry_counts)
@@ -0,0 +1,79 @@
+import random
+import tracemalloc
+from time import time
+from duplicate_finder import DuplicateFinder
+from file_folder_getters import get_duplicate_files, get_duplicate_files_in_roots
+
+number_of_files: int = 2000000 # number of (made up) files to find duplicates among
+size_range: int = 8 * number_of_files # filesizes are random in [1, size_range], so that some of them have the same size
+
+
+def create_file_list() -> tuple[tuple[str, ...], tuple[int, ...], tuple[tuple[int, int], ...]]:
+    """
+    makes up filepaths, filesizes and inodes like the ones of a Filelist, nothing is written to the drive.
+    files don't exist so they are dropped when hashed, only the memory of keeping track of the files is measured
+
+    returns (filepaths, filesizes, inodes)
+    """
+    filepaths = tuple(["/benchmark/folder_{}/file_{}.test".format(file_i // 1000, file_i) for file_i in range(number_of_files)])
+    filesizes = tuple([random.randint(1, size_range) for _ in range(number_of_files)])
+    inodes = tuple([(1, file_i + 1) for file_i in range(number_of_files)])
+
+    return (filepaths, filesizes, inodes)
+
+
+def group_by_size_with_path_keyed_dicts(filepaths: tuple[str, ...], filesizes: tuple[int, ...]) -> list[list[str]]:
+    """
+    how get_duplicate_files used to group files by size before DuplicateFinder, with dicts keyed by filepath and lists of filepaths
+    """
+    filepath_sizes = dict(zip(filepaths, filesizes))
+    groups_by_size: dict[int, list[str]] = dict()
+    for filepath, filesize in filepath_sizes.items():
+        groups_by_size.setdefault(filesize, list()).append(filepath)
+
+    return [group for group in groups_by_size.values() if len(group) > 1]
+
+
+def measure(function, *args) -> None:
+    """
+    runs function and prints how long it took and the most memory it used at once, apart from its arguments
+    """
+    tracemalloc.start()
+    t = time()
+    function(*args)
+    time_taken = time() - t
+    (_, peak_bytes) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print("{}: {:.2f} seconds, {:.1f} MiB at most, {:.1f} bytes per file".format(function.__name__, time_taken, peak_bytes / 1024**2, peak_bytes / number_of_files))
+
+    return None
+
+
+def find_duplicates_with_duplicate_finder(filepaths: tuple[str, ...], filesizes: tuple[int, ...], inodes: tuple[tuple[int, int], ...]) -> None:
+    DuplicateFinder(filepaths, filesizes, inodes=inodes).find()
+
+    return None
+
+
+def find_duplicates_in_overlapping_roots(filepaths: tuple[str, ...]) -> None:
+    # both roots are in /benchmark, so the filepaths they share have to be removed from the second one
+    get_duplicate_files_in_roots((filepaths[:number_of_files // 2], filepaths[number_of_files // 4:]))
+
+    return None
+
+
+def find_duplicates_in_same_filepaths(filepaths: tuple[str, ...]) -> None:
+    # a reordered copy of the same filepaths, so that get_duplicate_files has to find out that they are the same
+    get_duplicate_files(filepaths, filepaths[::-1])
+
+    return None
+
+
+print("making up {} files...".format(number_of_files))
+(filepaths, filesizes, inodes) = create_file_list()
+
+measure(group_by_size_with_path_keyed_dicts, filepaths, filesizes)
+measure(find_duplicates_with_duplicate_finder, filepaths, filesizes, inodes)
+# the wrappers stat the made up files themselves, so this also measures DuplicateFinder dropping files that don't exist
+measure(find_duplicates_in_overlapping_roots, filepaths)
+measure(find_duplicates_in_same_filepaths, filepaths)
@@ -0,0 +1,255 @@
+import os
+import heapq
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from Filelist import Filelist, get_file_hash
+from progress_bar import progress_bar
+
+
+def format_manifest_line(filehash: str, relative_filepath: str) -> str:
+    """
+    returns one line of a sha256sum manifest, filenames with a backslash or a newline in them are escaped the same way as sha256sum
+    """
+    if "\\" in relative_filepath or "\n" in relative_filepath or "\r" in relative_filepath:
+        return "\\{}  {}\n".format(filehash, relative_filepath.replace("\\", "\\\\").replace("\n", "\\n").replace("\r", "\\r"))
+
+    return "{}  {}\n".format(filehash, relative_filepath)
+
+
+def parse_manifest_line(line: str) -> tuple[str, str] | None:
+    """
+    returns the pair of (hash, relative filepath) of one line of a sha256sum manifest (text or binary mode "*"),
+    None if the line is not a valid manifest line
+    """
+    line = line.removesuffix("\n").removesuffix("\r") # manifests written on windows end their lines with \r\n
+    escaped = line.startswith("\\")
+    if escaped:
+        line = line[1:]
+
+    filehash = line[:64]
+    if len(line) < 67 or line[64:66] not in ("  ", " *"):
+        return None
+    relative_filepath = line[66:]
+
+    if escaped:
+        relative_filepath = relative_filepath.replace("\\\\", "\0").replace("\\n", "\n").replace("\\r", "\r").replace("\0", "\\")
+
+    return (filehash.lower(), relative_filepath)
+
+
+def write_manifest(filelist: Filelist, input_folder: str, manifest_filepath: str, files_per_group: int = Filelist.FILES_PER_MULTITHREADED_IO_GROUP) -> tuple[int, int]:
+    """
+    writes a sha256sum manifest of every file in filelist, with filepaths relative to input_folder,
+    so that it can also be checked with "sha256sum -c" from inside of input_folder.
+    files are hashed by several threads, lines are written in the order of filelist as soon as their group is done
+
+    returns (number_of_files_hashed, number_of_failed_files), failed files not being in the manifest
+    """
+    input_folder = os.path.abspath(input_folder)
+    filepaths = filelist.get_filepaths()
+    grouped_filepaths = [filepaths[i:i+files_per_group] for i in range(0, len(filepaths), files_per_group)]
+
+    number_of_files_hashed = 0
+    number_of_failed_files = 0
+    progress = progress_bar(100, rate_units="files")
+
+    with open(manifest_filepath, "w", encoding="utf-8", newline="\n") as manifest_file:
+        with ThreadPoolExecutor() as executor:
+            for filepaths_group, filehashes in zip(grouped_filepaths, executor.map(__hash_files_unit_processor, grouped_filepaths)):
+                for filepath, filehash in zip(filepaths_group, filehashes):
+                    if filehash == "":
+                        number_of_failed_files += 1
+                        continue
+                    manifest_file.write(format_manifest_line(filehash, os.path.relpath(filepath, input_folder).replace(os.sep, "/")))
+                    number_of_files_hashed += 1
+                progress.print_progress_bar((number_of_files_hashed + number_of_failed_files) / len(filepaths), number_of_files_hashed)
+
+    print("") # to add a newline after the end of the progress bar
+
+    return (number_of_files_hashed, number_of_failed_files)
+
+
+def __hash_files_unit_processor(filepaths: tuple[str, ...]) -> list[str]:
+    """
+    multithreaded unit processor for write_manifest
+    do not use on its own
+
+    returns the hashes of filepaths, an empty string for files that couldn't be read
+    """
+    filehashes: list[str] = list()
+    for filepath in filepaths:
+        try:
+            filehashes.append(get_file_hash(filepath))
+        except FileNotFoundError:
+            filehashes.append("")
+
+    return filehashes
+
+
+def verify_manifest(manifest_filepath: str, input_folder: str, report_filepath: str | None = None, number_of_shards: int | None = None, files_per_batch: int = 10000, lines_per_run: int = 1000000) -> dict[str, int]:
+    """
+    checks every file of input_folder against a sha256sum manifest (as written by write_manifest or sha256sum)
+
+    the manifest is only streamed, never loaded: it is cut into runs of lines_per_run lines that are each sorted by filepath
+    into a temporary file, then the runs are merged back together while being gone through side by side (merge join)
+    with the sorted relative filepaths of input_folder (Filelist has them in memory anyway), without looking anything up.
+    the lines of files that exist are written to number_of_shards temporary shard files (None for one per cpu) that are verified by separate processes.
+    each process reads its shard files_per_batch lines at a time and hashes them in the order they are on each drive
+    (device, then inode) so that reads are as sequential as possible.
+    a file that is in the manifest more than once is checked against every one of its lines, like sha256sum -c
+
+    problems are written to report_filepath if given, one per line like sha256sum -c:
+    "path: FAILED" (hash doesn't match), "path: FAILED open or read", "path: MISSING" (in the manifest, not in input_folder),
+    "path: EXTRA" (in input_folder, not in the manifest)
+
+    returns a dict of the number of files that are "ok", "corrupt", "unreadable", "missing", "extra" and the number of "invalid_lines" in the manifest
+    """
+    assert (os.path.isdir(input_folder)), "input_folder was not a folder"
+    assert (os.path.isfile(manifest_filepath)), "manifest_filepath does not exist"
+
+    input_folder = os.path.abspath(input_folder)
+    manifest_filepath = os.path.abspath(manifest_filepath)
+    if number_of_shards is None:
+        number_of_shards = os.cpu_count() or 1
+
+    print("finding all files in input folder...")
+    manifest_relative_filepath = os.path.relpath(manifest_filepath, input_folder).replace(os.sep, "/") # in case the manifest is in input_folder
+    relative_filepaths = [relative_filepath for relative_filepath in [os.path.relpath(filepath, input_folder).replace(os.sep, "/") for filepath in Filelist(input_folder).get_filepaths()] if relative_filepath != manifest_relative_filepath]
+    relative_filepaths.sort()
+
+    counts = {"ok": 0, "corrupt": 0, "unreadable": 0, "missing": 0, "extra": 0, "invalid_lines": 0}
+    report_file = open(report_filepath, "w", encoding="utf-8") if report_filepath is not None else None
+
+    with tempfile.TemporaryDirectory() as shard_folder:
+        print("sorting manifest...")
+        (run_filepaths, counts["invalid_lines"]) = __write_sorted_runs(manifest_filepath, shard_folder, lines_per_run)
+
+        print("reading manifest...")
+        shard_filepaths = [os.path.join(shard_folder, "shard_{}.sha256".format(shard_index)) for shard_index in range(number_of_shards)]
+        shard_files = [open(shard_filepath, "w", encoding="utf-8", newline="\n") for shard_filepath in shard_filepaths]
+        run_files = [open(run_filepath, "r", encoding="utf-8", newline="\n") for run_filepath in run_filepaths]
+        line_count = 0
+        index = 0 # in relative_filepaths
+        last_relative_filepath = None # the last file of input_folder that was in the manifest
+        for filehash, relative_filepath in heapq.merge(*[map(parse_manifest_line, run_file) for run_file in run_files], key=lambda parsed_line: parsed_line[1]):
+            while index < len(relative_filepaths) and relative_filepaths[index] < relative_filepath:
+                counts["extra"] += 1
+                if report_file is not None:
+                    report_file.write("{}: EXTRA\n".format(relative_filepaths[index]))
+                index += 1
+            if index < len(relative_filepaths) and relative_filepaths[index] == relative_filepath:
+                last_relative_filepath = relative_filepath
+                index += 1
+            elif relative_filepath != last_relative_filepath: # not a repeated line of the file that was just matched
+                counts["missing"] += 1
+                if report_file is not None:
+                    report_file.write("{}: MISSING\n".format(relative_filepath))
+                continue
+            # consecutive lines go to the same shard so that each shard keeps the sorted order (folder order)
+            shard_files[(line_count // files_per_batch) % number_of_shards].write(format_manifest_line(filehash, relative_filepath))
+            line_count += 1
+        for opened_file in shard_files + run_files:
+            opened_file.close()
+
+        counts["extra"] += len(relative_filepaths) - index
+        if report_file is not None:
+            for relative_filepath in relative_filepaths[index:]:
+                report_file.write("{}: EXTRA\n".format(relative_filepath))
+        relative_filepaths = list() # free the memory before verifying
+
+        print("verifying {} files...".format(line_count))
+        progress = progress_bar(100, rate_units="shards")
+        with ProcessPoolExecutor(max_workers=number_of_shards) as executor:
+            threads = [executor.submit(verify_shard, shard_filepath, input_folder, shard_filepath + ".problems", files_per_batch) for shard_filepath in shard_filepaths]
+            for shard_index in range(len(threads)):
+                (ok_count, corrupt_count, unreadable_count) = threads[shard_index].result()
+                counts["ok"] += ok_count
+                counts["corrupt"] += corrupt_count
+                counts["unreadable"] += unreadable_count
+                if report_file is not None:
+                    with open(shard_filepaths[shard_index] + ".problems", "r", encoding="utf-8") as problems_file:
+                        for problem_line in problems_file:
+                            report_file.write(problem_line)
+                progress.print_progress_bar((shard_index + 1) / len(threads), shard_index + 1)
+        print("") # to add a newline after the end of the progress bar
+
+    if report_file is not None:
+        report_file.close()
+
+    return counts
+
+
+def __write_sorted_runs(manifest_filepath: str, folder: str, lines_per_run: int) -> tuple[list[str], int]:
+    """
+    writes the valid lines of the manifest to files in folder, lines_per_run lines per file, each file sorted by filepath
+
+    returns (filepaths of the sorted runs, number of invalid lines)
+    """
+    run_filepaths: list[str] = list()
+    invalid_line_count = 0
+
+    with open(manifest_filepath, "r", encoding="utf-8", newline="\n") as manifest_file:
+        while True:
+            run: list[tuple[str, str]] = list()
+            for line in manifest_file:
+                parsed_line = parse_manifest_line(line)
+                if parsed_line is None:
+                    invalid_line_count += 1
+                    continue
+                run.append(parsed_line)
+                if len(run) >= lines_per_run:
+                    break
+            if len(run) == 0:
+                break
+
+            run.sort(key=lambda parsed_line: parsed_line[1])
+            run_filepaths.append(os.path.join(folder, "run_{}.sha256".format(len(run_filepaths))))
+            with open(run_filepaths[-1], "w", encoding="utf-8", newline="\n") as run_file:
+                run_file.writelines([format_manifest_line(filehash, relative_filepath) for filehash, relative_filepath in run])
+
+    return (run_filepaths, invalid_line_count)
+
+
+def verify_shard(shard_filepath: str, input_folder: str, problems_filepath: str, files_per_batch: int = 10000) -> tuple[int, int, int]:
+    """
+    checks the files of one shard of a manifest, see verify_manifest, runs in its own process
+
+    writes every file that doesn't match (or can't be read) to problems_filepath
+
+    returns (number_of_ok_files, number_of_corrupt_files, number_of_unreadable_files)
+    """
+    ok_count = 0
+    corrupt_count = 0
+    unreadable_count = 0
+
+    with open(shard_filepath, "r", encoding="utf-8", newline="\n") as shard_file, open(problems_filepath, "w", encoding="utf-8") as problems_file:
+        while True:
+            batch: list[tuple[int, int, str, str]] = list() # (device, inode, relative filepath, hash)
+            for line in shard_file:
+                (filehash, relative_filepath) = parse_manifest_line(line)
+                try:
+                    file_stat = os.stat(os.path.join(input_folder, *relative_filepath.split("/")))
+                    batch.append((file_stat.st_dev, file_stat.st_ino, relative_filepath, filehash))
+                except OSError:
+                    batch.append((-1, -1, relative_filepath, filehash)) # will fail when hashed
+                if len(batch) >= files_per_batch:
+                    break
+            if len(batch) == 0:
+                break
+
+            batch.sort() # by device, then by inode, which is close to the order of the files on the drive
+            for (_, _, relative_filepath, filehash) in batch:
+                try:
+                    actual_filehash = get_file_hash(os.path.join(input_folder, *relative_filepath.split("/")))
+                except FileNotFoundError:
+                    actual_filehash = ""
+                if actual_filehash == "":
+                    unreadable_count += 1
+                    problems_file.write("{}: FAILED open or read\n".format(relative_filepath))
+                elif actual_filehash != filehash:
+                    corrupt_count += 1
+                    problems_file.write("{}: FAILED\n".format(relative_filepath))
+                else:
+                    ok_count += 1
+
+    return (ok_count, corrupt_count, unreadable_count)
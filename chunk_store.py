@@ -0,0 +1,349 @@
+import os
+import re
+import json
+import zlib
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from time import strftime, perf_counter
+from progress_bar import progress_bar
+
+
+# chunks can only end right after one of these bytes (anchors), found by the regex engine instead of going through every byte in python.
+# about one byte in 128 of random data is an anchor, text files have a newline every few dozen bytes
+ANCHOR_PATTERN = re.compile(b"[\n\x8f]")
+ANCHOR_DENSITY = 128
+WINDOW_SIZE = 64 # bytes before an anchor that decide if a chunk ends there
+READ_SIZE = 16*1024*1024 # read from a file at a time while chunking
+
+
+def get_chunk_end(data: bytes, start: int, min_chunk_size: int = 256*1024, average_chunk_size: int = 1024*1024, max_chunk_size: int = 8*1024*1024) -> int:
+    """
+    content defined chunking: returns where the chunk of data that starts at start ends (excluded).
+    a chunk ends right after an anchor byte (see ANCHOR_PATTERN) when the hash (crc32) of the WINDOW_SIZE bytes before it is low enough
+    for chunks to be about average_chunk_size bytes, and never before min_chunk_size bytes (so those aren't even looked at) or after max_chunk_size bytes.
+    since only the bytes right before it decide where a chunk ends, bytes inserted or removed in a file only change the chunks around them,
+    the chunks after that end at the same bytes as before
+
+    data must have at least max_chunk_size bytes after start, unless it is the end of the file
+    """
+    if len(data) - start <= min_chunk_size:
+        return len(data)
+
+    # probability of each anchor to end the chunk, for chunks to end about average_chunk_size - min_chunk_size bytes after the minimum
+    threshold = int(2**32 * ANCHOR_DENSITY / max(average_chunk_size - min_chunk_size, ANCHOR_DENSITY))
+    limit = min(start + max_chunk_size, len(data))
+    position = start + min_chunk_size
+    while True:
+        match = ANCHOR_PATTERN.search(data, position, limit)
+        if match is None:
+            return limit
+        position = match.end()
+        if zlib.crc32(data[position-WINDOW_SIZE:position]) < threshold:
+            return position
+
+
+def get_chunk_filepath(store_folder: str, chunk_hash: str) -> str:
+    """
+    returns where the chunk with chunk_hash (sha256) is in the store, chunks are spread over 65536 subfolders by the start of their hash
+    """
+    return os.path.join(store_folder, "chunks", chunk_hash[:2], chunk_hash[2:4], chunk_hash)
+
+
+def backup_files(filepaths: tuple[str, ...], input_folder: str, store_folder: str, filesizes: tuple[int, ...] | None = None, average_chunk_size: int = 1024*1024, max_workers: int | None = None, run_name: str | None = None) -> tuple[int, int, list[tuple[str, str, int, float, int]], dict[str, int | float]]:
+    """
+    backs filepaths up into a deduplicated chunk store in store_folder:
+    every file is split into chunks by its contents (see get_chunk_end), each chunk is stored once as a file named by its sha256
+    (in store_folder/chunks, see get_chunk_filepath), chunks that already are in the store are not written again.
+    every file gets a recipe, store_folder/recipes/run_name/relative filepath.recipe, a JSON object with its size, modification time and chunks:
+    {"size": 1234, "mtime": 1700000000.0, "chunks": [["sha256", size], ...]}
+    so a new version of a big file that only changed in a few places only adds the chunks around the changes. see restore_files()
+
+    files are chunked and hashed by several processes at once (max_workers, None for one per cpu), each writing the new chunks it finds.
+    average_chunk_size is only used when the store is created (min and max chunk sizes being a quarter and 8 times that),
+    a store keeps its chunk sizes in store_folder/settings.json so that later backups cut files the same way
+
+    filesizes (same order as filepaths) is only used for the progress bar, run_name defaults to the current date and time
+
+    returns (number_of_files_backed_up, number_of_failed_files, results, stats),
+    results being one result per file for RunReport (operation "B"),
+    stats being a dict of "files", "bytes" (read from the files), "chunks", "new_chunks", "new_bytes" (written to the store),
+    "dedupe_ratio" (bytes / new_bytes), "seconds" and "megabytes_per_second" (bytes read per second)
+    """
+    assert (isinstance(filepaths, tuple)), "filepaths was not a tuple"
+    assert (isinstance(average_chunk_size, int) and average_chunk_size >= 4*WINDOW_SIZE), "average_chunk_size was too small"
+
+    input_folder = os.path.abspath(input_folder)
+    store_folder = os.path.abspath(store_folder)
+    if run_name is None:
+        run_name = "backup_" + strftime("%Y-%m-%d_%H-%M-%S")
+    (min_chunk_size, average_chunk_size, max_chunk_size) = __get_chunk_sizes(store_folder, average_chunk_size)
+    recipes_folder = os.path.join(store_folder, "recipes", run_name)
+    os.makedirs(recipes_folder, exist_ok=True)
+
+    results: list[tuple[str, str, int, float, int]] = list()
+    stats: dict[str, int | float] = {"files": 0, "bytes": 0, "chunks": 0, "new_chunks": 0, "new_bytes": 0}
+    number_of_failed_files = 0
+    total_size = sum(filesizes) if filesizes is not None else 0
+    start_time = perf_counter()
+
+    progress = progress_bar(100, rate_units="MB")
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        threads = {executor.submit(chunk_file_into_store, filepath, store_folder, min_chunk_size, average_chunk_size, max_chunk_size): filepath for filepath in filepaths}
+        for thread in as_completed(threads):
+            filepath = threads[thread]
+            (error_number, filesize, mtime, chunks, new_chunks, new_bytes, seconds) = thread.result()
+            if error_number == -1:
+                relative_filepath = os.path.relpath(filepath, input_folder)
+                try:
+                    __write_recipe(os.path.join(recipes_folder, relative_filepath + ".recipe"), filesize, mtime, chunks)
+                except OSError:
+                    error_number = 5
+            if error_number == -1:
+                stats["files"] += 1
+                stats["chunks"] += len(chunks)
+            else:
+                number_of_failed_files += 1
+            # chunks that were written are kept even if the file failed, the next backup can use them
+            stats["bytes"] += filesize
+            stats["new_chunks"] += new_chunks
+            stats["new_bytes"] += new_bytes
+            results.append((filepath, "B", filesize, seconds, error_number))
+
+            if total_size > 0:
+                progress.print_progress_bar(min(stats["bytes"] / total_size, 1.0), stats["bytes"] / 10**6)
+
+    print("") # to add a newline after the end of the progress bar
+
+    stats["seconds"] = perf_counter() - start_time
+    stats["megabytes_per_second"] = stats["bytes"] / 10**6 / stats["seconds"] if stats["seconds"] > 0 else 0.0
+    stats["dedupe_ratio"] = stats["bytes"] / stats["new_bytes"] if stats["new_bytes"] > 0 else float("inf")
+
+    return (stats["files"], number_of_failed_files, results, stats)
+
+
+def chunk_file_into_store(filepath: str, store_folder: str, min_chunk_size: int, average_chunk_size: int, max_chunk_size: int) -> tuple[int, int, float, list[tuple[str, int]], int, int, float]:
+    """
+    splits one file into chunks (see get_chunk_end) and writes the ones that aren't in the store yet, runs in its own process (see backup_files).
+    a chunk is written to a temporary file that is renamed once complete, so the store never has a partial chunk,
+    even if two processes write the same chunk at once
+
+    returns (error number, filesize, mtime, chunks, number_of_new_chunks, new_bytes, seconds),
+    chunks being a list of pairs of (sha256, size), error number being -1 if the file was backed up,
+    6 if it couldn't be found and 5 if it couldn't be read or a chunk couldn't be written
+    """
+    start_time = perf_counter()
+    chunks: list[tuple[str, int]] = list()
+    new_chunks = 0
+    new_bytes = 0
+    filesize = 0
+    mtime = 0.0
+
+    try:
+        with open(filepath, "rb") as file_handle:
+            file_stat = os.fstat(file_handle.fileno())
+            mtime = file_stat.st_mtime
+            buffer = b""
+            position = 0
+            end_of_file = False
+            while True:
+                while not end_of_file and len(buffer) - position < max_chunk_size:
+                    block = file_handle.read(READ_SIZE)
+                    if len(block) == 0:
+                        end_of_file = True
+                    else:
+                        buffer = buffer[position:] + block
+                        position = 0
+                if position >= len(buffer):
+                    break
+
+                chunk_end = get_chunk_end(buffer, position, min_chunk_size, average_chunk_size, max_chunk_size)
+                chunk = memoryview(buffer)[position:chunk_end]
+                chunk_hash = hashlib.sha256(chunk).hexdigest()
+                chunks.append((chunk_hash, len(chunk)))
+                filesize += len(chunk)
+                if __write_chunk(store_folder, chunk_hash, chunk):
+                    new_chunks += 1
+                    new_bytes += len(chunk)
+                chunk.release()
+                position = chunk_end
+    except FileNotFoundError: # file was deleted, renamed or moved before it could be processed
+        return (6, filesize, mtime, chunks, new_chunks, new_bytes, perf_counter() - start_time)
+    except OSError:
+        return (5, filesize, mtime, chunks, new_chunks, new_bytes, perf_counter() - start_time)
+
+    return (-1, filesize, mtime, chunks, new_chunks, new_bytes, perf_counter() - start_time)
+
+
+def restore_files(recipes_folder: str, output_folder: str, max_workers: int | None = None) -> tuple[int, int, list[tuple[str, str, int, float, int]]]:
+    """
+    rebuilds every file of a backup (recipes_folder being store_folder/recipes/run_name, see backup_files) into output_folder,
+    with the same relative filepaths and modification times. every chunk is checked against its hash as it is read.
+    files are rebuilt by several threads at once, each one through a temporary file that is renamed once complete.
+    a file that already exists in output_folder is never overwritten, same as move_files:
+    identical files are left as they are (error 0), otherwise the restored file gets a numbered filename (error 4)
+
+    returns (number_of_files_restored, number_of_failed_files, results),
+    results being one result per file for RunReport (operation "X"), error number 5 for files with a missing or corrupt chunk
+    """
+    assert (os.path.isdir(recipes_folder)), "recipes_folder was not a folder"
+
+    recipes_folder = os.path.abspath(recipes_folder)
+    store_folder = os.path.dirname(os.path.dirname(recipes_folder))
+    output_folder = os.path.abspath(output_folder)
+
+    recipe_filepaths = [os.path.join(folderpath, filename) for folderpath, _, filenames in os.walk(recipes_folder) for filename in filenames if filename.endswith(".recipe")]
+
+    results: list[tuple[str, str, int, float, int]] = list()
+    number_of_files_restored = 0
+    number_of_failed_files = 0
+
+    progress = progress_bar(100, rate_units="files")
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        threads = [executor.submit(__restore_file_unit_processor, recipe_filepath, store_folder, os.path.join(output_folder, os.path.relpath(recipe_filepath, recipes_folder)[:-len(".recipe")]))
+                   for recipe_filepath in recipe_filepaths]
+        for index, thread in enumerate(as_completed(threads)):
+            result = thread.result()
+            if result[4] in (-1, 4):
+                number_of_files_restored += 1
+            elif result[4] == 5:
+                number_of_failed_files += 1
+            results.append(result)
+            progress.print_progress_bar((index + 1) / len(threads), index + 1)
+
+    print("") # to add a newline after the end of the progress bar
+
+    return (number_of_files_restored, number_of_failed_files, results)
+
+
+def __restore_file_unit_processor(recipe_filepath: str, store_folder: str, destination_filepath: str) -> tuple[str, str, int, float, int]:
+    """
+    multithreaded unit processor for restore_files
+    do not use on its own
+
+    the file is compared with destination_filepath while it is rebuilt if that already exists
+
+    returns the result of the file for RunReport, with the error numbers of move_file_error:
+    -1 if restored, 0 if an identical file was already there, 4 if renamed, 5 for a missing or corrupt chunk or recipe
+    """
+    start_time = perf_counter()
+    temporary_filepath = None # only set once this call created it, no other file is ever removed
+    filesize = 0
+    existing_handle = None
+
+    try:
+        with open(recipe_filepath, "r", encoding="utf-8") as recipe_file:
+            recipe = json.load(recipe_file)
+        filesize = recipe["size"]
+        os.makedirs(os.path.dirname(destination_filepath), exist_ok=True)
+        if os.path.exists(destination_filepath):
+            existing_handle = open(destination_filepath, "rb")
+        files_are_identical = existing_handle is not None
+        (temporary_filepath, destination_handle) = __create_temporary_file(destination_filepath)
+        with destination_handle:
+            for chunk_hash, chunk_size in recipe["chunks"]:
+                with open(get_chunk_filepath(store_folder, chunk_hash), "rb") as chunk_handle:
+                    chunk = chunk_handle.read()
+                if len(chunk) != chunk_size or hashlib.sha256(chunk).hexdigest() != chunk_hash:
+                    raise ValueError # corrupt chunk
+                if files_are_identical and existing_handle.read(len(chunk)) != chunk:
+                    files_are_identical = False
+                destination_handle.write(chunk)
+        if files_are_identical and existing_handle.read(1) != b"": # existing file is longer
+            files_are_identical = False
+        os.utime(temporary_filepath, (recipe["mtime"], recipe["mtime"]))
+
+        if files_are_identical:
+            os.remove(temporary_filepath)
+            return (destination_filepath, "X", filesize, perf_counter() - start_time, 0)
+        if existing_handle is None:
+            os.replace(temporary_filepath, destination_filepath)
+            return (destination_filepath, "X", filesize, perf_counter() - start_time, -1)
+
+        (destination_folder, destination_filename) = os.path.split(destination_filepath)
+        (name, extension) = os.path.splitext(destination_filename)
+        retry_count = 0
+        while os.path.exists(os.path.join(destination_folder, "{} ({}){}".format(name, retry_count, extension))):
+            retry_count += 1
+        os.replace(temporary_filepath, os.path.join(destination_folder, "{} ({}){}".format(name, retry_count, extension)))
+    except (OSError, ValueError, KeyError): # missing or corrupt chunk or recipe
+        if temporary_filepath is not None:
+            try:
+                os.remove(temporary_filepath)
+            except OSError:
+                pass
+        return (destination_filepath, "X", filesize, perf_counter() - start_time, 5)
+    finally:
+        if existing_handle is not None:
+            existing_handle.close()
+
+    return (destination_filepath, "X", filesize, perf_counter() - start_time, 4)
+
+
+def __create_temporary_file(destination_filepath: str):
+    """
+    creates and opens (for writing bytes) a temporary file next to destination_filepath that no other file had the name of,
+    trying "<destination_filepath>.<pid>.<n>.restoring" with n counting up, so no existing file is ever overwritten
+
+    returns (temporary_filepath, file handle)
+
+    may raise OSError
+    """
+    attempt = 0
+    while True:
+        temporary_filepath = "{}.{}.{}.restoring".format(destination_filepath, os.getpid(), attempt)
+        try:
+            return (temporary_filepath, open(temporary_filepath, "xb"))
+        except FileExistsError:
+            attempt += 1
+
+
+def __write_chunk(store_folder: str, chunk_hash: str, chunk: memoryview) -> bool:
+    """
+    writes a chunk to the store if it isn't there yet
+
+    returns True if it was written, False if it was already in the store
+
+    may raise OSError
+    """
+    chunk_filepath = get_chunk_filepath(store_folder, chunk_hash)
+    if os.path.exists(chunk_filepath):
+        return False
+
+    os.makedirs(os.path.dirname(chunk_filepath), exist_ok=True)
+    temporary_filepath = "{}.{}.tmp".format(chunk_filepath, os.getpid())
+    with open(temporary_filepath, "wb") as chunk_handle:
+        chunk_handle.write(chunk)
+    os.replace(temporary_filepath, chunk_filepath)
+
+    return True
+
+
+def __write_recipe(recipe_filepath: str, filesize: int, mtime: float, chunks: list[tuple[str, int]]) -> None:
+    """
+    writes the recipe of a file, see backup_files
+
+    may raise OSError
+    """
+    os.makedirs(os.path.dirname(recipe_filepath), exist_ok=True)
+    with open(recipe_filepath, "w", encoding="utf-8") as recipe_file:
+        recipe_file.write('{{"size": {}, "mtime": {}, "chunks": [{}]}}\n'.format(filesize, mtime, ", ".join(['["{}", {}]'.format(chunk_hash, chunk_size) for chunk_hash, chunk_size in chunks])))
+
+    return None
+
+
+def __get_chunk_sizes(store_folder: str, average_chunk_size: int) -> tuple[int, int, int]:
+    """
+    returns (min_chunk_size, average_chunk_size, max_chunk_size) of the store, writing them to its settings if it is a new store
+    """
+    settings_filepath = os.path.join(store_folder, "settings.json")
+    if os.path.exists(settings_filepath):
+        with open(settings_filepath, "r", encoding="utf-8") as settings_file:
+            settings = json.load(settings_file)
+        return (settings["min_chunk_size"], settings["average_chunk_size"], settings["max_chunk_size"])
+
+    os.makedirs(store_folder, exist_ok=True)
+    (min_chunk_size, max_chunk_size) = (average_chunk_size // 4, average_chunk_size * 8)
+    with open(settings_filepath, "w", encoding="utf-8") as settings_file:
+        settings_file.write('{{"min_chunk_size": {}, "average_chunk_size": {}, "max_chunk_size": {}}}\n'.format(min_chunk_size, average_chunk_size, max_chunk_size))
+
+    return (min_chunk_size, average_chunk_size, max_chunk_size)
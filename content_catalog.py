@@ -0,0 +1,278 @@
+import os
+import sqlite3
+from threading import Lock
+from Filelist import get_file_hash
+from duplicate_finder import get_sampled_hash
+
+
+CATALOG_FILENAME = ".content_catalog.sqlite" # default name of the catalog, in the folder it catalogs
+CATALOG_ACTIONS = ("skip", "link")
+
+
+class ContentCatalog():
+    """
+    Keeps track of the contents of a big folder (an archive of files) by size and hash, in an sqlite file,
+    to know whether a file is already stored in it under any name and path before copying it there (see find()).
+
+    Files are only stat'ed when the catalog is updated: each folder is a row with its modification time,
+    and only the files of folders whose modification time changed (files added, removed or renamed) are stat'ed again,
+    so updating a catalog that barely changed only lists the folders.
+    Files are a row each (folder, name, size, modification time, partial hash, full hash) with an index on size,
+    so looking up a size is a search in a b-tree on the drive that stays fast with 100M files, nearly none of it being in memory.
+
+    Hashes are only obtained when they are needed: the first time a file of the same size is looked up,
+    the partial hash (see get_sampled_hash) of the files of that size is obtained and kept, then the full hash (sha256)
+    of the ones with the same partial hash. Files whose size no file being looked up has are never read.
+    Files of small_file_size or less only get a full hash.
+    A file that was modified in place (same folder modification time) is noticed when it matches, by its own modification time,
+    and hashed again.
+
+    Can be shared between threads, the catalog is only used by one thread at a time while files are hashed outside of it.
+    """
+    CHANGES_PER_COMMIT = 10000 # changes kept in memory before they are written to the catalog file
+
+    def __init__(self, catalog_filepath: str, root_folder: str | None = None, small_file_size: int = 1024*1024) -> None:
+        """
+        opens the catalog at catalog_filepath, creating it for root_folder if it doesn't exist yet.
+        root_folder can be left out for an existing catalog, otherwise it must be the folder that the catalog was made for
+        """
+        catalog_exists = os.path.exists(catalog_filepath)
+        assert (catalog_exists or root_folder is not None), "catalog does not exist and root_folder was not given"
+
+        self.__catalog_filepath = os.path.abspath(catalog_filepath)
+        self.__small_file_size = small_file_size
+        self.__lock = Lock()
+        self.__connection = sqlite3.connect(self.__catalog_filepath, check_same_thread=False)
+        self.__changes = 0
+
+        self.__connection.execute("CREATE TABLE IF NOT EXISTS settings (name TEXT PRIMARY KEY, value TEXT)")
+        self.__connection.execute("CREATE TABLE IF NOT EXISTS folders (folder_id INTEGER PRIMARY KEY, path TEXT UNIQUE, mtime_ns INTEGER)")
+        # without rowid, the primary key is the table, so a file is stored only once
+        self.__connection.execute("CREATE TABLE IF NOT EXISTS files (folder_id INTEGER, name TEXT, size INTEGER, mtime_ns INTEGER, partial_hash TEXT, full_hash TEXT, PRIMARY KEY (folder_id, name)) WITHOUT ROWID")
+        self.__connection.execute("CREATE INDEX IF NOT EXISTS files_by_size ON files (size)")
+
+        row = self.__connection.execute("SELECT value FROM settings WHERE name = 'root_folder'").fetchone()
+        if row is None:
+            self.__root_folder = os.path.abspath(root_folder)
+            self.__connection.execute("INSERT INTO settings VALUES ('root_folder', ?)", (self.__root_folder,))
+            self.__connection.commit()
+        else:
+            self.__root_folder = row[0]
+            assert (root_folder is None or os.path.abspath(root_folder) == self.__root_folder), "catalog was made for another root_folder"
+
+        return None
+
+
+    def update(self) -> tuple[int, int, int]:
+        """
+        brings the catalog up to date with root_folder, printing the progress as it goes
+
+        returns (number_of_folders_listed, number_of_files_stated, number_of_files_in_catalog)
+        """
+        folders_listed = 0
+        files_stated = 0
+
+        with self.__lock:
+            folder_rows = {path: (folder_id, mtime_ns) for folder_id, path, mtime_ns in self.__connection.execute("SELECT folder_id, path, mtime_ns FROM folders")}
+
+            folderpaths_to_list = [self.__root_folder]
+            while len(folderpaths_to_list) > 0:
+                folderpath = folderpaths_to_list.pop()
+                try:
+                    folder_mtime_ns = os.stat(folderpath).st_mtime_ns
+                    entries = list(os.scandir(folderpath))
+                except OSError:
+                    continue # removed while updating, or not allowed in it
+                folders_listed += 1
+                relative_folderpath = os.path.relpath(folderpath, self.__root_folder)
+                folderpaths_to_list.extend([entry.path for entry in entries if entry.is_dir(follow_symlinks=False)])
+
+                folder_row = folder_rows.pop(relative_folderpath, None)
+                if folder_row is None:
+                    folder_id = self.__connection.execute("INSERT INTO folders (path, mtime_ns) VALUES (?, ?)", (relative_folderpath, -1)).lastrowid
+                    folder_row = (folder_id, -1)
+                (folder_id, last_mtime_ns) = folder_row
+                if folder_mtime_ns == last_mtime_ns:
+                    continue # no file was added, removed or renamed in it
+                self.__connection.execute("UPDATE folders SET mtime_ns = ? WHERE folder_id = ?", (folder_mtime_ns, folder_id))
+
+                file_rows = {name: (size, mtime_ns) for name, size, mtime_ns in self.__connection.execute("SELECT name, size, mtime_ns FROM files WHERE folder_id = ?", (folder_id,))}
+                for entry in entries:
+                    if not entry.is_file(follow_symlinks=False) or entry.path.startswith(self.__catalog_filepath):
+                        continue # the catalog (and its journal) isn't part of the archive
+                    try:
+                        file_stat = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    files_stated += 1
+                    if file_rows.pop(entry.name, None) != (file_stat.st_size, file_stat.st_mtime_ns):
+                        # new or changed file, its hashes will be obtained when they are needed
+                        self.__connection.execute("REPLACE INTO files VALUES (?, ?, ?, ?, NULL, NULL)", (folder_id, entry.name, file_stat.st_size, file_stat.st_mtime_ns))
+                        self.__count_change()
+                self.__connection.executemany("DELETE FROM files WHERE folder_id = ? AND name = ?", [(folder_id, name) for name in file_rows])
+
+                if folders_listed % 1000 == 0:
+                    print("\r{} folders listed, {} files stat'ed".format(folders_listed, files_stated), end="")
+
+            # folders that are gone
+            for folder_id, _ in folder_rows.values():
+                self.__connection.execute("DELETE FROM files WHERE folder_id = ?", (folder_id,))
+                self.__connection.execute("DELETE FROM folders WHERE folder_id = ?", (folder_id,))
+            self.__connection.commit()
+            self.__changes = 0
+            number_of_files = self.__connection.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+        print("\r{} folders listed, {} files stat'ed".format(folders_listed, files_stated))
+
+        return (folders_listed, files_stated, number_of_files)
+
+
+    def find(self, filepath: str, filesize: int) -> tuple[str | None, str, str]:
+        """
+        looks for a file of the catalog with the same contents as filepath (of filesize bytes): same size, then same partial hash, then same full hash
+
+        returns (filepath of the identical file in the catalog or None, partial hash of filepath, full hash of filepath),
+        the hashes of filepath being empty strings if they weren't needed (see add())
+
+        may raise FileNotFoundError
+        """
+        partial_hash = ""
+        full_hash = ""
+        if filesize == 0:
+            return (None, partial_hash, full_hash) # all empty files would match
+
+        with self.__lock:
+            candidates = self.__connection.execute("SELECT folders.path, files.name, files.mtime_ns, files.partial_hash, files.full_hash FROM files JOIN folders USING (folder_id) WHERE files.size = ?", (filesize,)).fetchall()
+        if len(candidates) == 0:
+            return (None, partial_hash, full_hash)
+
+        if filesize > self.__small_file_size:
+            (partial_hash, _) = get_sampled_hash(filepath, filesize)
+            if partial_hash == "":
+                return (None, partial_hash, full_hash)
+            matching_candidates = list()
+            for relative_folderpath, name, mtime_ns, candidate_partial_hash, candidate_full_hash in candidates:
+                if candidate_partial_hash is None:
+                    candidate_partial_hash = self.__hash_candidate(relative_folderpath, name, filesize, mtime_ns, "partial")
+                if candidate_partial_hash == partial_hash:
+                    matching_candidates.append((relative_folderpath, name, mtime_ns, candidate_partial_hash, candidate_full_hash))
+            candidates = matching_candidates
+            if len(candidates) == 0:
+                return (None, partial_hash, full_hash)
+
+        full_hash = get_file_hash(filepath)
+        if full_hash == "": # couldn't be read, it can't be told identical to anything
+            return (None, partial_hash, full_hash)
+        for relative_folderpath, name, mtime_ns, candidate_partial_hash, candidate_full_hash in candidates:
+            if candidate_full_hash is None:
+                candidate_full_hash = self.__hash_candidate(relative_folderpath, name, filesize, mtime_ns, "full")
+            if candidate_full_hash == "" or candidate_full_hash != full_hash: # unreadable candidates are skipped
+                continue
+            candidate_filepath = os.path.join(self.__root_folder, relative_folderpath, name)
+            try:
+                candidate_stat = os.stat(candidate_filepath)
+            except OSError:
+                continue
+            if (candidate_stat.st_size, candidate_stat.st_mtime_ns) == (filesize, mtime_ns):
+                return (os.path.normpath(candidate_filepath), partial_hash, full_hash)
+            # changed in place since it was hashed
+            candidate_full_hash = self.__hash_candidate(relative_folderpath, name, filesize, -1, "full")
+            if candidate_full_hash == full_hash:
+                return (os.path.normpath(candidate_filepath), partial_hash, full_hash)
+
+        return (None, partial_hash, full_hash)
+
+
+    def add(self, filepath: str, partial_hash: str = "", full_hash: str = "") -> bool:
+        """
+        adds a file that was just copied into root_folder to the catalog, with the hashes find() returned for its source if there were any,
+        so that files with the same contents are found without listing root_folder again
+
+        returns False if filepath is not in root_folder or couldn't be stat'ed
+        """
+        filepath = os.path.abspath(filepath)
+        if not filepath.startswith(self.__root_folder + os.sep):
+            return False
+        try:
+            file_stat = os.stat(filepath)
+        except OSError:
+            return False
+
+        (folderpath, name) = os.path.split(filepath)
+        relative_folderpath = os.path.relpath(folderpath, self.__root_folder)
+        if file_stat.st_size <= self.__small_file_size:
+            partial_hash = "" # small files only have a full hash
+
+        with self.__lock:
+            row = self.__connection.execute("SELECT folder_id FROM folders WHERE path = ?", (relative_folderpath,)).fetchone()
+            if row is None:
+                # mtime_ns unknown, so that the folder is listed at the next update
+                folder_id = self.__connection.execute("INSERT INTO folders (path, mtime_ns) VALUES (?, ?)", (relative_folderpath, -1)).lastrowid
+            else:
+                folder_id = row[0]
+            self.__connection.execute("REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)", (folder_id, name, file_stat.st_size, file_stat.st_mtime_ns, partial_hash or None, full_hash or None))
+            self.__count_change()
+
+        return True
+
+
+    def get_root_folder(self) -> str:
+        return self.__root_folder
+
+
+    def close(self) -> None:
+        """
+        writes every change to the catalog file, must be called once done with the catalog
+        """
+        if self.__connection is not None:
+            with self.__lock:
+                self.__connection.commit()
+                self.__connection.close()
+                self.__connection = None
+
+        return None
+
+
+    def __count_change(self) -> None:
+        """
+        called with the lock held after each change, commits every CHANGES_PER_COMMIT changes
+        """
+        self.__changes += 1
+        if self.__changes >= self.CHANGES_PER_COMMIT:
+            self.__connection.commit()
+            self.__changes = 0
+
+        return None
+
+
+    def __hash_candidate(self, relative_folderpath: str, name: str, filesize: int, mtime_ns: int, stage: str) -> str:
+        """
+        obtains the partial hash (stage "partial") or full hash (stage "full") of a file of the catalog and keeps it,
+        mtime_ns being its modification time when it was stat'ed, -1 if it changed since then (its partial hash is then forgotten)
+
+        returns the hash, an empty string if the file couldn't be read
+        """
+        candidate_filepath = os.path.join(self.__root_folder, relative_folderpath, name)
+        try:
+            if mtime_ns == -1:
+                mtime_ns = os.stat(candidate_filepath).st_mtime_ns
+            if stage == "partial":
+                (filehash, _) = get_sampled_hash(candidate_filepath, filesize)
+            else:
+                filehash = get_file_hash(candidate_filepath)
+        except OSError:
+            return ""
+        if filehash == "":
+            return ""
+
+        with self.__lock:
+            folder_id = self.__connection.execute("SELECT folder_id FROM folders WHERE path = ?", (relative_folderpath,)).fetchone()[0]
+            if stage == "partial":
+                self.__connection.execute("UPDATE files SET partial_hash = ? WHERE folder_id = ? AND name = ? AND mtime_ns = ?", (filehash, folder_id, name, mtime_ns))
+            else:
+                # the old values are used on the right side, the partial hash is only kept if the file didn't change
+                self.__connection.execute("UPDATE files SET full_hash = ?, mtime_ns = ?, partial_hash = CASE WHEN mtime_ns = ? THEN partial_hash ELSE NULL END WHERE folder_id = ? AND name = ?",
+                                          (filehash, mtime_ns, mtime_ns, folder_id, name))
+            self.__count_change()
+
+        return filehash
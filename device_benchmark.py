@@ -0,0 +1,61 @@
+import os
+from time import perf_counter
+
+
+def measure_read_speed(filepaths: tuple[str, ...], max_files: int = 200, max_bytes: int = 256*1024**2, min_bytes: int = 1024**2, buffer_chunk_size: int = 1024**2) -> tuple[float, float]:
+    """
+    short read-only micro-benchmark of the drive that filepaths are on,
+    stats and opens up to max_files of them and reads up to max_bytes in total
+
+    returns a pair of (seconds per file, bytes per second)
+    seconds per file is the time for stat + open + close of a file (the cost of a file regardless of its size),
+    bytes per second is the read throughput once a file is open,
+    0 if less than min_bytes could be read (small files only measure the per file cost, not throughput)
+
+    files that are in the os cache will make the drive look faster than it is
+    """
+    assert (isinstance(filepaths, tuple)), "filepaths was not a tuple"
+
+    # spread the samples over the whole list, files next to each other are usually next to each other on the drive too
+    step = max(1, len(filepaths) // max_files)
+    sample_filepaths = filepaths[::step][:max_files]
+
+    per_file_time = 0.0
+    per_file_count = 0
+    read_time = 0.0
+    bytes_read = 0
+
+    for filepath in sample_filepaths:
+        try:
+            start_time = perf_counter()
+            os.stat(filepath)
+            with open(filepath, "rb") as file_handle:
+                per_file_time += perf_counter() - start_time
+                per_file_count += 1
+                if bytes_read >= max_bytes:
+                    continue # only measuring per file time from now on
+                start_time = perf_counter()
+                while bytes_read < max_bytes:
+                    chunk = file_handle.read(buffer_chunk_size)
+                    if not chunk: # end of the file
+                        break
+                    bytes_read += len(chunk)
+                read_time += perf_counter() - start_time
+        except OSError:
+            continue # file can't be read, don't count it
+
+    seconds_per_file = (per_file_time / per_file_count) if per_file_count > 0 else 0.0
+    bytes_per_second = (bytes_read / read_time) if (read_time > 0 and bytes_read >= min_bytes) else 0.0
+
+    return (seconds_per_file, bytes_per_second)
+
+
+def get_device(path) -> int:
+    """
+    returns the st_dev of path, or of its closest parent that exists if path doesn't exist yet
+    """
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        path = os.path.dirname(path)
+
+    return os.stat(path).st_dev
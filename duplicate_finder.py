@@ -0,0 +1,638 @@
+import os
+import hashlib
+from array import array
+from concurrent.futures import ThreadPoolExecutor, wait, as_completed, FIRST_COMPLETED
+from time import perf_counter
+from Filelist import get_file_hash
+
+
+class DuplicateFinder():
+    """
+    Finds the files that have identical contents among a list of files.
+
+    Files are compared in stages, each one only looking at the files that still match after the previous one:
+    size, then a hash of a few small samples of the file (partial hash, see get_sampled_hash), then a hash of the whole file (full hash).
+    files of small_file_size or less are hashed entirely at the partial hash stage, that hash is then reused as their full hash.
+    The size stage is done for all files at once by sorting them by size and scanning for runs of the same size,
+    which only needs one list of ints while sorting instead of a dict of lists of every file.
+    The hashing stages don't wait for each other: as soon as a group with the same partial hash has two files, they are sent to full hashing,
+    files that join a group later on are sent right away. So reading the drive and hashing never stop until all the work is done.
+    Groups with the same partial hash that end up with only a few files (compare_group_size or less) are not hashed but compared directly,
+    reading all of their files side by side (see compare_files_in_lockstep), which stops reading a file as soon as it differs from the others.
+    Since a group can only be known to be that small once every file of its size was partial hashed, those groups wait for that,
+    a group that grows past compare_group_size is sent to full hashing right away.
+
+    Files are identified by their index in filepaths (file id) while they are being compared, their sizes and inodes are kept in arrays
+    (about 24 bytes per file), only the files that are still candidates after the size stage get any more memory.
+    Paths that are hardlinks of the same file (same device and inode) are collapsed into the first one of them at the size stage,
+    so each file on the drive is read only once and existing hardlinks are not reported as duplicates, see get_links() and get_hardlink_groups().
+    Empty files are ignored, all of them would match each other.
+    Files that can't be read at some stage are dropped.
+    How many files each stage eliminated is kept, see get_stage_metrics(), to tune the sampling for a set of files.
+    Full hashes that are already known (from a Filelist) can be given, those files are not read again,
+    and every full hash obtained along the way is added to them so that the caller can keep them.
+
+    Once no work is left for the files of some size, their groups are final: find_iter() yields them right away
+    and forgets them, so results are available long before all files are done and don't have to be kept in memory.
+    """
+    MAX_BYTES_PER_TASK = 64*1024*1024 # full hashes of files adding up to this size are done in one task
+    COMPARE_CHUNK_SIZE = 1024*1024 # read from each file at a time when comparing a group directly
+
+    def __init__(self, filepaths: tuple[str, ...], filesizes: tuple[int, ...] | None = None, files_per_group: int = 100, max_workers: int | None = None, sample_size: int = 64*1024, sample_points: tuple[float, ...] = (0.0, 0.25, 0.5, 0.75, 1.0), sample_offsets: tuple[int, ...] = (1024*1024, 16*1024*1024), small_file_size: int = 1024*1024, compare_group_size: int = 3, inodes: tuple[tuple[int, int], ...] | None = None, collapse_hardlinks: bool = True, known_hashes: dict[int, str] | None = None) -> None:
+        """
+        filesizes and inodes (pairs of (st_dev, st_ino)), mapped 1:1 with filepaths, can be given if they are already known (from a Filelist),
+        otherwise every file is stat'ed. inodes are only needed if collapse_hardlinks is True
+
+        known_hashes are the full hashes (sha256, see get_file_hash) already known of some file ids, those files are only read if
+        they have to be partial hashed alongside files of the same size whose hash isn't known, or compared.
+        the dict is updated in place with every full hash obtained by find()
+
+        sample_size, sample_points and sample_offsets are the samples used for the partial hash, see get_sampled_hash,
+        sample_points=(0.0,), sample_offsets=() and sample_size=1024*1024 only hashes the first MiB
+
+        compare_group_size is the most files a group can have to be compared directly instead of hashed, 0 to always hash
+
+        files_per_group is the most files handled by one task,
+        max_workers the number of threads reading files at the same time (None for the ThreadPoolExecutor default)
+        """
+        assert (isinstance(filepaths, tuple)), "filepaths was not a tuple"
+        assert (filesizes is None or len(filesizes) == len(filepaths)), "filesizes was not mapped to filepaths"
+        assert (inodes is None or len(inodes) == len(filepaths)), "inodes was not mapped to filepaths"
+
+        self.__filepaths = filepaths
+        self.__filesizes = array("q", filesizes) if filesizes is not None else array("q", [-1]) * len(filepaths) # -1 until known
+        # st_dev and st_ino of each file, 0 until known (or if the filesystem has no inode numbers)
+        self.__devices = array("Q", (inode[0] for inode in inodes)) if inodes is not None else array("Q", [0]) * len(filepaths)
+        self.__inode_numbers = array("Q", (inode[1] for inode in inodes)) if inodes is not None else array("Q", [0]) * len(filepaths)
+        self.__collapse_hardlinks = collapse_hardlinks
+        self.__sizes_known = filesizes is not None and (inodes is not None or not collapse_hardlinks)
+        self.__files_per_group = files_per_group
+        self.__max_workers = max_workers
+        self.__sample_size = sample_size
+        self.__sample_points = sample_points
+        self.__sample_offsets = sample_offsets
+        self.__small_file_size = small_file_size
+        self.__compare_group_size = compare_group_size
+        self.__known_hashes = known_hashes
+
+        self.__links: dict[int, list[int]] = dict() # keys are the first file id of an inode, values are the other file ids of the same inode
+        self.__groups_by_partial_hash: dict[tuple[int, str], list[int]] = dict() # keys are (filesize, partial hash)
+        self.__groups_by_full_hash: dict[tuple[int, str], list[int]] = dict() # keys are (filesize, full hash)
+        self.__group_keys_by_size: dict[int, tuple[list[tuple[int, str]], list[tuple[int, str]]]] = dict() # values are the keys of the groups by partial hash and by full hash of that size
+        self.__partial_hashes: dict[int, str] = dict() # keys are file ids, only for files of small_file_size or less, their partial hash is their full hash
+
+        self.__partial_hash_queue: list[int] = list() # file ids waiting to be submitted
+        self.__full_hash_queue: list[int] = list()
+        self.__compare_queue: list[tuple[int, ...]] = list() # groups of file ids waiting to be compared
+        self.__counts = {"sized": 0, "empty_or_unreadable": 0, "unique_size": 0, "partial_hashed": 0, "unique_partial_hash": 0, "full_hashed": 0, "unique_full_hash": 0,
+                         "compared": 0, "unique_compare": 0, "duplicates": 0, "known_hash": 0, "partial_bytes_read": 0, "full_bytes_read": 0, "compare_bytes_read": 0}
+
+        # to know when a group with the same partial hash can't grow anymore, and can be compared
+        self.__partial_hashes_left: dict[int, int] = dict() # keys are filesizes, number of files of that size queued for partial hashing and not done yet
+        self.__groups_to_compare: dict[int, list[tuple[int, str]]] = dict() # keys are filesizes, values are keys of groups by partial hash that wait to be compared
+        self.__groups_being_hashed: set[tuple[int, str]] = set() # keys of groups by partial hash that were sent to full hashing
+        # to know when the groups of a size are final
+        self.__work_left: dict[int, int] = dict() # keys are filesizes, number of files of that size waiting to be hashed and of groups waiting to be compared
+        self.__finished_sizes: list[int] = list() # filesizes with no work left, whose groups weren't yielded yet
+
+        return None
+
+
+    def find(self) -> list[tuple[int, tuple[int, ...]]]:
+        """
+        compares all the files, printing the progress as it goes
+
+        returns a list of groups of identical files, each being a pair of (filesize, file ids),
+        with only one file id for each inode (see get_links() for the others)
+        """
+        return list(self.find_iter())
+
+
+    def find_iter(self):
+        """
+        generator version of find(), yields each group of identical files as a pair of (filesize, file ids) as soon as it is final,
+        while the other files are still being compared. can only be gone through once
+        """
+        start_time = perf_counter()
+        last_print_time = 0.0
+
+        with ThreadPoolExecutor(max_workers=self.__max_workers) as executor:
+            if not self.__sizes_known:
+                size_futures = [executor.submit(self.__get_filesizes_unit_processor, range(start_index, min(start_index + self.__files_per_group, len(self.__filepaths))))
+                                for start_index in range(0, len(self.__filepaths), self.__files_per_group)]
+                for future in as_completed(size_futures):
+                    (_, file_ids, values, _) = future.result()
+                    for file_id, (filesize, device, inode_number) in zip(file_ids, values):
+                        self.__filesizes[file_id] = filesize
+                        self.__devices[file_id] = device
+                        self.__inode_numbers[file_id] = inode_number
+                    self.__counts["sized"] += len(file_ids)
+                    if perf_counter() - last_print_time > 0.2:
+                        last_print_time = perf_counter()
+                        self.__print_progress(last_print_time - start_time)
+                size_futures = list()
+            self.__counts["sized"] = len(self.__filepaths)
+            self.__group_by_size()
+            pending = set(self.__submit_queued(executor))
+
+            try:
+                while len(self.__finished_sizes) > 0: # sizes whose files all had a known hash are already final
+                    yield from self.__pop_final_groups(self.__finished_sizes.pop())
+
+                while len(pending) > 0:
+                    (done, pending) = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        (stage, file_ids, values, bytes_read) = future.result()
+                        if stage == "partial":
+                            for file_id, partial_hash in zip(file_ids, values):
+                                self.__add_to_partial_hash_group(file_id, partial_hash)
+                                self.__finish_work(self.__filesizes[file_id])
+                            self.__counts["partial_hashed"] += len(file_ids)
+                            self.__counts["partial_bytes_read"] += bytes_read
+                        elif stage == "compare":
+                            filesize = self.__filesizes[file_ids[0]]
+                            for identical_file_ids in values:
+                                # the groups are final, they get a key of their own among the groups by full hash
+                                key = (filesize, "compared:{}".format(identical_file_ids[0]))
+                                self.__groups_by_full_hash[key] = list(identical_file_ids)
+                                self.__group_keys_by_size[filesize][1].append(key)
+                            self.__finish_work(filesize)
+                            self.__counts["compared"] += len(file_ids)
+                            self.__counts["unique_compare"] += len(file_ids) - sum([len(identical_file_ids) for identical_file_ids in values])
+                            self.__counts["compare_bytes_read"] += bytes_read
+                        else:
+                            for file_id, full_hash in zip(file_ids, values):
+                                self.__add_to_full_hash_group(file_id, full_hash)
+                                self.__keep_hash(file_id, full_hash)
+                                self.__finish_work(self.__filesizes[file_id])
+                            self.__counts["full_hashed"] += len(file_ids)
+                            self.__counts["full_bytes_read"] += bytes_read
+                    pending.update(self.__submit_queued(executor))
+
+                    if perf_counter() - last_print_time > 0.2:
+                        last_print_time = perf_counter()
+                        self.__print_progress(last_print_time - start_time)
+
+                    while len(self.__finished_sizes) > 0:
+                        yield from self.__pop_final_groups(self.__finished_sizes.pop())
+            finally:
+                for future in pending: # in case the generator is closed before the end
+                    future.cancel()
+
+        self.__print_progress(perf_counter() - start_time)
+        print("") # to add a newline after the end of the progress
+        stage_metrics = self.get_stage_metrics()
+        print("skipped {hardlinks} hardlinks, {known_hash} files already hashed, eliminated {unique_size} files by size, {unique_partial_hash} by partial hash ({partial_bytes_read} bytes read), {unique_full_hash} by full hash ({full_bytes_read} bytes read), {unique_compare} by comparing ({compare_bytes_read} bytes read), {duplicates} duplicate files".format(**stage_metrics))
+
+        return None
+
+
+    def get_stage_metrics(self) -> dict[str, int]:
+        """
+        returns how many files went through each stage and how many of them were eliminated there (known to have no duplicate), once find() is done
+        (while find_iter() is being gone through, only for the groups yielded so far):
+        "files": all files,
+        "empty_or_unreadable": files that were ignored because they are empty or their size couldn't be obtained,
+        "hardlinks": files that were not compared because they are a hardlink of another file in the list,
+        "known_hash": files that were not read because their full hash was known, along with every other file of their size,
+        "unique_size": files that no other file has the size of,
+        "partial_hashed", "unique_partial_hash": files that were partial hashed, and the ones that no other file of the same size has the partial hash of,
+        "full_hashed", "unique_full_hash": files that were read entirely at the full hash stage, and the ones that turned out to have no duplicate,
+        "compared", "unique_compare": files that were compared directly instead of full hashed, and the ones that turned out to have no duplicate,
+        "duplicates": files that have at least one duplicate,
+        "partial_bytes_read", "full_bytes_read", "compare_bytes_read": bytes read at each of the stages
+        """
+        number_of_hardlinks = sum([len(linked_file_ids) for linked_file_ids in self.__links.values()])
+
+        return {"files": len(self.__filepaths),
+                "empty_or_unreadable": self.__counts["empty_or_unreadable"],
+                "hardlinks": number_of_hardlinks,
+                "known_hash": self.__counts["known_hash"],
+                "unique_size": self.__counts["unique_size"],
+                "partial_hashed": self.__counts["partial_hashed"],
+                "unique_partial_hash": self.__counts["unique_partial_hash"],
+                "full_hashed": self.__counts["full_hashed"],
+                "unique_full_hash": self.__counts["unique_full_hash"],
+                "compared": self.__counts["compared"],
+                "unique_compare": self.__counts["unique_compare"],
+                "duplicates": self.__counts["duplicates"],
+                "partial_bytes_read": self.__counts["partial_bytes_read"],
+                "full_bytes_read": self.__counts["full_bytes_read"],
+                "compare_bytes_read": self.__counts["compare_bytes_read"]}
+
+
+    def get_links(self, file_id: int) -> tuple[int, ...]:
+        """
+        returns the other file ids that are hardlinks of the same inode as file_id, in the order of filepaths
+        (file_id being the one that was compared, as returned by find())
+        """
+        return tuple(self.__links.get(file_id, list()))
+
+
+    def get_hardlink_groups(self) -> list[tuple[int, tuple[int, ...]]]:
+        """
+        returns the groups of files that already are hardlinks of each other, each being a pair of (filesize, file ids),
+        they take the space of a single file
+        """
+        return [(self.__filesizes[file_id], (file_id,) + tuple(linked_file_ids)) for file_id, linked_file_ids in self.__links.items()]
+
+
+    def get_filepaths(self) -> tuple[str, ...]:
+        return self.__filepaths
+
+
+    def get_filesizes(self) -> tuple[int, ...]:
+        """
+        returns the filesizes mapped 1:1 with filepaths, -1 for files whose size could not be obtained
+        """
+        return tuple(self.__filesizes)
+
+
+    def __group_by_size(self) -> None:
+        """
+        sorts the files by size and queues every run of files of the same size for partial hashing,
+        once their hardlinks are collapsed (see __collapse_links)
+
+        each file is one int while sorting, its size shifted left with its file id in the low bits,
+        which takes much less memory than a tuple or a list per file
+        """
+        id_bits = max(len(self.__filepaths).bit_length(), 1)
+        id_mask = (1 << id_bits) - 1
+        sort_keys = [(filesize << id_bits) | file_id for file_id, filesize in enumerate(self.__filesizes) if filesize > 0] # empty files, or couldn't get their size
+        sort_keys.sort()
+        self.__counts["empty_or_unreadable"] = len(self.__filepaths) - len(sort_keys)
+
+        start_index = 0
+        while start_index < len(sort_keys):
+            filesize = sort_keys[start_index] >> id_bits
+            stop_index = start_index + 1
+            while stop_index < len(sort_keys) and sort_keys[stop_index] >> id_bits == filesize:
+                stop_index += 1
+
+            file_ids = [sort_key & id_mask for sort_key in sort_keys[start_index:stop_index]]
+            if self.__collapse_hardlinks and len(file_ids) > 1:
+                file_ids = self.__collapse_links(file_ids)
+            if len(file_ids) == 1:
+                self.__counts["unique_size"] += 1
+            elif self.__known_hashes is not None and all([file_id in self.__known_hashes for file_id in file_ids]):
+                # nothing to read, their groups are final already
+                self.__group_keys_by_size[filesize] = (list(), list())
+                for file_id in file_ids:
+                    self.__add_to_full_hash_group(file_id, self.__known_hashes[file_id])
+                self.__partial_hashes_left[filesize] = 0
+                self.__work_left[filesize] = 0
+                self.__finished_sizes.append(filesize)
+                self.__counts["known_hash"] += len(file_ids)
+            else:
+                self.__partial_hash_queue.extend(file_ids)
+                self.__partial_hashes_left[filesize] = len(file_ids)
+                self.__work_left[filesize] = len(file_ids)
+                self.__group_keys_by_size[filesize] = (list(), list())
+
+            start_index = stop_index
+
+        return None
+
+
+    def __collapse_links(self, file_ids: list[int]) -> list[int]:
+        """
+        file_ids being files of the same size in the order of filepaths, keeps the other hardlinks of each inode as links of its first file id
+
+        returns the file ids that are left, one per inode
+        """
+        # sorted by inode (stable, so the first file id of each inode stays first), hardlinks are then next to each other
+        file_ids.sort(key=lambda file_id: (self.__devices[file_id], self.__inode_numbers[file_id]))
+
+        remaining_file_ids: list[int] = list()
+        for file_id in file_ids:
+            if self.__inode_numbers[file_id] == 0: # not known, some filesystems on Windows have no inode numbers
+                remaining_file_ids.append(file_id)
+                continue
+            first_file_id = remaining_file_ids[-1] if len(remaining_file_ids) > 0 else -1
+            if first_file_id != -1 and self.__inode_numbers[first_file_id] == self.__inode_numbers[file_id] and self.__devices[first_file_id] == self.__devices[file_id]:
+                self.__links.setdefault(first_file_id, list()).append(file_id)
+            else:
+                remaining_file_ids.append(file_id)
+
+        return remaining_file_ids
+
+
+    def __add_to_partial_hash_group(self, file_id: int, partial_hash: str) -> None:
+        filesize = self.__filesizes[file_id]
+        self.__partial_hashes_left[filesize] -= 1
+        if partial_hash != "": # otherwise couldn't read the file
+            key = (filesize, partial_hash)
+            if key not in self.__groups_by_partial_hash:
+                self.__groups_by_partial_hash[key] = list()
+                self.__group_keys_by_size[filesize][0].append(key)
+            group = self.__groups_by_partial_hash[key]
+            group.append(file_id)
+            if filesize <= self.__small_file_size:
+                # the partial hash already is the hash of the whole file, no need to read it again
+                self.__partial_hashes[file_id] = partial_hash
+                self.__keep_hash(file_id, partial_hash)
+                for escalated_file_id in self.__escalate(group):
+                    self.__add_to_full_hash_group(escalated_file_id, self.__partial_hashes[escalated_file_id])
+            elif key in self.__groups_being_hashed:
+                self.__full_hash_queue.append(file_id)
+                self.__work_left[filesize] += 1
+            elif len(group) > max(self.__compare_group_size, 1):
+                self.__groups_being_hashed.add(key)
+                self.__full_hash_queue.extend(group)
+                self.__work_left[filesize] += len(group)
+            elif len(group) == 2:
+                self.__groups_to_compare.setdefault(filesize, list()).append(key)
+
+        if self.__partial_hashes_left[filesize] == 0:
+            self.__queue_groups_to_compare(filesize)
+
+        return None
+
+
+    def __queue_groups_to_compare(self, filesize: int) -> None:
+        """
+        called once every file of filesize was partial hashed, the groups of that size that are still small enough are queued to be compared
+        """
+        for key in self.__groups_to_compare.pop(filesize, list()):
+            if key not in self.__groups_being_hashed:
+                self.__compare_queue.append(tuple(self.__groups_by_partial_hash[key]))
+                self.__work_left[filesize] += 1
+
+        return None
+
+
+    def __add_to_full_hash_group(self, file_id: int, full_hash: str) -> None:
+        if full_hash == "":
+            return None # couldn't read the file
+
+        key = (self.__filesizes[file_id], full_hash)
+        if key not in self.__groups_by_full_hash:
+            self.__groups_by_full_hash[key] = list()
+            self.__group_keys_by_size[key[0]][1].append(key)
+        self.__groups_by_full_hash[key].append(file_id)
+
+        return None
+
+
+    def __keep_hash(self, file_id: int, full_hash: str) -> None:
+        """
+        adds a full hash that was obtained to known_hashes, if they were given
+        """
+        if self.__known_hashes is not None and full_hash != "":
+            self.__known_hashes[file_id] = full_hash
+
+        return None
+
+
+    def __finish_work(self, filesize: int) -> None:
+        """
+        called once a file of filesize was hashed or a group of that size was compared, after its result was added
+        """
+        self.__work_left[filesize] -= 1
+        if self.__work_left[filesize] == 0: # no file of that size is waiting for anything, its groups are final
+            self.__finished_sizes.append(filesize)
+
+        return None
+
+
+    def __pop_final_groups(self, filesize: int) -> list[tuple[int, tuple[int, ...]]]:
+        """
+        forgets every group of filesize, counting them in the stage metrics
+
+        returns the groups of identical files of filesize, each being a pair of (filesize, file ids)
+        """
+        (partial_hash_keys, full_hash_keys) = self.__group_keys_by_size.pop(filesize)
+        del self.__work_left[filesize]
+        del self.__partial_hashes_left[filesize]
+
+        for key in partial_hash_keys:
+            group = self.__groups_by_partial_hash.pop(key)
+            self.__groups_being_hashed.discard(key)
+            if len(group) == 1:
+                self.__counts["unique_partial_hash"] += 1
+            for file_id in group:
+                self.__partial_hashes.pop(file_id, None)
+
+        duplicate_groups: list[tuple[int, tuple[int, ...]]] = list()
+        for key in full_hash_keys:
+            group = self.__groups_by_full_hash.pop(key)
+            if len(group) == 1:
+                self.__counts["unique_full_hash"] += 1
+            else:
+                self.__counts["duplicates"] += len(group)
+                duplicate_groups.append((filesize, tuple(group)))
+
+        return duplicate_groups
+
+
+    def __escalate(self, group: list[int]) -> list[int]:
+        """
+        called after a file was added to group
+
+        returns the files of the group that go to the next stage now: none while the file is alone,
+        both files once there are two of them, and then only the file that was added (the others were already sent)
+        """
+        if len(group) == 2:
+            return list(group)
+        if len(group) > 2:
+            return [group[-1]]
+
+        return []
+
+
+    def __submit_queued(self, executor: ThreadPoolExecutor) -> list:
+        """
+        submits the files waiting in the queues to the executor, in tasks of up to files_per_group files (and MAX_BYTES_PER_TASK for full hashes)
+
+        returns the futures
+        """
+        futures = list()
+
+        for start_index in range(0, len(self.__partial_hash_queue), self.__files_per_group):
+            futures.append(executor.submit(self.__get_hashes_unit_processor, "partial", tuple(self.__partial_hash_queue[start_index:start_index+self.__files_per_group])))
+        self.__partial_hash_queue = list()
+
+        task_file_ids: list[int] = list()
+        task_bytes = 0
+        for file_id in self.__full_hash_queue:
+            task_file_ids.append(file_id)
+            task_bytes += self.__filesizes[file_id]
+            if len(task_file_ids) >= self.__files_per_group or task_bytes >= self.MAX_BYTES_PER_TASK:
+                futures.append(executor.submit(self.__get_hashes_unit_processor, "full", tuple(task_file_ids)))
+                task_file_ids = list()
+                task_bytes = 0
+        if len(task_file_ids) > 0:
+            futures.append(executor.submit(self.__get_hashes_unit_processor, "full", tuple(task_file_ids)))
+        self.__full_hash_queue = list()
+
+        for file_ids in self.__compare_queue:
+            futures.append(executor.submit(self.__compare_files_unit_processor, file_ids))
+        self.__compare_queue = list()
+
+        return futures
+
+
+    def __get_filesizes_unit_processor(self, file_ids: range) -> tuple[str, range, tuple[tuple[int, int, int], ...], int]:
+        """
+        multithreaded unit processor for find
+        do not use on its own
+
+        returns ("size", file_ids, triples of (filesize, st_dev, st_ino), 0), (-1, 0, 0) for files that couldn't be stat'ed
+        """
+        stats: list[tuple[int, int, int]] = list()
+        for file_id in file_ids:
+            try:
+                file_stat = os.stat(self.__filepaths[file_id])
+                stats.append((file_stat.st_size, file_stat.st_dev, file_stat.st_ino))
+            except OSError:
+                stats.append((-1, 0, 0))
+
+        return ("size", file_ids, tuple(stats), 0)
+
+
+    def __get_hashes_unit_processor(self, stage: str, file_ids: tuple[int, ...]) -> tuple[str, tuple[int, ...], tuple[str, ...]]:
+        """
+        multithreaded unit processor for find
+        do not use on its own
+
+        returns (stage, file_ids, hashes, bytes_read), an empty string for files that couldn't be read
+        """
+        filehashes: list[str] = list()
+        bytes_read = 0
+        for file_id in file_ids:
+            filepath = self.__filepaths[file_id]
+            filesize = self.__filesizes[file_id]
+            if self.__known_hashes is not None and file_id in self.__known_hashes and (stage == "full" or filesize <= self.__small_file_size):
+                filehashes.append(self.__known_hashes[file_id]) # no need to read it
+                continue
+            try:
+                if stage == "partial" and filesize > self.__small_file_size:
+                    (filehash, sample_bytes_read) = get_sampled_hash(filepath, filesize, self.__sample_size, self.__sample_points, self.__sample_offsets)
+                    filehashes.append(filehash)
+                    bytes_read += sample_bytes_read
+                else:
+                    filehashes.append(get_file_hash(filepath))
+                    bytes_read += filesize
+            except FileNotFoundError:
+                filehashes.append("")
+
+        return (stage, file_ids, tuple(filehashes), bytes_read)
+
+
+    def __compare_files_unit_processor(self, file_ids: tuple[int, ...]) -> tuple[str, tuple[int, ...], tuple[tuple[int, ...], ...], int]:
+        """
+        multithreaded unit processor for find
+        do not use on its own
+
+        returns ("compare", file_ids, groups of identical file ids, bytes_read)
+        """
+        (identical_groups, bytes_read) = compare_files_in_lockstep(tuple([self.__filepaths[file_id] for file_id in file_ids]), self.COMPARE_CHUNK_SIZE)
+
+        return ("compare", file_ids, tuple([tuple([file_ids[index] for index in identical_group]) for identical_group in identical_groups]), bytes_read)
+
+
+    def __print_progress(self, seconds: float) -> None:
+        print("\r{} files sized, {} partial hashed, {} full hashed, {} compared in {:.1f} seconds".format(self.__counts["sized"], self.__counts["partial_hashed"], self.__counts["full_hashed"], self.__counts["compared"], seconds), end="")
+
+        return None
+
+
+def get_sample_ranges(filesize: int, sample_size: int = 64*1024, sample_points: tuple[float, ...] = (0.0, 0.25, 0.5, 0.75, 1.0), sample_offsets: tuple[int, ...] = (1024*1024, 16*1024*1024)) -> list[tuple[int, int]]:
+    """
+    returns the sorted (start, stop) byte ranges to sample from a file of filesize bytes,
+    one range of sample_size bytes at each of sample_points (fractions of the file, 0.0 being the head and 1.0 the tail)
+    and at each of sample_offsets (bytes from the start, left out if past the end of the file),
+    ranges that overlap are merged
+    """
+    starts: list[int] = [int((filesize - sample_size) * sample_point) for sample_point in sample_points]
+    starts.extend([sample_offset for sample_offset in sample_offsets if sample_offset + sample_size <= filesize])
+
+    sample_ranges: list[tuple[int, int]] = list()
+    for start in sorted(set([min(max(start, 0), max(filesize - sample_size, 0)) for start in starts])):
+        stop = min(start + sample_size, filesize)
+        if len(sample_ranges) > 0 and start <= sample_ranges[-1][1]:
+            sample_ranges[-1] = (sample_ranges[-1][0], max(stop, sample_ranges[-1][1]))
+        else:
+            sample_ranges.append((start, stop))
+
+    return sample_ranges
+
+
+def get_sampled_hash(filepath: str, filesize: int, sample_size: int = 64*1024, sample_points: tuple[float, ...] = (0.0, 0.25, 0.5, 0.75, 1.0), sample_offsets: tuple[int, ...] = (1024*1024, 16*1024*1024)) -> tuple[str, int]:
+    """
+    gets a hash (blake2b) of a few samples of a file (see get_sample_ranges) instead of all of it.
+    files that only have the same first bytes (same headers, like many media files, disk images and archives) usually get different sampled hashes
+
+    only to be compared with sampled hashes of other files of the same size made with the same samples
+
+    returns a pair of (hash, bytes read), the hash being an empty string if the file could not be read
+
+    may raise FileNotFoundError
+    """
+    if not os.path.exists(filepath):
+        raise FileNotFoundError # to be handled by caller
+
+    blake2b = hashlib.blake2b(digest_size=16)
+    bytes_read = 0
+
+    try:
+        with open(filepath, "rb") as file_handle:
+            for start, stop in get_sample_ranges(filesize, sample_size, sample_points, sample_offsets):
+                file_handle.seek(start)
+                chunk = file_handle.read(stop - start)
+                blake2b.update(chunk)
+                bytes_read += len(chunk)
+    except OSError:
+        return ("", bytes_read)
+
+    return (blake2b.hexdigest(), bytes_read)
+
+
+def compare_files_in_lockstep(filepaths: tuple[str, ...], buffer_chunk_size: int = 1024*1024) -> tuple[list[tuple[int, ...]], int]:
+    """
+    compares files of the same size by reading a chunk of each of them in turn, all the files being open at the same time.
+    whenever the chunks differ the files are split into smaller groups that keep being compared separately,
+    a file that doesn't match any other one isn't read any further, so files that differ early on are barely read at all
+
+    meant for a few files at a time: buffer_chunk_size bytes of each of them are in memory at once
+
+    returns a pair of (groups of identical files, bytes read), each group being the indexes in filepaths of at least two files,
+    files that could not be opened or read are left out
+    """
+    file_handles = dict()
+    for index in range(len(filepaths)):
+        try:
+            file_handles[index] = open(filepaths[index], "rb")
+        except OSError:
+            pass
+
+    identical_groups: list[tuple[int, ...]] = list()
+    groups: list[list[int]] = [list(file_handles)] if len(file_handles) > 1 else list()
+    bytes_read = 0
+
+    try:
+        while len(groups) > 0:
+            next_groups: list[list[int]] = list()
+            for group in groups:
+                groups_by_chunk: dict[bytes, list[int]] = dict()
+                for index in group:
+                    try:
+                        chunk = file_handles[index].read(buffer_chunk_size)
+                    except OSError:
+                        continue # dropped, couldn't read the file
+                    bytes_read += len(chunk)
+                    groups_by_chunk.setdefault(chunk, list()).append(index)
+
+                for chunk, sub_group in groups_by_chunk.items():
+                    if len(sub_group) < 2:
+                        continue # no other file has the same contents
+                    if chunk == b"": # end of the files
+                        identical_groups.append(tuple(sub_group))
+                    else:
+                        next_groups.append(sub_group)
+            groups = next_groups
+    finally:
+        for file_handle in file_handles.values():
+            file_handle.close()
+
+    return (identical_groups, bytes_read)
@@ -0,0 +1,228 @@
+import os
+from shutil import copystat
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from time import perf_counter
+from duplicate_finder import DuplicateFinder
+from fast_trash import FastTrash
+from progress_bar import progress_bar
+
+try:
+    import fcntl
+except ImportError: # not available on Windows, no reflinks there
+    fcntl = None
+
+
+FICLONE = 0x40049409 # linux ioctl that makes a reflink (btrfs, xfs, ...)
+RECLAIM_METHODS = ("hardlink", "reflink", "trash")
+KEEP_RULES = ("in_folder1", "oldest", "shortest_path")
+
+
+def find_duplicate_filepaths(filepaths: tuple[str, ...], files_per_group: int = 100) -> list[tuple[int, tuple[str, ...]]]:
+    """
+    finds the groups of identical files among filepaths (see DuplicateFinder)
+
+    returns a list of pairs of (filesize, filepaths), filepaths including every hardlink of each file,
+    files that are only hardlinks of each other are left out, they already take the space of one file
+    """
+    duplicate_finder = DuplicateFinder(filepaths, files_per_group=files_per_group)
+
+    return [(filesize, tuple([filepaths[linked_file_id] for file_id in file_ids for linked_file_id in (file_id,) + duplicate_finder.get_links(file_id)]))
+            for filesize, file_ids in duplicate_finder.find()]
+
+
+def reclaim_duplicates(duplicate_groups: list[tuple[int, tuple[str, ...]]], method: str = "hardlink", keep_rules: tuple[str, ...] = ("oldest", "shortest_path"), folder1: str | None = None, max_workers: int | None = None, fast_trash: FastTrash | None = None) -> tuple[int, int, int, list[tuple[str, str, int, float, int]]]:
+    """
+    frees the space taken by duplicates: in each group of identical files (pairs of (filesize, filepaths), see find_duplicate_filepaths)
+    one file is kept and every other one is replaced by
+    method "hardlink": a hardlink of the kept file (must be on the same drive),
+    method "reflink": a reflink (copy on write clone) of the kept file, that keeps its own metadata (linux, on btrfs, xfs and such),
+    method "trash": a hardlink of the kept file, the contents of the duplicate being kept in the trash (see FastTrash, fast_trash if given)
+
+    the file to keep is chosen by keep_rules, in order, the next rule only deciding between files that are equal for the previous ones:
+    "in_folder1" for files inside of folder1, "oldest" for the earliest modification time, "shortest_path" for the shortest filepath
+
+    every replacement goes through a temporary file next to the duplicate that is renamed over it, so the duplicate is never missing or partly written,
+    and right before that both files are checked to still have the size they had when they were found to be identical.
+    groups are processed in parallel
+
+    returns (number_of_files_replaced, number_of_failed_files, bytes_reclaimed, results),
+    results being one result per replaced file for RunReport (operation "L"),
+    with the same error numbers as move_files: 0 if it already was the same file as the kept one,
+    5 for files that changed since they were found or couldn't be replaced, 6 for file not found
+    """
+    assert (method in RECLAIM_METHODS), "method was not one of the options"
+    assert (method != "reflink" or fcntl is not None), "reflinks are not supported on this os"
+    assert (len(keep_rules) > 0 and all([keep_rule in KEEP_RULES for keep_rule in keep_rules])), "keep_rules were not among the options"
+    assert ("in_folder1" not in keep_rules or folder1 is not None), "folder1 must be given for keep rule in_folder1"
+
+    if folder1 is not None:
+        folder1 = os.path.abspath(folder1)
+    own_fast_trash = method == "trash" and fast_trash is None
+    if own_fast_trash:
+        fast_trash = FastTrash()
+
+    number_of_files_replaced = 0
+    number_of_failed_files = 0
+    bytes_reclaimed = 0
+    results: list[tuple[str, str, int, float, int]] = list()
+
+    progress = progress_bar(100, rate_units="groups")
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            threads = [executor.submit(__reclaim_group_unit_processor, filesize, filepaths, method, keep_rules, folder1, fast_trash) for filesize, filepaths in duplicate_groups]
+            for index, thread in enumerate(as_completed(threads)):
+                (replaced_count, failed_count, group_bytes_reclaimed, group_results) = thread.result()
+                number_of_files_replaced += replaced_count
+                number_of_failed_files += failed_count
+                bytes_reclaimed += group_bytes_reclaimed
+                results.extend(group_results)
+                progress.print_progress_bar((index + 1) / len(threads), index + 1)
+    finally:
+        if own_fast_trash:
+            fast_trash.close()
+
+    print("") # to add a newline after the end of the progress bar
+
+    return (number_of_files_replaced, number_of_failed_files, bytes_reclaimed, results)
+
+
+def __reclaim_group_unit_processor(filesize: int, filepaths: tuple[str, ...], method: str, keep_rules: tuple[str, ...], folder1: str | None, fast_trash: FastTrash | None) -> tuple[int, int, int, list[tuple[str, str, int, float, int]]]:
+    """
+    multithreaded unit processor for reclaim_duplicates, handles one group of identical files
+    do not use on its own
+
+    returns (number_of_files_replaced, number_of_failed_files, bytes_reclaimed, results)
+    """
+    number_of_files_replaced = 0
+    number_of_failed_files = 0
+    results: list[tuple[str, str, int, float, int]] = list()
+
+    file_stats: list[tuple[str, os.stat_result]] = list()
+    for filepath in filepaths:
+        start_time = perf_counter()
+        try:
+            file_stat = os.stat(filepath)
+            if file_stat.st_size == filesize:
+                file_stats.append((filepath, file_stat))
+                continue
+            error_number = 5 # changed since it was found to be a duplicate
+        except FileNotFoundError:
+            error_number = 6
+        except OSError:
+            error_number = 5
+        number_of_failed_files += 1
+        results.append((filepath, "L", filesize, perf_counter() - start_time, error_number))
+    if len(file_stats) < 2:
+        return (number_of_files_replaced, number_of_failed_files, 0, results)
+
+    (keep_filepath, keep_stat) = min(file_stats, key=lambda file_stat: __get_keep_key(file_stat[0], file_stat[1], keep_rules, folder1))
+
+    replaced_links_by_inode: dict[tuple[int, int], int] = dict() # how many paths of each inode were replaced
+    for filepath, file_stat in file_stats:
+        if filepath == keep_filepath:
+            continue
+        start_time = perf_counter()
+        inode = (file_stat.st_dev, file_stat.st_ino)
+        if inode == (keep_stat.st_dev, keep_stat.st_ino):
+            error_number = 0 # already a hardlink of the kept file
+        else:
+            error_number = __replace_file(keep_filepath, filepath, filesize, method, fast_trash)
+        if error_number == -1:
+            number_of_files_replaced += 1
+            replaced_links_by_inode[inode] = replaced_links_by_inode.get(inode, 0) + 1
+        elif error_number != 0:
+            number_of_failed_files += 1
+        results.append((filepath, "L", filesize, perf_counter() - start_time, error_number))
+
+    # the data of a file is only freed once none of its hardlinks is left
+    link_counts = {(file_stat.st_dev, file_stat.st_ino): file_stat.st_nlink for _, file_stat in file_stats}
+    bytes_reclaimed = filesize * len([inode for inode, replaced_count in replaced_links_by_inode.items() if replaced_count >= link_counts[inode]])
+
+    return (number_of_files_replaced, number_of_failed_files, bytes_reclaimed, results)
+
+
+def __get_keep_key(filepath: str, file_stat: os.stat_result, keep_rules: tuple[str, ...], folder1: str | None) -> tuple:
+    """
+    returns the sort key of a file for keep_rules, the lowest one is kept
+    """
+    key: list = list()
+    for keep_rule in keep_rules:
+        if keep_rule == "in_folder1":
+            key.append(0 if filepath.startswith(folder1 + os.sep) else 1)
+        elif keep_rule == "oldest":
+            key.append(file_stat.st_mtime)
+        else:
+            key.append(len(filepath))
+    key.append(filepath) # so that the same file is always kept
+
+    return tuple(key)
+
+
+def __replace_file(keep_filepath: str, filepath: str, filesize: int, method: str, fast_trash: FastTrash | None) -> int:
+    """
+    replaces filepath by a link (see reclaim_duplicates) of keep_filepath, through a temporary file next to filepath.
+    for method "trash", a second link of filepath is put into the trash before the replacement (restoring it to filepath),
+    so filepath is never missing and its old contents are in the trash once it has been replaced
+
+    the temporary files get names that no other file has (see __create_temporary_file), only the ones this call created are removed on failure
+
+    returns -1 if replaced, 5 if either file changed size or it couldn't be replaced, 6 if either file couldn't be found
+    """
+    created_filepaths: list[str] = list()
+
+    try:
+        if method == "reflink":
+            temporary_filepath = __create_temporary_file(filepath, "reclaim", lambda temporary_filepath: os.close(os.open(temporary_filepath, os.O_WRONLY | os.O_CREAT | os.O_EXCL)))
+            created_filepaths.append(temporary_filepath)
+            with open(keep_filepath, "rb") as keep_handle, open(temporary_filepath, "r+b") as temporary_handle:
+                fcntl.ioctl(temporary_handle.fileno(), FICLONE, keep_handle.fileno())
+            copystat(filepath, temporary_filepath) # a reflink is a file of its own, it keeps the times and permissions of the duplicate
+        else:
+            temporary_filepath = __create_temporary_file(filepath, "reclaim", lambda temporary_filepath: os.link(keep_filepath, temporary_filepath))
+            created_filepaths.append(temporary_filepath)
+
+        # last check, a file that was written to since it was found to be a duplicate must not be replaced
+        if os.stat(filepath).st_size != filesize or os.stat(keep_filepath).st_size != filesize:
+            os.remove(temporary_filepath)
+            return 5
+
+        if method == "trash":
+            trash_filepath = __create_temporary_file(filepath, "trash", lambda trash_filepath: os.link(filepath, trash_filepath))
+            created_filepaths.append(trash_filepath)
+            if not fast_trash.trash(trash_filepath, original_filepath=filepath):
+                os.remove(trash_filepath) # no trash folder on that drive
+                os.remove(temporary_filepath)
+                return 5
+            created_filepaths.remove(trash_filepath) # moved into the trash
+        os.replace(temporary_filepath, filepath)
+    except OSError as error:
+        for created_filepath in created_filepaths:
+            try:
+                os.remove(created_filepath)
+            except OSError:
+                pass
+        if isinstance(error, FileNotFoundError):
+            return 6
+        return 5
+
+    return -1
+
+
+def __create_temporary_file(filepath: str, suffix: str, create_function) -> str:
+    """
+    creates a temporary file next to filepath with create_function(temporary_filepath), which must raise FileExistsError if that path already exists,
+    trying ".<filename>.<pid>.<n>.<suffix>" with n counting up until a name that no file has is found, so no existing file is ever overwritten
+
+    returns the temporary filepath that was created
+
+    may raise OSError from create_function
+    """
+    (folderpath, filename) = os.path.split(filepath)
+    attempt = 0
+    while True:
+        temporary_filepath = os.path.join(folderpath, ".{}.{}.{}.{}".format(filename, os.getpid(), attempt, suffix))
+        try:
+            create_function(temporary_filepath)
+            return temporary_filepath
+        except FileExistsError:
+            attempt += 1
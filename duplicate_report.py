@@ -0,0 +1,67 @@
+import csv
+import json
+
+
+class DuplicateReport():
+    """
+    Writes groups of duplicate files to a file as they are found (see iterate_duplicate_files_in_roots),
+    so that other tools can start acting on them before the search is over.
+
+    The format depends on the extension of the report filepath:
+    ".csv" writes one row per file (group, filesize, root, filepath), anything else writes JSON lines, one group per line:
+    {"group": 0, "size": 1234, "roots": {"root name": ["filepath", ...], ...}}, roots without a copy of the file being left out.
+    Every group is flushed to the file as soon as it is added.
+    Not meant to be shared between threads.
+    """
+    def __init__(self, report_filepath: str, root_names: tuple[str, ...]) -> None:
+        """
+        report_filepath is overwritten, root_names are the names of the roots in the order of the filepaths of each group
+        """
+        self.__root_names = root_names
+        self.__is_csv = report_filepath.lower().endswith(".csv")
+        self.__report_file = open(report_filepath, "w", encoding="utf-8", newline="")
+        self.__csv_writer = None
+        if self.__is_csv:
+            self.__csv_writer = csv.writer(self.__report_file)
+            self.__csv_writer.writerow(("group", "size", "root", "path"))
+
+        self.__number_of_groups = 0
+        self.__number_of_files = 0
+
+        return None
+
+
+    def add_group(self, filesize: int, filepaths_by_root: tuple[tuple[str, ...], ...]) -> None:
+        """
+        writes one group of identical files, filepaths_by_root being the filepaths of each root
+        """
+        if self.__is_csv:
+            self.__csv_writer.writerows([(self.__number_of_groups, filesize, root_name, filepath)
+                                         for root_name, filepaths in zip(self.__root_names, filepaths_by_root) for filepath in filepaths])
+        else:
+            self.__report_file.write('{{"group": {}, "size": {}, "roots": {{{}}}}}\n'.format(self.__number_of_groups, filesize,
+                                     ", ".join(["{}: {}".format(json.dumps(root_name), json.dumps(filepaths)) for root_name, filepaths in zip(self.__root_names, filepaths_by_root) if len(filepaths) > 0])))
+        self.__report_file.flush()
+
+        self.__number_of_groups += 1
+        self.__number_of_files += sum([len(filepaths) for filepaths in filepaths_by_root])
+
+        return None
+
+
+    def get_counts(self) -> tuple[int, int]:
+        """
+        returns (number_of_groups, number_of_files) written so far
+        """
+        return (self.__number_of_groups, self.__number_of_files)
+
+
+    def close(self) -> None:
+        """
+        closes the report file, must be called once all groups are added
+        """
+        if self.__report_file is not None:
+            self.__report_file.close()
+            self.__report_file = None
+
+        return None
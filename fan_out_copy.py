@@ -0,0 +1,255 @@
+import os
+from queue import Queue
+from threading import Thread
+from shutil import copystat
+from filecmp import cmp as compare_files
+from time import perf_counter
+
+
+class FanOutCopier():
+    """
+    Copies files to several output folders at the same time while reading each source file only once.
+
+    Every chunk that is read is handed to one writer thread per output folder through a queue holding at most
+    max_buffered_bytes, so a slow output folder only holds the others back once its queue is full.
+    Files are written to a temporary file next to their destination and only renamed into place once complete,
+    a destination that already exists is handled like move_file_error does in copy mode
+    (error 0 if identical, otherwise renamed to "name (n).ext" with error 4).
+
+    copy() must always be called from the same thread.
+    """
+    def __init__(self, output_folders: tuple[str, ...], buffer_chunk_size: int = 4*1024*1024, max_buffered_bytes: int = 256*1024*1024) -> None:
+        """
+        max_buffered_bytes is the most data that can be waiting to be written to each output folder
+        """
+        assert (isinstance(output_folders, tuple) and len(output_folders) > 0), "output_folders was not a tuple of folders"
+
+        self.__output_folders = tuple([os.path.abspath(output_folder) for output_folder in output_folders])
+        self.__buffer_chunk_size = buffer_chunk_size
+        self.__queues: list[Queue] = [Queue(maxsize=max(1, max_buffered_bytes // buffer_chunk_size)) for _ in self.__output_folders]
+        self.__bytes_written: list[int] = [0 for _ in self.__output_folders] # each one only changed by its own writer thread
+        self.__results: list[list[tuple[str, str, int, float, int]]] = [list() for _ in self.__output_folders]
+        self.__threads = [Thread(target=self.__writer, args=(index,), daemon=True) for index in range(len(self.__output_folders))]
+        for thread in self.__threads:
+            thread.start()
+
+        return None
+
+
+    def copy(self, source_filepath: str, relative_destination: str) -> int:
+        """
+        reads source_filepath once and queues it to be written to relative_destination (a filepath relative to each output folder)
+
+        returns -1 if the file was read (writing can still fail, see close()), 6 if it couldn't be found, 5 if it couldn't be read,
+        files that couldn't be read get no result from close()
+        """
+        start_time = perf_counter()
+        try:
+            source_handle = open(source_filepath, "rb")
+        except FileNotFoundError: # file was deleted, renamed or moved before it could be processed
+            return 6
+        except OSError:
+            return 5
+
+        with source_handle:
+            filesize = os.fstat(source_handle.fileno()).st_size
+            for queue in self.__queues:
+                queue.put(("start", source_filepath, relative_destination, filesize, start_time))
+            try:
+                while True:
+                    chunk = source_handle.read(self.__buffer_chunk_size)
+                    if not chunk: # end of the file
+                        break
+                    for queue in self.__queues:
+                        queue.put(chunk) # the same bytes object for every output folder, nothing is duplicated
+            except OSError: # source couldn't be read, no output folder gets a partial file
+                for queue in self.__queues:
+                    queue.put(("abort",))
+                return 5
+
+        for queue in self.__queues:
+            queue.put(("end",))
+
+        return -1
+
+
+    def __writer(self, index: int) -> None:
+        """
+        writes everything that comes through queue index into output folder index, runs in its own thread
+        """
+        output_folder = self.__output_folders[index]
+        queue = self.__queues[index]
+        results = self.__results[index]
+
+        destination_handle = None
+        (source_filepath, destination_filepath, temporary_filepath, filesize, start_time) = ("", "", "", 0, 0.0)
+        write_failed = False
+
+        while True:
+            item = queue.get()
+            if item is None: # close() was called
+                break
+
+            if isinstance(item, bytes):
+                if destination_handle is None:
+                    continue # this file already failed, skip the rest of it
+                try:
+                    destination_handle.write(item)
+                    self.__bytes_written[index] += len(item)
+                except OSError:
+                    write_failed = True
+                    destination_handle = self.__discard(destination_handle, temporary_filepath)
+                continue
+
+            if item[0] == "start":
+                (_, source_filepath, relative_destination, filesize, start_time) = item
+                destination_filepath = os.path.join(output_folder, relative_destination)
+                temporary_filepath = os.path.join(os.path.dirname(destination_filepath), ".{}.partial".format(os.path.basename(destination_filepath)))
+                write_failed = False
+                try:
+                    os.makedirs(os.path.dirname(destination_filepath), exist_ok=True)
+                    destination_handle = open(temporary_filepath, "wb")
+                except OSError:
+                    write_failed = True
+                    destination_handle = None
+
+            elif item[0] == "abort": # the source couldn't be read, its failure is counted by the caller of copy()
+                destination_handle = self.__discard(destination_handle, temporary_filepath)
+
+            elif item[0] == "end":
+                error_number = 5
+                if not write_failed:
+                    try:
+                        destination_handle.close()
+                        destination_handle = None
+                        error_number = self.__finish_file(source_filepath, temporary_filepath, destination_filepath)
+                    except OSError:
+                        destination_handle = self.__discard(destination_handle, temporary_filepath)
+                results.append((source_filepath, "C", filesize, perf_counter() - start_time, error_number))
+
+        return None
+
+
+    def __discard(self, destination_handle, temporary_filepath: str) -> None:
+        """
+        closes and removes a temporary file that won't be finished
+
+        returns None to replace the closed handle
+        """
+        try:
+            if destination_handle is not None:
+                destination_handle.close()
+            os.remove(temporary_filepath)
+        except OSError:
+            pass
+
+        return None
+
+
+    def __finish_file(self, source_filepath: str, temporary_filepath: str, destination_filepath: str) -> int:
+        """
+        copies the metadata of source_filepath to the finished temporary file and puts it at destination_filepath
+
+        returns the error number of move_file_error: -1 if copied, 0 if an identical file was already there, 4 if renamed
+        """
+        copystat(source_filepath, temporary_filepath)
+
+        if not os.path.exists(destination_filepath):
+            os.replace(temporary_filepath, destination_filepath)
+            return -1
+
+        if compare_files(temporary_filepath, destination_filepath, shallow=False):
+            os.remove(temporary_filepath)
+            return 0
+
+        (name, extension) = os.path.splitext(destination_filepath)
+        retry_count = 0
+        while os.path.exists("{} ({}){}".format(name, retry_count, extension)):
+            retry_count += 1
+        os.replace(temporary_filepath, "{} ({}){}".format(name, retry_count, extension))
+
+        return 4
+
+
+    def get_output_folders(self) -> tuple[str, ...]:
+        return self.__output_folders
+
+
+    def get_bytes_written(self) -> tuple[int, ...]:
+        """
+        returns the number of bytes written so far to each output folder, in the order of get_output_folders()
+        """
+        return tuple(self.__bytes_written)
+
+
+    def close(self) -> list[list[tuple[str, str, int, float, int]]]:
+        """
+        waits for every output folder to finish writing
+
+        returns one list of results (for RunReport) per output folder, in the order of get_output_folders()
+        """
+        for queue in self.__queues:
+            queue.put(None)
+        for thread in self.__threads:
+            thread.join()
+
+        return self.__results
+
+
+def fan_out_copy_files(filepaths: tuple[str, ...], input_folder: str, output_folders: tuple[str, ...], keep_folder_structure: bool = True, filesizes: tuple[int, ...] | None = None, buffer_chunk_size: int = 4*1024*1024, max_buffered_bytes: int = 256*1024*1024) -> tuple[int, int, list[list[tuple[str, str, int, float, int]]]]:
+    """
+    copies filepaths into every one of output_folders, reading each file only once (see FanOutCopier),
+    keeping their path relative to input_folder if keep_folder_structure is True, otherwise putting them all directly in each output folder
+
+    filesizes (same order as filepaths) is only used to show the progress of each output folder
+
+    returns (number_of_files_read, number_of_failed_files, results), results being one list of results per output folder
+    """
+    assert (isinstance(filepaths, tuple)), "filepaths was not a tuple"
+
+    input_folder = os.path.abspath(input_folder)
+    fan_out_copier = FanOutCopier(output_folders, buffer_chunk_size, max_buffered_bytes)
+
+    number_of_files_read = 0
+    number_of_failed_files = 0
+    failed_results: list[tuple[str, str, int, float, int]] = list()
+    total_size = sum(filesizes) if filesizes is not None else 0
+    start_time = perf_counter()
+    last_print_time = 0.0
+
+    for index in range(len(filepaths)):
+        filepath = filepaths[index]
+        if keep_folder_structure:
+            relative_destination = os.path.relpath(filepath, input_folder)
+        else:
+            relative_destination = os.path.basename(filepath)
+
+        read_start_time = perf_counter()
+        error_number = fan_out_copier.copy(filepath, relative_destination)
+        if error_number == -1:
+            number_of_files_read += 1
+        else:
+            number_of_failed_files += 1
+            failed_results.append((filepath, "C", filesizes[index] if filesizes is not None else 0, perf_counter() - read_start_time, error_number))
+
+        if total_size > 0 and perf_counter() - last_print_time > 0.2:
+            last_print_time = perf_counter()
+            __print_progress(fan_out_copier, total_size, last_print_time - start_time)
+
+    results = fan_out_copier.close()
+    if total_size > 0:
+        __print_progress(fan_out_copier, total_size, perf_counter() - start_time)
+    print("") # to add a newline after the end of the progress
+
+    return (number_of_files_read, number_of_failed_files, [failed_results + destination_results for destination_results in results])
+
+
+def __print_progress(fan_out_copier: FanOutCopier, total_size: int, seconds: float) -> None:
+    """
+    prints the progress of every output folder on one line
+    """
+    progress_strings = ["{}: {:6.2f}% {:8.2f} MB/s".format(os.path.basename(output_folder) or output_folder, 100 * bytes_written / total_size, bytes_written / 10**6 / max(seconds, 1e-9))
+                        for output_folder, bytes_written in zip(fan_out_copier.get_output_folders(), fan_out_copier.get_bytes_written())]
+    print("\r" + " | ".join(progress_strings), end="")
+
+    return None
@@ -0,0 +1,235 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from time import time, perf_counter
+from progress_bar import progress_bar
+from run_report import RunReport
+
+
+def get_fully_matched_folders(filenames_by_folder: dict[str, dict[str, int]], folder_entry_counts: dict[str, int]) -> tuple[str, ...]:
+    """
+    returns the top-most folders whose entire subtree (every file in it and in all of its subfolders) is in filenames_by_folder,
+    these can be removed as a whole instead of one file at a time
+
+    folder_entry_counts is the number of entries in each folder before anything was deleted (see count_folder_entries),
+    folders that aren't in it are never considered fully matched
+    """
+    matched_entry_counts: dict[str, int] = {folderpath: len(filenames_by_folder.get(folderpath, ())) for folderpath in folder_entry_counts.keys()}
+    fully_matched_folders: set[str] = set()
+
+    # deepest first, so that we know if all subfolders are fully matched before checking their parent
+    for folderpath in sorted(folder_entry_counts.keys(), key=lambda folderpath: folderpath.count(os.sep), reverse=True):
+        if matched_entry_counts[folderpath] != folder_entry_counts[folderpath]:
+            continue # something in this folder isn't getting deleted
+        fully_matched_folders.add(folderpath)
+        parent_folderpath = os.path.dirname(folderpath)
+        if parent_folderpath in matched_entry_counts:
+            matched_entry_counts[parent_folderpath] += 1 # the whole subfolder counts as one matched entry of its parent
+
+    return tuple([folderpath for folderpath in fully_matched_folders if os.path.dirname(folderpath) not in fully_matched_folders])
+
+
+def delete_files(filepaths: tuple[str, ...], folder_entry_counts: dict[str, int] | None = None, files_per_group: int = 1000, filesizes: tuple[int, ...] | None = None, run_report: RunReport | None = None) -> tuple[int, int, list[tuple[str, str, int, float, int]], dict[str, int]]:
+    """
+    permanently deletes all of the filepaths
+
+    each folder is opened once and its files are removed relative to it (dir_fd) so the os doesn't have to resolve
+    the full path of every file, folders are processed in parallel.
+    folders where every file and subfolder is getting deleted (according to folder_entry_counts, see count_folder_entries)
+    are processed as a whole and removed too, only the planned files are ever deleted so a folder that gained a file since it was counted is kept
+
+    filesizes (mapped 1:1 with filepaths) are only used for the results, 0 is used if not given.
+    if run_report is given, the results of each thread are added to it as soon as that thread is done instead of being returned,
+    so the results of every file are never all in memory at once
+
+    returns (number_of_files_deleted, number_of_failed_files, results, removed_entry_counts)
+    results has one result per file for RunReport (empty if run_report is given), with the same error numbers as move_files (5 for unknown error, 6 for file not found),
+    removed_entry_counts is the number of entries that are no longer in each folder, for remove_emptied_folders
+    """
+    assert (isinstance(filepaths, tuple)), "filepaths was not a tuple"
+
+    if folder_entry_counts is None:
+        folder_entry_counts = dict() # no folder will be removed as a whole
+    if filesizes is None:
+        filesizes = (0,) * len(filepaths)
+
+    filenames_by_folder: dict[str, dict[str, int]] = dict() # values are filenames with their size
+    for filepath, filesize in zip(filepaths, filesizes):
+        (folderpath, _, filename) = filepath.rpartition(os.sep) # filepaths are absolute (from Filelist), faster than os.path.split
+        if folderpath not in filenames_by_folder:
+            filenames_by_folder[folderpath] = dict()
+        filenames_by_folder[folderpath][filename] = filesize
+
+    fully_matched_folders = get_fully_matched_folders(filenames_by_folder, folder_entry_counts)
+
+    # files in fully matched folders are deleted along with the folder, not one at a time
+    subtree_filenames_by_folder: dict[str, dict[str, dict[str, int]]] = {folderpath: dict() for folderpath in fully_matched_folders}
+    folders_to_process: list[str] = list()
+    for folderpath in filenames_by_folder.keys():
+        top_folderpath = __get_fully_matched_parent(folderpath, subtree_filenames_by_folder)
+        if top_folderpath is None:
+            folders_to_process.append(folderpath)
+        else:
+            subtree_filenames_by_folder[top_folderpath][folderpath] = filenames_by_folder[folderpath]
+
+    # group folders so that each thread gets around files_per_group files
+    grouped_folders: list[list[str]] = list()
+    file_counter = files_per_group
+    for folderpath in folders_to_process:
+        if file_counter >= files_per_group:
+            grouped_folders.append(list())
+            file_counter = 0
+        grouped_folders[-1].append(folderpath)
+        file_counter += len(filenames_by_folder[folderpath])
+
+    number_of_files_total = len(filepaths)
+    number_of_files_deleted = 0
+    number_of_failed_files = 0
+    results: list[tuple[str, str, int, float, int]] = list()
+    removed_entry_counts: dict[str, int] = dict()
+
+    progress = progress_bar(100, rate_units="files")
+    start_time = time()
+
+    with ThreadPoolExecutor() as executor:
+        threads = list()
+        for folderpath in fully_matched_folders:
+            threads.append(executor.submit(__delete_subtree, folderpath, subtree_filenames_by_folder[folderpath]))
+        for folderpaths in grouped_folders:
+            threads.append(executor.submit(__delete_files_unit_processor, {folderpath: filenames_by_folder[folderpath] for folderpath in folderpaths}))
+
+        for thread in as_completed(threads):
+            (new_number_of_files_deleted, new_number_of_failed_files, new_results, new_removed_entry_counts) = thread.result()
+            number_of_files_deleted += new_number_of_files_deleted
+            number_of_failed_files += new_number_of_failed_files
+            if run_report is not None:
+                run_report.add_results(new_results)
+            else:
+                results.extend(new_results)
+            for folderpath, removed_entry_count in new_removed_entry_counts.items():
+                removed_entry_counts[folderpath] = removed_entry_counts.get(folderpath, 0) + removed_entry_count
+            try:
+                progress.print_progress_bar((number_of_files_deleted + number_of_failed_files) / number_of_files_total, number_of_files_deleted)
+            except ZeroDivisionError:
+                pass
+
+    print("") # to add a newline after the end of the progress bar
+
+    time_taken = time() - start_time
+    try:
+        print("{} files deleted in {:.2f} seconds ({:.0f} files/s)".format(number_of_files_deleted, time_taken, number_of_files_deleted / time_taken))
+    except ZeroDivisionError:
+        print("{} files deleted".format(number_of_files_deleted))
+
+    return (number_of_files_deleted, number_of_failed_files, results, removed_entry_counts)
+
+
+def __get_fully_matched_parent(folderpath: str, fully_matched_folders: dict[str, dict[str, dict[str, int]]]) -> str | None:
+    """
+    returns the folder in fully_matched_folders that folderpath is in (or is), None if there isn't one
+    """
+    while True:
+        if folderpath in fully_matched_folders:
+            return folderpath
+        parent_folderpath = os.path.dirname(folderpath)
+        if parent_folderpath == folderpath: # reached the root
+            return None
+        folderpath = parent_folderpath
+
+
+def __delete_subtree(folderpath: str, filenames_by_folder: dict[str, dict[str, int]]) -> tuple[int, int, list[tuple[str, str, int, float, int]], dict[str, int]]:
+    """
+    multithreaded unit processor for delete_files, removes folderpath and everything in it that was planned to be deleted
+    do not use on its own
+
+    every folder of the subtree is listed once to find its subfolders, only the files of filenames_by_folder are removed
+    (relative to their folder), then the folders are removed deepest first.
+    files that appeared after the folder entries were counted, or that were never matched, are left alone:
+    the os refuses to remove the folders they are in, so those folders are kept
+
+    returns the same as delete_files
+    """
+    number_of_files_deleted = 0
+    number_of_failed_files = 0
+    results: list[tuple[str, str, int, float, int]] = list()
+    removed_entry_counts: dict[str, int] = dict()
+
+    folders_to_remove: list[str] = [folderpath] # parents are always before their subfolders
+    folder_index = 0
+    while folder_index < len(folders_to_remove):
+        current_folderpath = folders_to_remove[folder_index]
+        folder_index += 1
+
+        try:
+            with os.scandir(current_folderpath) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        folders_to_remove.append(entry.path)
+        except OSError: # folder can't be listed, its subfolders won't be removed but its files may still be deletable
+            pass
+
+        if current_folderpath not in filenames_by_folder:
+            continue
+        (new_number_of_files_deleted, new_number_of_failed_files, new_results, new_removed_entry_counts) = __delete_files_unit_processor({current_folderpath: filenames_by_folder[current_folderpath]})
+        number_of_files_deleted += new_number_of_files_deleted
+        number_of_failed_files += new_number_of_failed_files
+        results.extend(new_results)
+        removed_entry_counts.update(new_removed_entry_counts)
+
+    for current_folderpath in reversed(folders_to_remove):
+        try:
+            os.rmdir(current_folderpath)
+        except OSError:
+            continue # something that wasn't planned to be deleted (or couldn't be) is still in it
+        parent_folderpath = os.path.dirname(current_folderpath)
+        removed_entry_counts[parent_folderpath] = removed_entry_counts.get(parent_folderpath, 0) + 1
+
+    return (number_of_files_deleted, number_of_failed_files, results, removed_entry_counts)
+
+
+def __delete_files_unit_processor(filenames_by_folder: dict[str, dict[str, int]]) -> tuple[int, int, list[tuple[str, str, int, float, int]], dict[str, int]]:
+    """
+    multithreaded unit processor for delete_files, removes the files of each folder relative to that folder
+    do not use on its own
+
+    filenames_by_folder values are the filenames in that folder with their size
+
+    returns the same as delete_files
+    """
+    number_of_files_deleted = 0
+    number_of_failed_files = 0
+    results: list[tuple[str, str, int, float, int]] = list()
+    removed_entry_counts: dict[str, int] = dict()
+
+    for folderpath, filenames in filenames_by_folder.items():
+        folder_fd = None
+        if os.unlink in os.supports_dir_fd:
+            try:
+                folder_fd = os.open(folderpath, os.O_RDONLY | getattr(os, "O_DIRECTORY", 0))
+            except OSError:
+                folder_fd = None # try with full paths below, errors will be counted per file
+
+        number_of_files_deleted_before_folder = number_of_files_deleted
+        try:
+            for filename, filesize in filenames.items():
+                start_time = perf_counter()
+                error_number = -1
+                try:
+                    if folder_fd is not None:
+                        os.unlink(filename, dir_fd=folder_fd)
+                    else:
+                        os.remove(os.path.join(folderpath, filename))
+                    number_of_files_deleted += 1
+                except FileNotFoundError: # file was deleted, renamed or moved before it could be processed
+                    error_number = 6
+                    number_of_files_deleted += 1 # it's gone, so it's counted like move_files does
+                except OSError: # unknown error
+                    error_number = 5
+                    number_of_failed_files += 1
+                results.append((folderpath + os.sep + filename, "D", filesize, perf_counter() - start_time, error_number))
+        finally:
+            if folder_fd is not None:
+                os.close(folder_fd)
+
+        removed_entry_counts[folderpath] = number_of_files_deleted - number_of_files_deleted_before_folder
+
+    return (number_of_files_deleted, number_of_failed_files, results, removed_entry_counts)
@@ -0,0 +1,213 @@
+import os
+import json
+from threading import Lock
+from time import strftime
+
+
+class FastTrash():
+    """
+    Trashes files by renaming them into a trash folder at the root of the filesystem they are on,
+    so each file only costs one rename (no copying, never crosses drives).
+
+    Every trashed file is written to a manifest (one per trash folder) so that it can be restored with restore_trashed_files().
+    Can be shared between threads.
+    """
+    TRASH_FOLDER_NAME = ".Trash-CopyAllFiles"
+    MANIFEST_FILENAME = "manifest.jsonl"
+
+    def __init__(self, run_name: str | None = None) -> None:
+        """
+        run_name is the name of the subfolder of each trash folder that files are put into for this run,
+        defaults to the current date and time
+        """
+        if run_name is None:
+            run_name = strftime("%Y-%m-%d_%H-%M-%S")
+        assert (isinstance(run_name, str)), "run_name was not a string"
+
+        self.__run_name = run_name
+        self.__lock = Lock()
+        self.__file_counter = 0
+        self.__run_folders: dict[int, str | None] = dict() # keys are st_dev of the filesystem, None if no trash folder could be made there
+        self.__manifests: dict[int, object] = dict() # open manifest file handles, same keys as run_folders
+        self.__unsynced_devices: set[int] = set() # keys of the manifests written to since they were last put on the drive
+
+        return None
+
+
+    def __get_run_folder(self, folderpath: str) -> str | None:
+        """
+        returns the folder that files in folderpath are renamed into (creating it if needed),
+        None if there is no trash folder on the filesystem of folderpath that can be written to
+
+        must be called with self.__lock held
+        """
+        device = os.stat(folderpath).st_dev
+        if device in self.__run_folders:
+            return self.__run_folders[device]
+
+        mount_point = os.path.abspath(folderpath)
+        while not os.path.ismount(mount_point):
+            mount_point = os.path.dirname(mount_point)
+
+        run_folder = os.path.join(mount_point, self.TRASH_FOLDER_NAME, self.__run_name)
+        try:
+            os.makedirs(os.path.join(run_folder, "files"), exist_ok=True)
+            self.__manifests[device] = open(os.path.join(run_folder, self.MANIFEST_FILENAME), "a", encoding="utf-8")
+        except OSError:
+            run_folder = None # can't write to the root of this filesystem
+
+        self.__run_folders[device] = run_folder
+
+        return run_folder
+
+
+    def trash(self, filepath: str, original_filepath: str | None = None) -> bool:
+        """
+        renames filepath into the trash folder of its filesystem and records it in that folder's manifest,
+        with original_filepath as where it is restored to if given (for a link of a file that is about to be replaced).
+        the manifest line is on the drive before the file is renamed, so a trashed file can always be found again,
+        even if the run is interrupted (a line whose rename didn't happen is skipped by restore_trashed_files).
+        to trash many files, trash_files() only waits for the manifest to be on the drive once per batch
+
+        returns False if there is no trash folder on that filesystem (nothing was done), True if the file was trashed
+
+        may raise FileNotFoundError or other OSError
+        """
+        filepath = os.path.abspath(filepath)
+        original_filepath = filepath if original_filepath is None else os.path.abspath(original_filepath)
+
+        with self.__lock:
+            trashed_filepath = self.__record(filepath, original_filepath)
+            if trashed_filepath is None:
+                return False
+            self.__sync_manifests()
+
+        os.rename(filepath, trashed_filepath)
+
+        return True
+
+
+    def trash_files(self, filepaths: list[str]) -> list[int | None]:
+        """
+        trashes a batch of files (the files of one folder for example) like trash(),
+        the manifest lines of the whole batch being written and put on the drive once, before any of the files is renamed
+
+        returns one outcome per filepath: -1 if it was trashed, 6 if it couldn't be found, 5 if it couldn't be trashed,
+        None if there is no trash folder on its filesystem (nothing was done)
+        """
+        outcomes: list[int | None] = list()
+        trashed_filepaths: list[str | None] = list()
+
+        with self.__lock:
+            for filepath in filepaths:
+                filepath = os.path.abspath(filepath)
+                try:
+                    trashed_filepath = self.__record(filepath, filepath)
+                    outcomes.append(-1 if trashed_filepath is not None else None)
+                except FileNotFoundError:
+                    trashed_filepath = None
+                    outcomes.append(6)
+                except OSError:
+                    trashed_filepath = None
+                    outcomes.append(5)
+                trashed_filepaths.append(trashed_filepath)
+            self.__sync_manifests()
+
+        for index in range(len(filepaths)):
+            if trashed_filepaths[index] is None:
+                continue
+            try:
+                os.rename(filepaths[index], trashed_filepaths[index])
+            except FileNotFoundError: # file was deleted, renamed or moved before it could be processed
+                outcomes[index] = 6
+            except OSError:
+                outcomes[index] = 5
+
+        return outcomes
+
+
+    def __record(self, filepath: str, original_filepath: str) -> str | None:
+        """
+        writes the manifest line of filepath (see trash()), without waiting for it to be on the drive (see __sync_manifests)
+
+        returns the filepath that filepath has to be renamed to, None if there is no trash folder on its filesystem
+
+        must be called with self.__lock held, may raise FileNotFoundError or other OSError
+        """
+        run_folder = self.__get_run_folder(os.path.dirname(filepath))
+        if run_folder is None:
+            return None
+        device = os.stat(filepath).st_dev
+        self.__file_counter += 1
+        trashed_filepath = os.path.join(run_folder, "files", "{}_{}".format(self.__file_counter, os.path.basename(original_filepath)))
+        self.__manifests[device].write(json.dumps({"trashed": trashed_filepath, "original": original_filepath}) + "\n")
+        self.__unsynced_devices.add(device)
+
+        return trashed_filepath
+
+
+    def __sync_manifests(self) -> None:
+        """
+        puts the manifest lines written since the last call on the drive, one fsync per manifest
+
+        must be called with self.__lock held
+        """
+        for device in self.__unsynced_devices:
+            self.__manifests[device].flush()
+            os.fsync(self.__manifests[device].fileno())
+        self.__unsynced_devices = set()
+
+        return None
+
+
+    def get_run_folders(self) -> tuple[str, ...]:
+        """
+        returns the trash folders that files were put into so far
+        """
+        with self.__lock:
+            return tuple([run_folder for run_folder in self.__run_folders.values() if run_folder is not None])
+
+
+    def close(self) -> None:
+        """
+        closes the manifests, must be called once done trashing files
+        """
+        with self.__lock:
+            for manifest in self.__manifests.values():
+                manifest.close()
+            self.__manifests = dict()
+
+        return None
+
+
+def restore_trashed_files(run_folder: str) -> tuple[int, int]:
+    """
+    puts every file trashed into run_folder (a folder made by FastTrash) back where it was,
+    recreating its parent folders if they were deleted
+
+    files whose original path is taken by another file are left in the trash
+
+    returns a pair of the number of files restored and the number of files that could not be restored
+    """
+    manifest_path = os.path.join(run_folder, FastTrash.MANIFEST_FILENAME)
+    assert (os.path.exists(manifest_path)), "run_folder does not contain a trash manifest"
+
+    restored_count = 0
+    failed_count = 0
+
+    with open(manifest_path, "r", encoding="utf-8") as manifest:
+        for line in manifest:
+            entry = json.loads(line)
+            if not os.path.exists(entry["trashed"]):
+                continue # already restored or removed from the trash
+            if os.path.exists(entry["original"]):
+                failed_count += 1
+                continue
+            try:
+                os.makedirs(os.path.dirname(entry["original"]), exist_ok=True)
+                os.rename(entry["trashed"], entry["original"])
+                restored_count += 1
+            except OSError:
+                failed_count += 1
+
+    return (restored_count, failed_count)
@@ -0,0 +1,350 @@
+import os
+import errno
+from shutil import copy2, copystat
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import ctypes
+    # linux only, flushes part of a file to the drive instead of all of it like fdatasync (not in the os module)
+    sync_file_range = ctypes.CDLL(None, use_errno=True).sync_file_range
+    sync_file_range.argtypes = (ctypes.c_int, ctypes.c_int64, ctypes.c_int64, ctypes.c_uint)
+except (ImportError, OSError, AttributeError, TypeError): # not available on this os
+    sync_file_range = None
+
+
+SYNC_FILE_RANGE_FLAGS = 1 | 2 | 4 # SYNC_FILE_RANGE_WAIT_BEFORE | SYNC_FILE_RANGE_WRITE | SYNC_FILE_RANGE_WAIT_AFTER, the range is on the drive once it returns
+LARGE_FILE_SIZE = 256*1024*1024 # files of this size or more are copied with copy_large_file
+PARALLEL_FILE_SIZE = 4*1024*1024*1024 # files of this size or more are copied with copy_file_in_ranges
+
+
+def copy_file(source_filepath: str, destination, buffer_chunk_size: int = 16*1024*1024, large_file_size: int = LARGE_FILE_SIZE, parallel_file_size: int = PARALLEL_FILE_SIZE, verify: bool = False) -> str:
+    """
+    copies source_filepath to destination (a filepath, or a folder to copy into) with its metadata, like shutil.copy2,
+    but picks the fastest way to copy this file:
+    - sparse files (with holes in them) only have their data copied and the holes are recreated at the destination, see copy_sparse_file
+    - files of parallel_file_size bytes or more are split into ranges that are copied at the same time, see copy_file_in_ranges
+    - files of large_file_size bytes or more are preallocated and kept out of the os cache, see copy_large_file
+    - anything else goes through shutil.copy2
+
+    buffer_chunk_size is the number of bytes read and written at a time (not used by shutil.copy2),
+    verify is only used for files copied in ranges (see copy_file_in_ranges)
+
+    can be used as copy_function for shutil.move
+
+    returns the destination filepath
+    """
+    if os.path.isdir(destination):
+        destination = os.path.join(destination, os.path.basename(source_filepath))
+
+    if is_sparse_file(source_filepath):
+        copy_sparse_file(source_filepath, destination, buffer_chunk_size)
+        return destination
+
+    filesize = os.stat(source_filepath).st_size
+
+    if hasattr(os, "pwrite") and filesize >= parallel_file_size:
+        copy_file_in_ranges(source_filepath, destination, verify=verify, buffer_chunk_size=buffer_chunk_size)
+        return destination
+
+    if hasattr(os, "posix_fadvise") and filesize >= large_file_size:
+        copy_large_file(source_filepath, destination, buffer_chunk_size)
+        return destination
+
+    return copy2(source_filepath, destination)
+
+
+def is_sparse_file(filepath: str) -> bool:
+    """
+    returns True if filepath takes less space on the drive than its size (it has holes),
+    and the os can find those holes (SEEK_DATA / SEEK_HOLE)
+    """
+    if not hasattr(os, "SEEK_DATA"):
+        return False # os can't tell where the holes are (windows)
+
+    file_stat = os.stat(filepath)
+    if not hasattr(file_stat, "st_blocks"):
+        return False
+
+    return file_stat.st_blocks * 512 < file_stat.st_size # st_blocks is always in 512 byte units
+
+
+def get_data_ranges(file_descriptor: int, filesize: int) -> list[tuple[int, int]]:
+    """
+    returns the (start, stop) byte ranges of a file that contain data, everything else being holes
+
+    may raise OSError if the filesystem doesn't support SEEK_DATA / SEEK_HOLE
+    """
+    data_ranges: list[tuple[int, int]] = list()
+
+    offset = 0
+    while offset < filesize:
+        try:
+            data_start = os.lseek(file_descriptor, offset, os.SEEK_DATA)
+        except OSError as e:
+            if e.errno == errno.ENXIO: # no more data after offset, the rest of the file is a hole
+                break
+            raise
+        data_stop = os.lseek(file_descriptor, data_start, os.SEEK_HOLE)
+        data_ranges.append((data_start, data_stop))
+        offset = data_stop
+
+    return data_ranges
+
+
+def copy_sparse_file(source_filepath: str, destination_filepath: str, buffer_chunk_size: int = 16*1024*1024) -> None:
+    """
+    copies only the data of source_filepath (found with SEEK_DATA / SEEK_HOLE), skipping over the holes,
+    then sets the size of the destination so that the holes (including one at the end) are recreated,
+    and copies the metadata like shutil.copy2
+
+    only works on systems that have os.SEEK_DATA
+    """
+    source_fd = os.open(source_filepath, os.O_RDONLY)
+    try:
+        filesize = os.fstat(source_fd).st_size
+        data_ranges = get_data_ranges(source_fd, filesize)
+
+        destination_fd = os.open(destination_filepath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+        try:
+            for data_start, data_stop in data_ranges:
+                offset = data_start
+                while offset < data_stop:
+                    chunk = os.pread(source_fd, min(buffer_chunk_size, data_stop - offset), offset)
+                    if not chunk: # file got shorter while copying
+                        break
+                    __pwrite_all(destination_fd, chunk, offset) # writing past the end of the file leaves a hole before it
+                    offset += len(chunk)
+            os.ftruncate(destination_fd, filesize)
+        finally:
+            os.close(destination_fd)
+    finally:
+        os.close(source_fd)
+
+    copystat(source_filepath, destination_filepath)
+
+    return None
+
+
+def copy_large_file(source_filepath: str, destination_filepath: str, buffer_chunk_size: int = 16*1024*1024, drop_behind_size: int = 64*1024*1024) -> None:
+    """
+    copies source_filepath in chunks of buffer_chunk_size bytes without filling the os cache with data that won't be read again:
+    - the destination is preallocated to its full size (posix_fallocate) so it doesn't grow piecemeal and get fragmented
+    - the source is read with the sequential access hint (POSIX_FADV_SEQUENTIAL) so the os reads ahead
+    - the bytes are copied by the os (copy_file_range) when it can, without going through python
+    - every drop_behind_size bytes, the destination is flushed to the drive and the pages of both files that were
+      just copied are dropped from the os cache (POSIX_FADV_DONTNEED), so the cache of other programs isn't evicted
+    then copies the metadata like shutil.copy2
+
+    only works on systems that have os.posix_fadvise
+    """
+    source_fd = os.open(source_filepath, os.O_RDONLY)
+    try:
+        filesize = os.fstat(source_fd).st_size
+        os.posix_fadvise(source_fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+
+        destination_fd = os.open(destination_filepath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+        try:
+            try:
+                os.posix_fallocate(destination_fd, 0, filesize)
+            except OSError:
+                pass # filesystem can't preallocate, the file will just grow as it's written
+
+            use_copy_file_range = hasattr(os, "copy_file_range")
+            buffer = None # only needed if the os can't copy by itself
+            offset = 0
+            dropped_offset = 0 # everything before this has been dropped from the os cache
+            while True:
+                bytes_copied = 0
+                if use_copy_file_range:
+                    try:
+                        bytes_copied = os.copy_file_range(source_fd, destination_fd, buffer_chunk_size, offset, offset)
+                    except OSError: # not supported between these files (older kernels, some filesystems)
+                        use_copy_file_range = False
+                if not use_copy_file_range:
+                    if buffer is None:
+                        buffer = bytearray(buffer_chunk_size) # reused for every chunk instead of making a new bytes object each time
+                    bytes_copied = os.preadv(source_fd, [buffer], offset)
+                    __pwrite_all(destination_fd, memoryview(buffer)[:bytes_copied], offset)
+                if bytes_copied == 0: # end of the file
+                    break
+                offset += bytes_copied
+                if offset - dropped_offset >= drop_behind_size:
+                    __drop_behind(source_fd, destination_fd, dropped_offset, offset)
+                    dropped_offset = offset
+
+            os.ftruncate(destination_fd, offset) # in case the source got shorter than what was preallocated
+            __drop_behind(source_fd, destination_fd, dropped_offset, offset)
+        finally:
+            os.close(destination_fd)
+    finally:
+        os.close(source_fd)
+
+    copystat(source_filepath, destination_filepath)
+
+    return None
+
+
+def copy_file_in_ranges(source_filepath: str, destination_filepath: str, range_size: int = 256*1024*1024, max_workers: int | None = None, verify: bool = False, buffer_chunk_size: int = 16*1024*1024, drop_behind_size: int = 64*1024*1024) -> None:
+    """
+    copies source_filepath by cutting it into ranges of range_size bytes that are copied by several threads at the same time
+    (copy_file_range, or pread/pwrite, with explicit offsets so the threads can share the same files),
+    one stream is often not enough to use all the bandwidth of fast drive arrays or network filesystems
+
+    the ranges are written to a temporary file next to the destination, which is preallocated to its full size.
+    like copy_large_file, where the os has posix_fadvise each range is read with the sequential access hint
+    and every drop_behind_size bytes of it are flushed and dropped from the os cache (see __drop_behind),
+    each thread only flushing its own range (sync_file_range) so that they don't wait on each other.
+    only once every range is done (and verified if verify is True, by reading both files back and comparing them)
+    is the metadata copied and the temporary file renamed to destination_filepath,
+    so destination_filepath never exists as a partial copy.
+    on any error the temporary file is removed and the error is raised
+
+    max_workers is the number of ranges copied at the same time, None for up to 8
+
+    only works on systems that have os.pwrite
+    """
+    temporary_filepath = os.path.join(os.path.dirname(destination_filepath), ".{}.partial".format(os.path.basename(destination_filepath)))
+
+    source_fd = os.open(source_filepath, os.O_RDONLY)
+    try:
+        filesize = os.fstat(source_fd).st_size
+        ranges = [(start, min(start + range_size, filesize)) for start in range(0, filesize, range_size)]
+        if max_workers is None:
+            max_workers = max(1, min(8, len(ranges)))
+
+        destination_fd = os.open(temporary_filepath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+        try:
+            if hasattr(os, "posix_fallocate"):
+                try:
+                    os.posix_fallocate(destination_fd, 0, filesize)
+                except OSError:
+                    pass # filesystem can't preallocate, the file will just grow as it's written
+            else:
+                os.ftruncate(destination_fd, filesize)
+
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                threads = [executor.submit(__copy_range, source_fd, destination_fd, start, stop, buffer_chunk_size, drop_behind_size) for (start, stop) in ranges]
+                copied_sizes = [thread.result() for thread in threads] # raises the error of the first range that failed
+
+            if copied_sizes != [stop - start for (start, stop) in ranges]:
+                raise OSError(errno.EIO, "source file got shorter while it was being copied", source_filepath)
+
+            if hasattr(os, "posix_fadvise") and sync_file_range is None: # the ranges could only drop the pages that were already written
+                os.fdatasync(destination_fd)
+                os.posix_fadvise(destination_fd, 0, 0, os.POSIX_FADV_DONTNEED)
+
+            if verify:
+                verify_fd = os.open(temporary_filepath, os.O_RDONLY)
+                try:
+                    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                        threads = [executor.submit(__ranges_are_equal, source_fd, verify_fd, start, stop, buffer_chunk_size) for (start, stop) in ranges]
+                        ranges_are_equal = [thread.result() for thread in threads]
+                finally:
+                    os.close(verify_fd)
+                if not all(ranges_are_equal):
+                    raise OSError(errno.EIO, "copy is not the same as the source", source_filepath)
+        finally:
+            os.close(destination_fd)
+
+        copystat(source_filepath, temporary_filepath)
+        os.replace(temporary_filepath, destination_filepath)
+    except BaseException:
+        try:
+            os.remove(temporary_filepath)
+        except OSError:
+            pass
+        raise
+    finally:
+        os.close(source_fd)
+
+    return None
+
+
+def __copy_range(source_fd: int, destination_fd: int, start: int, stop: int, buffer_chunk_size: int, drop_behind_size: int) -> int:
+    """
+    copies bytes start to stop of source_fd to the same place in destination_fd, buffer_chunk_size bytes at a time,
+    dropping what was copied from the os cache every drop_behind_size bytes if the os has posix_fadvise
+
+    returns the number of bytes copied, less than stop - start if the source got shorter
+    """
+    use_fadvise = hasattr(os, "posix_fadvise")
+    if use_fadvise:
+        os.posix_fadvise(source_fd, start, stop - start, os.POSIX_FADV_SEQUENTIAL)
+
+    use_copy_file_range = hasattr(os, "copy_file_range")
+    offset = start
+    dropped_offset = start # everything of this range before this has been dropped from the os cache
+    while offset < stop:
+        count = min(buffer_chunk_size, stop - offset)
+        bytes_copied = 0
+        if use_copy_file_range:
+            try:
+                bytes_copied = os.copy_file_range(source_fd, destination_fd, count, offset, offset)
+            except OSError: # not supported between these files (older kernels, some filesystems)
+                use_copy_file_range = False
+        if not use_copy_file_range:
+            chunk = os.pread(source_fd, count, offset)
+            __pwrite_all(destination_fd, chunk, offset)
+            bytes_copied = len(chunk)
+        if bytes_copied == 0: # source got shorter
+            break
+        offset += bytes_copied
+        if use_fadvise and offset - dropped_offset >= drop_behind_size:
+            __drop_behind(source_fd, destination_fd, dropped_offset, offset, shared_destination=True)
+            dropped_offset = offset
+
+    if use_fadvise:
+        __drop_behind(source_fd, destination_fd, dropped_offset, offset, shared_destination=True)
+
+    return offset - start
+
+
+def __ranges_are_equal(first_fd: int, second_fd: int, start: int, stop: int, buffer_chunk_size: int) -> bool:
+    """
+    returns True if bytes start to stop are the same in both files
+    """
+    offset = start
+    while offset < stop:
+        count = min(buffer_chunk_size, stop - offset)
+        first_chunk = os.pread(first_fd, count, offset)
+        if first_chunk != os.pread(second_fd, count, offset) or len(first_chunk) == 0:
+            return False
+        offset += len(first_chunk)
+
+    return True
+
+
+def __drop_behind(source_fd: int, destination_fd: int, start: int, stop: int, shared_destination: bool = False) -> None:
+    """
+    flushes bytes start to stop of the destination to the drive and drops them from the os cache for both files,
+    dirty pages can't be dropped so the destination has to be flushed first.
+    only that range is flushed where the os has sync_file_range, otherwise the whole destination is (fdatasync),
+    unless shared_destination is True (threads copying ranges of the same file would wait on each other's writes),
+    then the destination pages that are still dirty stay in the cache until it is flushed once at the end of the copy
+    """
+    if stop <= start:
+        return None
+
+    if sync_file_range is not None:
+        if sync_file_range(destination_fd, start, stop - start, SYNC_FILE_RANGE_FLAGS) != 0:
+            error_number = ctypes.get_errno()
+            raise OSError(error_number, os.strerror(error_number))
+    elif not shared_destination:
+        os.fdatasync(destination_fd)
+    os.posix_fadvise(destination_fd, start, stop - start, os.POSIX_FADV_DONTNEED)
+    os.posix_fadvise(source_fd, start, stop - start, os.POSIX_FADV_DONTNEED)
+
+    return None
+
+
+def __pwrite_all(file_descriptor: int, data: bytes | memoryview, offset: int) -> None:
+    """
+    writes all of data at offset, os.pwrite is allowed to write less than it was given
+    """
+    data_view = memoryview(data)
+    while len(data_view) > 0:
+        written = os.pwrite(file_descriptor, data_view, offset)
+        data_view = data_view[written:]
+        offset += written
+
+    return None
@@ -1,7 +1,9 @@
 from time import time, sleep
 import os
+from bisect import bisect_right
 from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait
 from progress_bar import progress_bar
+from duplicate_finder import DuplicateFinder
 
 
 def get_immediate_subfolders(path) -> tuple[str, ...]: # TODO move to Filelist
@@ -16,30 +18,108 @@ def get_immediate_subfolders(path) -> tuple[str, ...]: # TODO move to Filelist
     return tuple(subfolder_paths)
 
 
-def clean_subfolders(folderpath: str, unique_folders: set[str]) ->  None: # FIXME currently non-functional
+def get_folders_to_clean(input_folder: str, folderpaths: set[str]) -> tuple[str, ...]:
     """
-    recursively deletes any folders in folderpath's subfolders (self-inclusive) that are empty
-    and are included in unique_folders
+    returns folderpaths and all of their parent folders inside of input_folder (input_folder itself excluded),
+    these are all the folders that may become empty once files in folderpaths are moved/trashed/deleted
     """
-    assert (os.path.exists(folderpath)), "folderpath didn't exist"
-    assert (isinstance(unique_folders, set)), "unique_folders was not a set"
-
-    folderpath = os.path.abspath(folderpath)
-    subfolders = get_immediate_subfolders(folderpath)
-    for subfolder in subfolders: # recursively clean subfolders
-        subfolder_in_unique_folders = (len(tuple(unique_folders.intersection(set((subfolder,))))) > 0)
-        if subfolder_in_unique_folders:
-            clean_subfolders(subfolder, unique_folders)
-
-    folder_in_unique_folders = (len(tuple(unique_folders.intersection(set((folderpath,))))) > 0)
-    if is_folder_empty(folderpath) and len(get_immediate_subfolders(folderpath)) == 0 and folder_in_unique_folders:
-        # if folder is now empty, we can delete this one
+    input_folder = os.path.abspath(input_folder)
+
+    folders_to_clean: set[str] = set()
+    for folderpath in folderpaths:
+        folderpath = os.path.abspath(folderpath)
+        while folderpath != input_folder and folderpath.startswith(input_folder) and folderpath not in folders_to_clean:
+            folders_to_clean.add(folderpath)
+            folderpath = os.path.dirname(folderpath)
+
+    return tuple(folders_to_clean)
+
+
+def count_folder_entries(folderpaths: tuple[str, ...], folders_per_group: int = 100) -> dict[str, int]:
+    """
+    returns how many files and folders are directly inside each of the folderpaths (one listing per folder),
+    folders that can't be listed are not included
+    """
+    grouped_folderpaths = [folderpaths[i:i+folders_per_group] for i in range(0, len(folderpaths), folders_per_group)]
+
+    entry_counts: dict[str, int] = dict()
+
+    with ThreadPoolExecutor() as executor:
+        threads = [executor.submit(__count_folder_entries_unit_processor, folderpaths_group) for folderpaths_group in grouped_folderpaths]
+        wait(threads)
+        [entry_counts.update(thread.result()) for thread in threads]
+
+    return entry_counts
+
+
+def __count_folder_entries_unit_processor(folderpaths: tuple[str, ...]) -> dict[str, int]:
+    """
+    multithreaded unit processor for count_folder_entries
+    do not use on its own
+    """
+    entry_counts: dict[str, int] = dict()
+
+    for folderpath in folderpaths:
+        try:
+            entry_counts[folderpath] = len(os.listdir(folderpath))
+        except OSError:
+            pass # folder is gone or can't be read, it won't be cleaned
+
+    return entry_counts
+
+
+def remove_emptied_folders(entry_counts: dict[str, int], removed_entry_counts: dict[str, int]) -> int:
+    """
+    removes every folder in entry_counts that is now empty,
+    entry_counts being the number of entries each folder had before files were moved/trashed/deleted (see count_folder_entries)
+    and removed_entry_counts the number of entries that were removed from each folder since then
+
+    folders are removed deepest first, so that a folder that only contained folders that were removed gets removed too.
+    all folders at the same depth are in independent subtrees, so they are removed in parallel
+
+    returns the number of folders removed
+    """
+    remaining_entry_counts: dict[str, int] = {folderpath: entry_count - removed_entry_counts.get(folderpath, 0) for folderpath, entry_count in entry_counts.items()}
+
+    folderpaths_by_depth: dict[int, list[str]] = dict()
+    for folderpath in remaining_entry_counts.keys():
+        depth = folderpath.count(os.sep)
+        if depth not in folderpaths_by_depth:
+            folderpaths_by_depth[depth] = list()
+        folderpaths_by_depth[depth].append(folderpath)
+
+    removed_folder_count = 0
+
+    with ThreadPoolExecutor() as executor:
+        for depth in sorted(folderpaths_by_depth.keys(), reverse=True):
+            empty_folderpaths = [folderpath for folderpath in folderpaths_by_depth[depth] if remaining_entry_counts[folderpath] <= 0]
+            removed_results = executor.map(__remove_folder_if_empty, empty_folderpaths)
+            for folderpath, removed in zip(empty_folderpaths, removed_results):
+                if not removed:
+                    continue
+                removed_folder_count += 1
+                parent_folderpath = os.path.dirname(folderpath)
+                if parent_folderpath in remaining_entry_counts:
+                    remaining_entry_counts[parent_folderpath] -= 1
+
+    return removed_folder_count
+
+
+def __remove_folder_if_empty(folderpath: str) -> bool:
+    """
+    removes folderpath if it is empty, the os refuses to remove folders that aren't
+
+    returns True if the folder was removed
+    """
+    try:
         os.rmdir(folderpath)
+    except OSError: # not actually empty (something was added), or already gone
+        return False
 
-    return None
+    return True
 
 
-def get_duplicate_files(filepaths1: tuple[str], filepaths2: tuple[str], files_per_group: int = 100) -> tuple[tuple[tuple[str, ...], tuple[str, ...]], ...]: # TODO move to Filelist
+def get_duplicate_files(filepaths1: tuple[str], filepaths2: tuple[str], files_per_group: int = 100, compare_group_size: int = 3) -> tuple[tuple[tuple[str, ...], tuple[str, ...]], ...]: # TODO move to Filelist
     """
     returns all the files that are duplicated between path1 and path2,
     as a tuple (each unique file/match)
@@ -51,341 +131,140 @@ def get_duplicate_files(filepaths1: tuple[str], filepaths2: tuple[str], files_pe
 
     does not return files that have 0 bytes size, although all such files would match with each other.
 
-    the greater the total size of duplicates in the filepaths, the longer this will take, as entire files
-    will be read to verify that files are in fact duplicates.
+    see get_duplicate_files_in_roots, which this is the same as with one root (path1 and path2 being the same) or two roots
     """
     assert (isinstance(filepaths1, tuple)), "path1 does not exist"
     assert (isinstance(filepaths2, tuple)), "path2 does not exist"
 
-    filepaths1_set = set(filepaths1)
-    filepaths2_set = set(filepaths2)
-    paths_are_identical = (filepaths1_set == filepaths2_set)
-    filepaths_grouped_by_size: dict[int, tuple[list[str], ...]] = dict()
-    filepath_sizes: dict[str, int] = dict() # a way to quickly get filesize of any file once we have found them all
-    # keys are size, values are tuples of size 2, first files from path1 then files from path2,
-    # inside that tuple is a list of tuples containing
-    # the full filepaths of any files of this size, and their sha256 hashes
-    filepaths_grouped_by_size_hash1: dict[tuple[int, str], tuple[list[str], ...]] = dict() # group by size and hash of first chunk of each file
-    filepath_hash1s: dict[str, str] = dict() # a way to quickly get the first chunk hash of any file once we have found them all
-    filepaths_grouped_by_size_hash2: dict[tuple[int, str, str], tuple[list[str], ...]] = dict() # group by size and hash of first chunk and hash of entire file
-
-    print("counting files in folders...")
-
-    files_to_process = len(filepaths1)
-    filepathss = (filepaths1,)
-    if not paths_are_identical:
-        files_to_process += len(filepaths2)
-        filepathss = (filepaths1, filepaths2)
-
-    print("{} files to process".format(files_to_process))
-    #####################################################################################################################
-    print("getting filesizes...")
-    print("creating threads...")
-
-    progress = progress_bar(100, rate_units="threads")
-    progress2 = progress_bar(100, rate_units="threads") # threads start running once the first ones are created, so start time here
-    thread_counter = 0
-    file_counter = 0
-    size_threads = list()
-    ordered_filepaths = list()
+    # sorted lists only hold references to the filepaths, a set would hash and store every one of them again
+    paths_are_identical = (filepaths1 == filepaths2) or (len(filepaths1) == len(filepaths2) and sorted(filepaths1) == sorted(filepaths2))
 
-    with ThreadPoolExecutor() as executor:
-        for filepaths in filepathss:
-            grouped_filepaths = [tuple(filepaths[i:i+files_per_group]) if i+files_per_group < len(filepaths) else filepaths[i:] for i in range(0, len(filepaths), files_per_group)]
-            for filepaths_group in grouped_filepaths:
-                thread_counter += 1
-                file_counter += len(filepaths_group)
-                thread = executor.submit(__get_multiple_file_sizes, filepaths_group)
-                size_threads.append(thread)
-                ordered_filepaths.extend(filepaths_group)
-                progress.print_progress_bar(file_counter / files_to_process, thread_counter)
-
-        print("") # to add a newline afer the end of the progress bar
-
-        print("waiting for {} threads to return...".format(len(size_threads)))
-
-        all_threads_done = False
-        last_done_count = 0
-        while not all_threads_done:
-            done_count = 0
-            for thread in size_threads:
-                done_count += thread.done()
-            all_threads_done = (done_count == len(size_threads))
-            if last_done_count != done_count:
-                last_done_count = done_count
-                progress2.print_progress_bar(done_count / len(size_threads), done_count)
-            else:
-                sleep(min((progress2.get_ETA(done_count / len(size_threads))/100, 1)))
-
-        print("") # to add a newline after the end of the progress bar
-
-        print("processing filesizes...")
-
-        file_size_groups: list[tuple[int, ...]] = [thread.result() for thread in size_threads]
-
-    ordered_file_sizes: list[int] = list()
-    [ordered_file_sizes.extend(file_size_group) for file_size_group in file_size_groups]
-    progress = progress_bar(100, rate_units="files")
-    i = -1
-
-    for filepath in ordered_filepaths:
-        i += 1
-        first_filepaths = (filepath in filepaths1_set)
-        if first_filepaths:
-            index = 0
-        else:
-            index = 1
-        file_size = ordered_file_sizes[i]
-        filepath_sizes[filepath] = file_size
-        if file_size == 0:
-            continue # all files with 0 size would match which is unnecessarily slow
-        try:
-            filepaths_grouped_by_size[file_size][index].append(filepath)
-        except KeyError: # can't append if the list hadn't been created
-            if first_filepaths:
-                filepaths_grouped_by_size[file_size] = ([filepath], list())
-            else:
-                filepaths_grouped_by_size[file_size] = (list(), [filepath])
-        if i % files_per_group == 0:
-            progress.print_progress_bar((i+1) / files_to_process, i+1)
-    progress.print_progress_bar(1, i+1)
-
-    print("") # to add a newline after the end of the progress bar
-
-    print("counting size matches...")
-
-    size_match_filepathss: tuple[list[str], list[str]] = (list(), list()) # same format as filepathss
-
-    for filesize in filepaths_grouped_by_size.keys():
-        if ((not paths_are_identical and (len(filepaths_grouped_by_size[filesize][0]) > 0 and len(filepaths_grouped_by_size[filesize][1]) > 0)) or
-           (paths_are_identical and len(filepaths_grouped_by_size[filesize][0]) > 1)):
-            # then there are potential matches
-            size_match_filepathss[0].extend(filepaths_grouped_by_size[filesize][0])
-            size_match_filepathss[1].extend(filepaths_grouped_by_size[filesize][1])
-    
-    files_to_process = len(size_match_filepathss[0]) + len(size_match_filepathss[1])
-
-    print("{} files remaining to process".format(files_to_process))
-    #####################################################################################################################
-    print("getting first MB hashes...")
-    print("creating threads...")
-
-    progress = progress_bar(100, rate_units="threads")
-    progress2 = progress_bar(100, rate_units="threads") # threads start running once the first ones are created, so start time here
-    thread_counter = 0
-    file_counter = 0
-    hash_threads = list()
-    ordered_filepaths = list()
-
-    with ProcessPoolExecutor() as executor:
-        for filepaths in size_match_filepathss: # only get hashes of potential matches
-            grouped_filepaths = [tuple(filepaths[i:i+files_per_group]) if i+files_per_group < len(filepaths) else filepaths[i:] for i in range(0, len(filepaths), files_per_group)]
-            for filepaths_group in grouped_filepaths:
-                thread_counter += 1
-                file_counter += len(filepaths_group)
-                thread = executor.submit(__get_multiple_file_hashes, filepaths_group, buffer_chunk_size=1048576, only_read_one_chunk=True)
-                hash_threads.append(thread)
-                ordered_filepaths.extend(filepaths_group)
-                progress.print_progress_bar(file_counter / files_to_process, thread_counter)
-
-        print("") # to add a newline afer the end of the progress bar
-
-        print("waiting for {} threads to return...".format(len(hash_threads)))
-
-        all_threads_done = False
-        last_done_count = 0
-        while not all_threads_done:
-            done_count = 0
-            for thread in hash_threads:
-                done_count += thread.done()
-            all_threads_done = (done_count == len(hash_threads))
-            if last_done_count != done_count:
-                last_done_count = done_count
-                progress2.print_progress_bar(done_count / len(hash_threads), done_count)
-            else:
-                try:
-                    sleep(min((progress2.get_ETA(done_count / len(hash_threads))/100, 1)))
-                except ZeroDivisionError:
-                    sleep(0.01)
-
-        print("") # to add a newline after the end of the progress bar
-
-        print("processing hashes...")
-
-        file_hash_groups: list[tuple[str]] = [thread.result() for thread in hash_threads]
-
-    file_hashes: list[str] = list()
-    [file_hashes.extend(file_hash_group) for file_hash_group in file_hash_groups]
-    progress = progress_bar(100, rate_units="files")
-    i = -1
-
-    for filepath in ordered_filepaths:
-        i += 1
-        first_filepaths = (filepath in filepaths1_set)
-        if first_filepaths:
-            index = 0
-        else:
-            index = 1
-        file_size = filepath_sizes[filepath]
-        file_hash = file_hashes[i]
-        filepath_hash1s[filepath] = file_hash
-        if file_hash == "":
-            continue # happens if there was an error in getting the hash
-        try:
-            filepaths_grouped_by_size_hash1[(file_size, file_hash)][index].append(filepath)
-        except KeyError: # can't append if the list hadn't been created
-            if first_filepaths:
-                filepaths_grouped_by_size_hash1[(file_size, file_hash)] = ([filepath], list())
-            else:
-                filepaths_grouped_by_size_hash1[(file_size, file_hash)] = (list(), [filepath])
-        if i % files_per_group == 0:
-            progress.print_progress_bar((i+1) / files_to_process, i+1)
-    progress.print_progress_bar(1, i+1)
-
-    print("") # to add a newline after the end of the progress bar
-
-    print("counting first MB hash matches...")
-
-    hash1_match_filepathss: tuple[list[str], list[str]] = (list(), list()) # same format as filepathss
-
-    for filehash1 in filepaths_grouped_by_size_hash1.keys():
-        if ((not paths_are_identical and (len(filepaths_grouped_by_size_hash1[filehash1][0]) > 0 and len(filepaths_grouped_by_size_hash1[filehash1][1]) > 0)) or
-           (paths_are_identical and len(filepaths_grouped_by_size_hash1[filehash1][0]) > 1)):
-            # then there are potential matches
-            hash1_match_filepathss[0].extend(filepaths_grouped_by_size_hash1[filehash1][0])
-            hash1_match_filepathss[1].extend(filepaths_grouped_by_size_hash1[filehash1][1])
-    
-    files_to_process = len(hash1_match_filepathss[0]) + len(hash1_match_filepathss[1])
-
-    print("{} files remaining to process".format(files_to_process))
-    #####################################################################################################################
-    print("getting whole file hashes...")
-    print("creating threads...")
-
-    progress = progress_bar(100, rate_units="threads")
-    progress2 = progress_bar(100, rate_units="threads") # threads start running once the first ones are created, so start time here
-    thread_counter = 0
-    file_counter = 0
-    hash_threads = list()
-    ordered_filepaths = list()
-
-    with ProcessPoolExecutor() as executor:
-        for filepaths in hash1_match_filepathss: # only get hashes of potential matches
-            grouped_filepaths = [tuple(filepaths[i:i+files_per_group]) if i+files_per_group < len(filepaths) else filepaths[i:] for i in range(0, len(filepaths), files_per_group)]
-            for filepaths_group in grouped_filepaths:
-                thread_counter += 1
-                file_counter += len(filepaths_group)
-                thread = executor.submit(__get_multiple_file_hashes, filepaths_group, buffer_chunk_size=1048576, only_read_one_chunk=False)
-                hash_threads.append(thread)
-                ordered_filepaths.extend(filepaths_group)
-                progress.print_progress_bar(file_counter / files_to_process, thread_counter)
-
-        print("") # to add a newline afer the end of the progress bar
-
-        print("waiting for {} threads to return...".format(len(hash_threads)))
-
-        all_threads_done = False
-        last_done_count = 0
-        while not all_threads_done:
-            done_count = 0
-            for thread in hash_threads:
-                done_count += thread.done()
-            all_threads_done = (done_count == len(hash_threads))
-            if last_done_count != done_count:
-                last_done_count = done_count
-                progress2.print_progress_bar(done_count / len(hash_threads), done_count)
-            else:
-                try:
-                    sleep(min((progress2.get_ETA(done_count / len(hash_threads))/100, 1))) # not sure if this is working at the moment
-                except ZeroDivisionError:
-                    sleep(0.01)
-
-        print("") # to add a newline after the end of the progress bar
-
-        print("processing hashes...")
-
-        file_hash_groups: list[tuple[str]] = [thread.result() for thread in hash_threads]
-
-    file_hashes: list[str] = list()
-    [file_hashes.extend(file_hash_group) for file_hash_group in file_hash_groups]
-    progress = progress_bar(100, rate_units="files")
-    i = -1
-
-    for filepath in ordered_filepaths:
-        i += 1
-        first_filepaths = (filepath in filepaths1_set)
-        if first_filepaths:
-            index = 0
+    if paths_are_identical:
+        duplicate_groups = get_duplicate_files_in_roots((filepaths1,), ("path1",), files_per_group, compare_group_size)
+        return tuple([(filepaths_by_root[0], filepaths_by_root[0]) for _, filepaths_by_root in duplicate_groups])
+
+    duplicate_groups = get_duplicate_files_in_roots((filepaths1, filepaths2), ("path1", "path2"), files_per_group, compare_group_size)
+
+    return tuple([(filepaths_by_root[0], filepaths_by_root[1]) for _, filepaths_by_root in duplicate_groups if len(filepaths_by_root[0]) > 0 and len(filepaths_by_root[1]) > 0])
+
+
+def get_duplicate_files_in_roots(filepaths_by_root: tuple[tuple[str, ...], ...], root_names: tuple[str, ...] | None = None, files_per_group: int = 100, compare_group_size: int = 3) -> tuple[tuple[int, tuple[tuple[str, ...], ...]], ...]:
+    """
+    returns every group of identical files among the roots once all of them are found, see iterate_duplicate_files_in_roots
+    """
+    return tuple(iterate_duplicate_files_in_roots(filepaths_by_root, root_names, files_per_group, compare_group_size))
+
+
+def iterate_duplicate_files_in_roots(filepaths_by_root: tuple[tuple[str, ...], ...], root_names: tuple[str, ...] | None = None, files_per_group: int = 100, compare_group_size: int = 3):
+    """
+    finds the duplicated files among any number of roots (folders, drives) at once, each file being read at most once,
+    filepaths_by_root being the filepaths of each root (a filepath that is in several roots belongs to the first one)
+
+    generator, yields every group of identical files as soon as it is final (see DuplicateFinder.find_iter)
+    as a pair of (filesize, filepaths of each root), the filepaths of a root being empty if that root has no copy of the file.
+    once all groups are yielded, prints how many groups span each combination of roots (named by root_names, defaults to "root 0", "root 1", ...),
+    for example the files that only have copies on one drive
+
+    does not return files that have 0 bytes size, although all such files would match with each other.
+
+    paths that are hardlinks of the same file are read once and listed together with the rest of their group,
+    files that are only hardlinks of each other are not duplicates (they take no extra space) and are only counted.
+    the size that can be freed counts each file on the drive (inode) once.
+
+    the greater the total size of duplicates in the filepaths, the longer this will take, as entire files
+    will be read to verify that files are in fact duplicates. see DuplicateFinder for how files are compared,
+    groups of compare_group_size files or less are compared directly instead of hashed
+    """
+    assert (isinstance(filepaths_by_root, tuple) and all([isinstance(filepaths, tuple) for filepaths in filepaths_by_root])), "filepaths_by_root was not a tuple of tuples"
+    assert (root_names is None or len(root_names) == len(filepaths_by_root)), "root_names was not mapped to filepaths_by_root"
+    if root_names is None:
+        root_names = tuple(["root {}".format(root_index) for root_index in range(len(filepaths_by_root))])
+
+    # files are integers (their index in all_filepaths) from here on,
+    # the files of root n being the ones from root_starts[n] to root_starts[n+1]
+    all_filepaths: list[str] = list()
+    root_starts: list[int] = list()
+    root_folders = [__get_root_folder(filepaths) for filepaths in filepaths_by_root]
+    for root_index in range(len(filepaths_by_root)):
+        root_starts.append(len(all_filepaths))
+        # only roots that are in the same folder tree can share filepaths, those are removed by sorting instead of looking every filepath up
+        earlier_root_indexes = [earlier_root_index for earlier_root_index in range(root_index) if __root_folders_overlap(root_folders[earlier_root_index], root_folders[root_index])]
+        if len(earlier_root_indexes) == 0:
+            all_filepaths.extend(filepaths_by_root[root_index])
         else:
-            index = 1
-        file_size = filepath_sizes[filepath]
-        file_hash1 = filepath_hash1s[filepath]
-        file_hash2 = file_hashes[i]
-        if file_hash2 == "":
-            continue # happens if there was an error getting the hash
-        try:
-            filepaths_grouped_by_size_hash2[(file_size, file_hash1, file_hash2)][index].append(filepath)
-        except KeyError: # can't append if the list hadn't been created
-            if first_filepaths:
-                filepaths_grouped_by_size_hash2[(file_size, file_hash1, file_hash2)] = ([filepath], list())
-            else:
-                filepaths_grouped_by_size_hash2[(file_size, file_hash1, file_hash2)] = (list(), [filepath])
-        if i % files_per_group == 0:
-            progress.print_progress_bar((i+1) / files_to_process, i+1)
-    progress.print_progress_bar(1, i+1)
-
-    print("") # to add a newline after the end of the progress bar
-
-    print("counting hash matches (exact duplicates)...")
-
-    hash2_match_filepathss: tuple[list[str], list[str]] = (list(), list()) # same format as filepathss
-
-    for filehash2 in filepaths_grouped_by_size_hash2.keys():
-        if ((not paths_are_identical and (len(filepaths_grouped_by_size_hash2[filehash2][0]) > 0 and len(filepaths_grouped_by_size_hash2[filehash2][1]) > 0)) or
-           (paths_are_identical and len(filepaths_grouped_by_size_hash2[filehash2][0]) > 1)):
-            # then there are matches
-            hash2_match_filepathss[0].extend(filepaths_grouped_by_size_hash2[filehash2][0])
-            hash2_match_filepathss[1].extend(filepaths_grouped_by_size_hash2[filehash2][1])
-    
-    files_to_process = len(hash2_match_filepathss[0]) + len(hash2_match_filepathss[1])
+            all_filepaths.extend(__remove_sorted_filepaths(filepaths_by_root[root_index], sorted([filepath for earlier_root_index in earlier_root_indexes for filepath in filepaths_by_root[earlier_root_index]])))
+    all_filepaths = tuple(all_filepaths)
+
+    print("{} files to process".format(len(all_filepaths)))
+
+    duplicate_finder = DuplicateFinder(all_filepaths, files_per_group=files_per_group, compare_group_size=compare_group_size)
+
+    counts_by_roots: dict[tuple[int, ...], list[int]] = dict() # keys are the indexes of the roots a group is on, values are [groups, files, bytes that can be freed]
+
+    for filesize, file_ids in duplicate_finder.find_iter(): # one file id per inode
+        root_filepaths: list[list[str]] = [list() for _ in filepaths_by_root]
+        for file_id in file_ids:
+            for linked_file_id in (file_id,) + duplicate_finder.get_links(file_id):
+                root_filepaths[bisect_right(root_starts, linked_file_id) - 1].append(all_filepaths[linked_file_id])
+
+        counts = counts_by_roots.setdefault(tuple([root_index for root_index in range(len(root_filepaths)) if len(root_filepaths[root_index]) > 0]), [0, 0, 0])
+        counts[0] += 1
+        counts[1] += sum([len(filepaths) for filepaths in root_filepaths])
+        counts[2] += filesize * (len(file_ids) - 1) # size of (total inodes minus the one to keep)
+
+        yield (filesize, tuple([tuple(filepaths) for filepaths in root_filepaths]))
 
-    print("{} duplicate files".format(files_to_process))
+    for root_indexes, (number_of_groups, number_of_files, extra_size) in sorted(counts_by_roots.items()):
+        print("{} {}: {} groups of duplicates, {} files, {} bytes that can be freed".format("only on" if len(root_indexes) == 1 else "on", ", ".join([root_names[root_index] for root_index in root_indexes]), number_of_groups, number_of_files, extra_size))
 
-    duplicate_file_matches: list[tuple[tuple[str, ...], tuple[str, ...]]] = list()
-    total_extra_size = 0
+    hardlink_groups = duplicate_finder.get_hardlink_groups()
+    print("{} duplicate files".format(sum([counts[1] for counts in counts_by_roots.values()])))
+    print("{} files already are hardlinks of {} others, not counted as extra copies".format(sum([len(file_ids) - 1 for _, file_ids in hardlink_groups]), len(hardlink_groups)))
+    print("total size in bytes that can be freed by deleting extra copies of files: {}".format(sum([counts[2] for counts in counts_by_roots.values()])))
+
+    return None
 
-    for filehash2 in filepaths_grouped_by_size_hash2.keys():
-        if ((not paths_are_identical and (len(filepaths_grouped_by_size_hash2[filehash2][0]) > 0 and len(filepaths_grouped_by_size_hash2[filehash2][1]) > 0)) or
-           (paths_are_identical and len(filepaths_grouped_by_size_hash2[filehash2][0]) > 1)):
-            # then there are matches
-            path1_match_files = tuple(filepaths_grouped_by_size_hash2[filehash2][0])
-            if paths_are_identical:
-                duplicate_file_matches.append((path1_match_files, path1_match_files))
-                total_extra_size += filehash2[0] * (len(duplicate_file_matches[-1][0]) - 1) # size of (total matches minus the one to keep)
-            else:
-                path2_match_files = tuple(filepaths_grouped_by_size_hash2[filehash2][1])
-                duplicate_file_matches.append((path1_match_files, path2_match_files))
-                total_extra_size += filehash2[0] * (len(duplicate_file_matches[-1][0]) + len(duplicate_file_matches[-1][1]) - 1) # size of (total matches minus the one to keep)
 
-    print("total size in bytes that can be freed by deleting extra copies of files: {}".format(total_extra_size))
+def __get_root_folder(filepaths: tuple[str, ...]) -> str | None:
+    """
+    returns the deepest folder that all filepaths are in, None if there are no filepaths or they aren't absolute
+
+    the common start of the smallest and greatest filepaths is the common start of all of them,
+    which doesn't split every filepath into its folders like os.path.commonpath does
+    """
+    if len(filepaths) == 0:
+        return None
+    common_start = os.path.commonprefix([min(filepaths), max(filepaths)])
+    if not os.path.isabs(common_start):
+        return None
 
-    return tuple(duplicate_file_matches)
+    return common_start[:common_start.rfind(os.sep) + 1] # cut back to the last separator, "/folder/file_1" and "/folder/file_2" are in "/folder/"
 
 
-def __get_multiple_file_sizes(filepaths: tuple[str, ...]) -> tuple[int, ...]:
+def __root_folders_overlap(root_folder1: str | None, root_folder2: str | None) -> bool:
     """
-    gets the size of each file in filepaths
+    returns True if the two root folders are the same or one is inside of the other, or if it isn't known (None)
     """
-    ordered_file_sizes = list()
+    if root_folder1 is None or root_folder2 is None:
+        return True
+
+    return root_folder1.startswith(root_folder2) or root_folder2.startswith(root_folder1) # both end with a separator
 
-    for filepath in filepaths:
-        try:
-            file_size = os.stat(filepath).st_size
-        except:
-            file_size = 0 # couldn't get filesize for some reason
-        ordered_file_sizes.append(file_size)
 
-    return tuple(ordered_file_sizes)
+def __remove_sorted_filepaths(filepaths: tuple[str, ...], sorted_filepaths_to_remove: list[str]) -> list[str]:
+    """
+    returns filepaths (sorted) without the ones in sorted_filepaths_to_remove, going through both sorted lists side by side
+    """
+    kept_filepaths: list[str] = list()
+    index = 0
+    for filepath in sorted(filepaths):
+        while index < len(sorted_filepaths_to_remove) and sorted_filepaths_to_remove[index] < filepath:
+            index += 1
+        if index < len(sorted_filepaths_to_remove) and sorted_filepaths_to_remove[index] == filepath:
+            continue
+        kept_filepaths.append(filepath)
+
+    return kept_filepaths
 
 
 def main():
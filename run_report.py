@@ -0,0 +1,76 @@
+import json
+
+
+class RunReport():
+    """
+    Collects the result of every file processed by move_files.
+
+    A result is a tuple of (filepath, operation, bytes, seconds, error number),
+    operation being the move_mode ("C", "M", "T", "D"), seconds the time it took to process the file
+    and error number -1 if nothing went wrong, otherwise one of the error numbers of move_file_error.
+
+    Results are counted per error number and, if a report filepath is given, streamed to that file as JSON lines.
+    Not meant to be shared between threads: unit processors return their results and the main thread adds them.
+    """
+    def __init__(self, report_filepath: str | None = None) -> None:
+        """
+        report_filepath is the JSON lines file to write every result to (overwritten), None to only count results
+        """
+        self.__report_file = None
+        if report_filepath is not None:
+            self.__report_file = open(report_filepath, "w", encoding="utf-8")
+
+        self.__file_counts: dict[int, int] = dict() # keys are error numbers, -1 for no error
+        self.__byte_counts: dict[int, int] = dict() # same keys as file_counts
+        self.__total_seconds = 0.0
+
+        return None
+
+
+    def add_results(self, results: list[tuple[str, str, int, float, int]]) -> None:
+        """
+        counts the results, and writes them to the report file if there is one
+        """
+        for (_, _, file_bytes, seconds, error_number) in results:
+            self.__file_counts[error_number] = self.__file_counts.get(error_number, 0) + 1
+            self.__byte_counts[error_number] = self.__byte_counts.get(error_number, 0) + file_bytes
+            self.__total_seconds += seconds
+
+        if self.__report_file is not None:
+            # formatted by hand, only the filepath needs escaping, about twice as fast as json.dumps of a dict
+            self.__report_file.write("".join(['{{"path": {}, "op": "{}", "bytes": {}, "seconds": {:.6f}, "outcome": {}}}\n'.format(json.dumps(filepath), operation, file_bytes, seconds, error_number)
+                                              for (filepath, operation, file_bytes, seconds, error_number) in results]))
+
+        return None
+
+
+    def get_error_counts(self) -> list[tuple[int, int]]:
+        """
+        returns a list of pairs of (error number, number of files) for the errors that did happen, sorted by error number
+        """
+        return [(error_number, self.__file_counts[error_number]) for error_number in sorted(self.__file_counts.keys()) if error_number != -1]
+
+
+    def get_summary(self) -> dict[int, tuple[int, int]]:
+        """
+        returns a dict with error numbers as keys (-1 for no error) and pairs of (number of files, number of bytes) as values
+        """
+        return {error_number: (self.__file_counts[error_number], self.__byte_counts[error_number]) for error_number in sorted(self.__file_counts.keys())}
+
+
+    def get_total_seconds(self) -> float:
+        """
+        returns the total time spent processing files, summed over all threads
+        """
+        return self.__total_seconds
+
+
+    def close(self) -> None:
+        """
+        closes the report file, must be called once all results are added
+        """
+        if self.__report_file is not None:
+            self.__report_file.close()
+            self.__report_file = None
+
+        return None
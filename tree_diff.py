@@ -0,0 +1,148 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from Filelist import Filelist
+from duplicate_finder import get_sampled_hash
+from progress_bar import progress_bar
+
+
+def compare_filelists(filelist_a: Filelist, filelist_b: Filelist, files_per_group: int = Filelist.FILES_PER_MULTITHREADED_IO_GROUP, max_workers: int | None = None) -> tuple[dict[str, list[str]], dict[str, int]]:
+    """
+    compares two folders file by file, by their filepaths relative to their folders (for example after a migration from A to B):
+    every file is only in A, only in B, the same in both or differing
+
+    the relative filepaths of each Filelist are sorted once and gone through side by side (merge join), instead of looking each one up in the other.
+    files that are in both are compared from the cheapest to the most expensive check, the next one only being done if the previous one can't tell:
+    size (from the Filelists), same device and inode (same file), partial hash of a few samples (see get_sampled_hash),
+    then full hash (see Filelist.get_filehashes_of, hashes the Filelists already have are reused and the ones obtained are kept).
+    the content checks are done in groups of files_per_group pairs by max_workers threads (None for the ThreadPoolExecutor default)
+
+    returns (relative_filepaths, stats),
+    relative_filepaths being a dict of sorted lists of the relative filepaths (with / separators) that are "only_in_a", "only_in_b", "same" and "differing",
+    stats being a dict of how many of the files in both were told apart or matched at each stage:
+    "differing_size", "same_inode", "differing_partial_hash", "differing_full_hash", "same_full_hash", "unreadable" (counted as differing),
+    and "partial_bytes_read"
+    """
+    assert (isinstance(filelist_a, Filelist)), "filelist_a was not a Filelist"
+    assert (isinstance(filelist_b, Filelist)), "filelist_b was not a Filelist"
+    assert (not filelist_a.is_archive() and not filelist_b.is_archive()), "files in an archive can't be compared"
+
+    files_a = __get_sorted_files(filelist_a)
+    files_b = __get_sorted_files(filelist_b)
+    filepaths_a = filelist_a.get_filepaths()
+    filepaths_b = filelist_b.get_filepaths()
+    inodes_a = filelist_a.get_inodes()
+    inodes_b = filelist_b.get_inodes()
+
+    relative_filepaths: dict[str, list[str]] = {"only_in_a": list(), "only_in_b": list(), "same": list(), "differing": list()}
+    stats = {"differing_size": 0, "same_inode": 0, "differing_partial_hash": 0, "differing_full_hash": 0, "same_full_hash": 0, "unreadable": 0, "partial_bytes_read": 0}
+
+    # merge join, pairs to check the contents of are pairs of (relative filepath, index in filelist_a, index in filelist_b, filesize)
+    pairs_to_check: list[tuple[str, int, int, int]] = list()
+    index_a = 0
+    index_b = 0
+    while index_a < len(files_a) and index_b < len(files_b):
+        (relative_filepath_a, file_index_a, filesize_a) = files_a[index_a]
+        (relative_filepath_b, file_index_b, filesize_b) = files_b[index_b]
+        if relative_filepath_a < relative_filepath_b:
+            relative_filepaths["only_in_a"].append(relative_filepath_a)
+            index_a += 1
+            continue
+        if relative_filepath_a > relative_filepath_b:
+            relative_filepaths["only_in_b"].append(relative_filepath_b)
+            index_b += 1
+            continue
+
+        if filesize_a != filesize_b:
+            relative_filepaths["differing"].append(relative_filepath_a)
+            stats["differing_size"] += 1
+        elif inodes_a[file_index_a] == inodes_b[file_index_b] and inodes_a[file_index_a][1] != 0:
+            relative_filepaths["same"].append(relative_filepath_a)
+            stats["same_inode"] += 1
+        else:
+            pairs_to_check.append((relative_filepath_a, file_index_a, file_index_b, filesize_a))
+        index_a += 1
+        index_b += 1
+    relative_filepaths["only_in_a"].extend([relative_filepath for relative_filepath, _, _ in files_a[index_a:]])
+    relative_filepaths["only_in_b"].extend([relative_filepath for relative_filepath, _, _ in files_b[index_b:]])
+    files_a = list() # free the memory before reading the files
+    files_b = list()
+
+    print("comparing the contents of {} files...".format(len(pairs_to_check)))
+    grouped_pairs = [pairs_to_check[i:i+files_per_group] for i in range(0, len(pairs_to_check), files_per_group)]
+    progress = progress_bar(100, rate_units="files")
+    number_of_pairs_checked = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        threads = [executor.submit(__compare_pairs_unit_processor, pairs, filelist_a, filelist_b, filepaths_a, filepaths_b) for pairs in grouped_pairs]
+        for thread in as_completed(threads):
+            (outcomes, partial_bytes_read) = thread.result()
+            for relative_filepath, outcome in outcomes:
+                stats[outcome] += 1
+                relative_filepaths["same" if outcome == "same_full_hash" else "differing"].append(relative_filepath)
+            stats["partial_bytes_read"] += partial_bytes_read
+            number_of_pairs_checked += len(outcomes)
+            progress.print_progress_bar(number_of_pairs_checked / len(pairs_to_check), number_of_pairs_checked)
+
+    print("") # to add a newline after the end of the progress bar
+
+    # groups finish in any order
+    relative_filepaths["same"].sort()
+    relative_filepaths["differing"].sort()
+
+    return (relative_filepaths, stats)
+
+
+def __get_sorted_files(filelist: Filelist) -> list[tuple[str, int, int]]:
+    """
+    returns the files of filelist as triples of (relative filepath with / separators, index in the Filelist, filesize), sorted by relative filepath
+    """
+    filesizes = filelist.get_filesizes()
+    filepaths = filelist.get_filepaths() # after get_filesizes() so that both are mapped to each other
+    input_folder = filelist.get_input_folder()
+
+    files = [(os.path.relpath(filepaths[index], input_folder).replace(os.sep, "/"), index, filesizes[index]) for index in range(len(filepaths))]
+    files.sort()
+
+    return files
+
+
+def __compare_pairs_unit_processor(pairs: list[tuple[str, int, int, int]], filelist_a: Filelist, filelist_b: Filelist, filepaths_a: tuple[str, ...], filepaths_b: tuple[str, ...]) -> tuple[list[tuple[str, str]], int]:
+    """
+    multithreaded unit processor for compare_filelists
+    do not use on its own
+
+    returns (outcomes, partial_bytes_read), outcomes being pairs of (relative filepath, stage of the stats that decided it)
+    """
+    outcomes: list[tuple[str, str]] = list()
+    partial_bytes_read = 0
+
+    for relative_filepath, file_index_a, file_index_b, filesize in pairs:
+        filepath_a = filepaths_a[file_index_a]
+        filepath_b = filepaths_b[file_index_b]
+        if filesize == 0:
+            outcomes.append((relative_filepath, "same_full_hash"))
+            continue
+
+        try:
+            (partial_hash_a, bytes_read_a) = get_sampled_hash(filepath_a, filesize)
+            (partial_hash_b, bytes_read_b) = get_sampled_hash(filepath_b, filesize)
+        except FileNotFoundError:
+            outcomes.append((relative_filepath, "unreadable"))
+            continue
+        partial_bytes_read += bytes_read_a + bytes_read_b
+        if partial_hash_a == "" or partial_hash_b == "":
+            outcomes.append((relative_filepath, "unreadable"))
+            continue
+        if partial_hash_a != partial_hash_b:
+            outcomes.append((relative_filepath, "differing_partial_hash"))
+            continue
+
+        full_hash_a = filelist_a.get_filehashes_of((filepath_a,))[0]
+        full_hash_b = filelist_b.get_filehashes_of((filepath_b,))[0]
+        if full_hash_a == "" or full_hash_b == "":
+            outcomes.append((relative_filepath, "unreadable"))
+        elif full_hash_a != full_hash_b:
+            outcomes.append((relative_filepath, "differing_full_hash"))
+        else:
+            outcomes.append((relative_filepath, "same_full_hash"))
+
+    return (outcomes, partial_bytes_read)